@@ -0,0 +1,11 @@
+"""Offline performance benchmarks for EMMAA.
+
+The benchmarks run the main steps of the EMMAA pipeline (model assembly,
+ModelManager construction, model checking, rendering and statistics of test
+results, answering queries and loading statements into the database) on
+synthetic statement sets and test corpora (see benchmarks.generate) without
+accessing S3. They can be run at several scales and compared against a
+stored baseline with
+
+    python -m benchmarks.run --scales 1000 10000 --baseline baseline.json
+"""
@@ -0,0 +1,251 @@
+"""Benchmark cases of the EMMAA pipeline run on synthetic models.
+
+Each benchmark is a function registered with the benchmark decorator that
+takes a SyntheticRun, prepares everything the measured step needs and
+returns a function running only the measured step (or None if the benchmark
+can't be run, e.g. without a database).
+"""
+import logging
+from collections import OrderedDict
+from indra.statements import stmts_to_json
+from emmaa.analyze_tests_results import ModelRound, TestRound
+from emmaa.db import StatementDatabaseManager
+from emmaa.model_tests import ModelManager, TestManager, ScopeTestConnector
+from emmaa.queries import PathProperty, OpenSearchQuery
+from emmaa.results_format import get_results_header
+from benchmarks.generate import make_model, make_test_corpus
+
+
+logger = logging.getLogger(__name__)
+
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """Register a benchmark function under a given name."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+class SyntheticRun(object):
+    """Synthetic data and pipeline state shared by the benchmarks of a scale.
+
+    Benchmarks of later steps of the pipeline reuse the outputs of the
+    earlier ones (e.g. tests are run on the ModelManager constructed in the
+    model_manager benchmark) and steps that were not run yet are run untimed
+    when they are needed.
+
+    Parameters
+    ----------
+    n_stmts : int
+        The number of statements of the synthetic model.
+    n_tests : Optional[int]
+        The number of synthetic tests. Default: one test per 10 statements.
+    mc_types : Optional[list[str]]
+        The model types to test. Default: signed and unsigned graphs.
+    n_queries : Optional[int]
+        The number of path queries to answer. Default: 100.
+    db_url : Optional[str]
+        The URL of a statements database. Database benchmarks are skipped if
+        not given.
+    seed : Optional[int]
+        A random seed. Default: 0.
+    """
+    def __init__(self, n_stmts, n_tests=None, mc_types=None, n_queries=100,
+                 db_url=None, seed=0):
+        self.n_stmts = n_stmts
+        self.n_tests = n_tests if n_tests else max(100, n_stmts // 10)
+        self.mc_types = mc_types
+        self.n_queries = n_queries
+        self.db_url = db_url
+        self.seed = seed
+        self.model = None
+        self.model_manager = None
+        self.tested = False
+        self.results = None
+        self._test_corpus = None
+
+    def get_model(self):
+        """Return the synthetic EmmaaModel."""
+        if self.model is None:
+            self.model = make_model(self.n_stmts, mc_types=self.mc_types,
+                                    seed=self.seed)
+        return self.model
+
+    def get_assembled_model(self):
+        """Return the synthetic EmmaaModel with assembled statements."""
+        model = self.get_model()
+        if not model.assembled_stmts:
+            model.run_assembly()
+        return model
+
+    def get_model_manager(self):
+        """Return a ModelManager with all model types assembled."""
+        if self.model_manager is None:
+            self.model_manager = ModelManager(self.get_assembled_model(),
+                                              lazy=False)
+        return self.model_manager
+
+    def get_test_corpus(self):
+        """Return the synthetic test corpus."""
+        if self._test_corpus is None:
+            self._test_corpus = make_test_corpus(
+                self.n_tests, self.get_model().get_indra_stmts(),
+                seed=self.seed)
+        return self._test_corpus
+
+    def get_tested_model_manager(self):
+        """Return the ModelManager with applicable tests added."""
+        mm = self.get_model_manager()
+        if not mm.applicable_tests:
+            tm = TestManager([mm], self.get_test_corpus()['tests'])
+            tm.make_tests(ScopeTestConnector())
+        return mm
+
+    def get_results(self):
+        """Return the test results and path lines of the ModelManager."""
+        if self.results is None:
+            mm = self.get_tested_model_manager()
+            if not self.tested:
+                mm.run_all_tests()
+                self.tested = True
+            self.results = mm.results_to_json(
+                self.get_test_corpus()['test_data'])
+        return self.results
+
+
+@benchmark('run_assembly')
+def run_assembly(run):
+    model = run.get_model()
+    return model.run_assembly
+
+
+@benchmark('model_manager')
+def construct_model_manager(run):
+    model = run.get_assembled_model()
+
+    def construct():
+        run.model_manager = ModelManager(model, lazy=False)
+    return construct
+
+
+@benchmark('run_all_tests')
+def run_all_tests(run):
+    mm = run.get_tested_model_manager()
+
+    def run_tests():
+        mm.run_all_tests()
+        run.tested = True
+        run.results = None
+    return run_tests
+
+
+@benchmark('results_to_json')
+def results_to_json(run):
+    mm = run.get_tested_model_manager()
+    if not run.tested:
+        mm.run_all_tests()
+        run.tested = True
+    test_data = run.get_test_corpus()['test_data']
+
+    def to_json():
+        run.results = mm.results_to_json(test_data)
+    return to_json
+
+
+@benchmark('model_round')
+def model_round_stats(run):
+    model = run.get_assembled_model()
+    stmts = model.assembled_stmts
+    # The previous round is missing a tenth of the statements
+    previous_round = ModelRound(stmts[:len(stmts) * 9 // 10], 'previous',
+                                model.paper_ids,
+                                emmaa_statements=model.stmts)
+
+    def make_stats():
+        model_round = ModelRound(stmts, model.date_str, model.paper_ids,
+                                 emmaa_statements=model.stmts)
+        model_round.get_total_statements()
+        model_round.get_statement_types()
+        model_round.get_agent_distribution()
+        model_round.get_statements_by_evidence()
+        model_round.get_english_statements_by_hash()
+        model_round.get_sources_distribution()
+        model_round.get_papers_distribution()
+        model_round.get_raw_paper_counts()
+        model_round.find_delta_hashes(previous_round, 'statements')
+    return make_stats
+
+
+@benchmark('test_round')
+def test_round_stats(run):
+    results, _ = run.get_results()
+    date_str = get_results_header(results)['date_str']
+    previous_round = TestRound(results, 'previous')
+
+    def make_stats():
+        test_round = TestRound(results, date_str)
+        test_round.get_total_applied_tests()
+        test_round.find_delta_hashes(previous_round, 'applied_tests')
+        for mc_type in test_round.mc_types_results:
+            test_round.passed_over_total(mc_type)
+            test_round.find_delta_hashes(previous_round, 'passed_tests',
+                                         mc_type=mc_type)
+        test_round.get_path_stmt_counts()
+    return make_stats
+
+
+@benchmark('answer_queries')
+def answer_queries(run):
+    mm = run.get_model_manager()
+    tests = run.get_test_corpus()['tests'][:run.n_queries]
+    queries = [PathProperty(test.stmt) for test in tests]
+    queries += [OpenSearchQuery(test.stmt.agent_list()[0], 'Activation',
+                                'subject') for test in tests[:10]]
+
+    def answer():
+        mm.answer_queries(queries)
+    return answer
+
+
+@benchmark('db_add_statements')
+def db_add_statements(run):
+    if not run.db_url:
+        return None
+    db, model_id, date = _get_statement_db(run)
+    db.delete_statements(model_id, date)
+    stmt_jsons = stmts_to_json(run.get_assembled_model().assembled_stmts)
+
+    def add_statements():
+        db.add_statements(model_id, date, stmt_jsons)
+    return add_statements
+
+
+@benchmark('db_get_statements')
+def db_get_statements(run):
+    if not run.db_url:
+        return None
+    db, model_id, date = _get_statement_db(run)
+    stmts = run.get_assembled_model().assembled_stmts
+    if not db.get_number_of_statements(model_id, date):
+        db.add_statements(model_id, date, stmts_to_json(stmts))
+    results, _ = run.get_results()
+    path_counts = get_results_header(results).get('path_stmt_counts', {})
+    stmt_hashes = [stmt.get_hash() for stmt in stmts[:1000]]
+
+    def get_statements():
+        db.update_statements_path_counts(model_id, date, path_counts)
+        db.get_statements(model_id, date, limit=1000, sort_by='evidence')
+        db.get_statements(model_id, date, limit=1000, sort_by='paths')
+        db.get_statements_by_hash(model_id, date, stmt_hashes)
+    return get_statements
+
+
+def _get_statement_db(run):
+    db = StatementDatabaseManager(run.db_url)
+    db.create_tables()
+    model = run.get_model()
+    return db, f'{model.name}_{run.n_stmts}', model.date_str[:10]
@@ -0,0 +1,259 @@
+"""Generate synthetic INDRA statement sets, EMMAA models and test corpora.
+
+Agents of the synthetic models are drawn with Zipf-distributed weights so
+that (similarly to models assembled from the literature) a few hub agents
+take part in many statements while most agents only take part in a few.
+The number of evidences per statement follows a heavy-tailed (Pareto)
+distribution.
+"""
+import json
+import random
+import pickle
+import logging
+import argparse
+import datetime
+from itertools import accumulate
+from indra.statements import Agent, Evidence, Activation, Inhibition, \
+    IncreaseAmount, DecreaseAmount, Phosphorylation, Dephosphorylation, \
+    Complex, stmts_to_json
+from emmaa.model import EmmaaModel
+from emmaa.model_tests import StatementCheckingTest
+from emmaa.priors import SearchTerm
+from emmaa.statements import EmmaaStatement
+
+
+logger = logging.getLogger(__name__)
+
+
+STMT_TYPE_WEIGHTS = [(Activation, 0.3), (Inhibition, 0.15),
+                     (IncreaseAmount, 0.15), (DecreaseAmount, 0.1),
+                     (Phosphorylation, 0.15), (Dephosphorylation, 0.1),
+                     (Complex, 0.05)]
+TEST_STMT_TYPES = [Activation, Inhibition, IncreaseAmount, DecreaseAmount]
+SOURCE_APIS = ['reach', 'sparser', 'medscan', 'trips', 'rlimsp', 'signor']
+MAX_EVIDENCE = 50
+
+
+def get_number_of_agents(n_stmts):
+    """Return the default number of agents for a number of statements."""
+    return max(100, n_stmts // 10)
+
+
+def get_agents(n_agents):
+    """Return a list of synthetic gene agents."""
+    return [Agent(f'GENE{ix}', db_refs={'HGNC': str(ix + 1),
+                                        'TEXT': f'Gene {ix}'})
+            for ix in range(n_agents)]
+
+
+def get_zipf_weights(n, exponent=1.0):
+    """Return Zipf-distributed weights for n ranked items."""
+    return [1 / (rank ** exponent) for rank in range(1, n + 1)]
+
+
+def make_statements(n_stmts, n_agents=None, exponent=1.0, seed=0):
+    """Return a list of synthetic INDRA Statements.
+
+    Parameters
+    ----------
+    n_stmts : int
+        The number of statements to generate.
+    n_agents : Optional[int]
+        The number of distinct agents. Default: one agent per 10 statements
+        (at least 100).
+    exponent : Optional[float]
+        The exponent of the Zipf distribution of agent degrees. Default: 1.
+    seed : Optional[int]
+        A random seed. Default: 0.
+
+    Returns
+    -------
+    stmts : list[indra.statements.Statement]
+        A list of statements with evidences from synthetic papers.
+    """
+    rng = random.Random(seed)
+    n_agents = n_agents if n_agents else get_number_of_agents(n_stmts)
+    agents = get_agents(n_agents)
+    weights = get_zipf_weights(n_agents, exponent)
+    # Shuffle the ranks so that hubs are not the agents with lowest IDs
+    rng.shuffle(weights)
+    # Cumulative weights are computed once instead of for each draw
+    cum_weights = list(accumulate(weights))
+    stmt_types, type_weights = zip(*STMT_TYPE_WEIGHTS)
+    n_papers = max(10, n_stmts // 3)
+    stmts = []
+    for stmt_type in rng.choices(stmt_types, type_weights, k=n_stmts):
+        subj, obj = rng.choices(agents, cum_weights=cum_weights, k=2)
+        while obj is subj:
+            obj = rng.choices(agents, cum_weights=cum_weights)[0]
+        evidence = _make_evidence(rng, subj, obj, n_papers)
+        # Statements don't share Agent objects since assembly can modify them
+        subj, obj = _copy_agent(subj), _copy_agent(obj)
+        if stmt_type == Complex:
+            stmt = Complex([subj, obj], evidence=evidence)
+        else:
+            stmt = stmt_type(subj, obj, evidence=evidence)
+        stmts.append(stmt)
+    logger.info(f'Generated {len(stmts)} statements about {n_agents} '
+                f'agents.')
+    return stmts
+
+
+def _copy_agent(agent):
+    return Agent(agent.name, db_refs=dict(agent.db_refs))
+
+
+def _make_evidence(rng, subj, obj, n_papers):
+    n_evidence = min(int(rng.paretovariate(1.5)), MAX_EVIDENCE)
+    evidence = []
+    for _ in range(n_evidence):
+        paper_ix = rng.randrange(n_papers)
+        evidence.append(Evidence(
+            source_api=rng.choice(SOURCE_APIS),
+            text=f'{subj.name} regulates {obj.name} in paper {paper_ix}.',
+            pmid=str(10000000 + paper_ix),
+            text_refs={'TRID': str(paper_ix),
+                       'PMID': str(10000000 + paper_ix)}))
+    return evidence
+
+
+def get_model_config(mc_types=None, n_search_terms=10):
+    """Return the config of a synthetic model.
+
+    The assembly pipeline does not include grounding and sequence mapping
+    so that the model can be assembled offline.
+    """
+    search_terms = [
+        SearchTerm('gene', ag.name, ag.db_refs, ag.name).to_json()
+        for ag in get_agents(n_search_terms)]
+    return {
+        'name': 'benchmark',
+        'human_readable_name': 'Benchmark Model',
+        'search_terms': search_terms,
+        'test': {
+            'statement_checking': {'max_path_length': 5, 'max_paths': 1},
+            'test_corpus': 'benchmark_tests',
+            'mc_types': mc_types if mc_types else
+            ['signed_graph', 'unsigned_graph']},
+        'query': {
+            'statement_checking': {'max_path_length': 5, 'max_paths': 1}},
+        'assembly': [
+            {'function': 'filter_no_hypothesis'},
+            {'function': 'run_preassembly',
+             'kwargs': {'return_toplevel': False}}]}
+
+
+def make_emmaa_statements(stmts, config, seed=0):
+    """Wrap INDRA Statements into EmmaaStatements of a model."""
+    rng = random.Random(seed)
+    search_terms = [SearchTerm.from_json(st) for st in config['search_terms']]
+    date = datetime.datetime(2021, 1, 1)
+    return [EmmaaStatement(stmt, date, [rng.choice(search_terms)],
+                           {'internal': rng.random() < 0.9})
+            for stmt in stmts]
+
+
+def make_model(n_stmts, n_agents=None, mc_types=None, exponent=1.0, seed=0):
+    """Return a synthetic EmmaaModel with a given number of statements."""
+    config = get_model_config(mc_types)
+    stmts = make_statements(n_stmts, n_agents, exponent, seed)
+    model = EmmaaModel(config['name'], config,
+                       paper_ids=get_paper_ids(stmts))
+    model.add_statements(make_emmaa_statements(stmts, config, seed))
+    return model
+
+
+def get_paper_ids(stmts):
+    """Return the set of TRIDs of the evidences of statements."""
+    return {ev.text_refs['TRID'] for stmt in stmts for ev in stmt.evidence}
+
+
+def make_test_statements(n_tests, model_stmts, path_fraction=0.5,
+                         max_walk_length=3, seed=0):
+    """Return a list of synthetic statements to test a model with.
+
+    Parameters
+    ----------
+    n_tests : int
+        The number of test statements to generate.
+    model_stmts : list[indra.statements.Statement]
+        The statements of the model the tests are generated for.
+    path_fraction : Optional[float]
+        The fraction of tests that connect the ends of a random walk on the
+        model statements (and are therefore likely to have a path). The
+        rest connect agents drawn with the model's agent degree
+        distribution. Default: 0.5.
+    max_walk_length : Optional[int]
+        The maximum length of the random walks. Default: 3.
+    seed : Optional[int]
+        A random seed. Default: 0.
+
+    Returns
+    -------
+    test_stmts : list[indra.statements.Statement]
+        A list of statements to test the model with.
+    """
+    rng = random.Random(seed)
+    successors = {}
+    degree_agents = []
+    agents = {}
+    for stmt in model_stmts:
+        ags = stmt.agent_list()
+        for ag in ags:
+            agents[ag.name] = ag
+            degree_agents.append(ag.name)
+        if len(ags) == 2:
+            successors.setdefault(ags[0].name, []).append(ags[1].name)
+    starts = list(successors)
+    test_stmts = []
+    for ix in range(n_tests):
+        if rng.random() < path_fraction:
+            subj = rng.choice(starts)
+            obj = subj
+            for _ in range(rng.randint(1, max_walk_length)):
+                if obj not in successors:
+                    break
+                obj = rng.choice(successors[obj])
+        else:
+            subj, obj = rng.choice(degree_agents), rng.choice(degree_agents)
+        if subj == obj:
+            obj = rng.choice(degree_agents)
+        stmt_type = rng.choice(TEST_STMT_TYPES)
+        test_stmts.append(stmt_type(
+            _copy_agent(agents[subj]), _copy_agent(agents[obj]),
+            evidence=[Evidence(source_api='assertion',
+                               text=f'Test {ix}.')]))
+    return test_stmts
+
+
+def make_test_corpus(n_tests, model_stmts, path_fraction=0.5, seed=0):
+    """Return a synthetic test corpus in the format stored on S3."""
+    test_stmts = make_test_statements(n_tests, model_stmts, path_fraction,
+                                      seed=seed)
+    return {'test_data': {'name': 'Benchmark tests',
+                          'description': f'{n_tests} synthetic tests.'},
+            'tests': [StatementCheckingTest(stmt) for stmt in test_stmts]}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic statement set and test corpus.')
+    parser.add_argument('-n', '--n-stmts', type=int, default=10000,
+                        help='Number of statements. Default is 10000.')
+    parser.add_argument('-t', '--n-tests', type=int, default=None,
+                        help='Number of tests. Default is one per '
+                             'statement.')
+    parser.add_argument('-a', '--n-agents', type=int, default=None,
+                        help='Number of agents. Default is one per 10 '
+                             'statements.')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-o', '--output-prefix', default='benchmark',
+                        help='Prefix of the output files.')
+    args = parser.parse_args()
+    stmts = make_statements(args.n_stmts, args.n_agents, seed=args.seed)
+    with open(f'{args.output_prefix}_statements.json', 'w') as fh:
+        json.dump(stmts_to_json(stmts), fh)
+    n_tests = args.n_tests if args.n_tests else args.n_stmts
+    test_corpus = make_test_corpus(n_tests, stmts, seed=args.seed)
+    with open(f'{args.output_prefix}_tests.pkl', 'wb') as fh:
+        pickle.dump(test_corpus, fh)
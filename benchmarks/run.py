@@ -0,0 +1,190 @@
+"""Run the benchmarks at given scales and compare them against a baseline.
+
+The results are saved as a JSON file that can be used as the baseline of
+later runs. Benchmarks that take more than (1 + tolerance) times their
+baseline wall time are reported as regressions and the script exits with a
+non-zero status.
+"""
+import sys
+import json
+import logging
+import argparse
+import platform
+from emmaa import __version__
+from emmaa.util import make_date_str, PhaseTimings, timed_phase
+from benchmarks.cases import BENCHMARKS, SyntheticRun
+
+
+logger = logging.getLogger(__name__)
+
+
+# Differences in benchmarks faster than this (in seconds) are ignored
+MIN_COMPARED_TIME = 0.05
+
+
+def run_benchmarks(scales, names=None, n_tests=None, mc_types=None,
+                   n_repeats=1, db_url=None, seed=0):
+    """Run benchmarks on synthetic models of given sizes.
+
+    Parameters
+    ----------
+    scales : list[int]
+        The numbers of statements of the synthetic models.
+    names : Optional[list[str]]
+        The names of benchmarks to run. Default: all benchmarks.
+    n_tests : Optional[int]
+        The number of synthetic tests. Default: one test per 10 statements.
+    mc_types : Optional[list[str]]
+        The model types to test. Default: signed and unsigned graphs.
+    n_repeats : Optional[int]
+        The number of times each benchmark is repeated. Default: 1.
+    db_url : Optional[str]
+        The URL of a statements database. Database benchmarks are skipped if
+        not given.
+    seed : Optional[int]
+        A random seed. Default: 0.
+
+    Returns
+    -------
+    results_json : dict
+        A dictionary with the environment of the run and the mean wall time,
+        CPU time and peak memory of each benchmark keyed by
+        '{benchmark}.{scale}'.
+    """
+    names = names if names else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f'Unknown benchmarks: {", ".join(sorted(unknown))}')
+    results = {}
+    for scale in scales:
+        run = SyntheticRun(scale, n_tests, mc_types, db_url=db_url,
+                           seed=seed)
+        for name in names:
+            key = f'{name}.{scale}'
+            timings = PhaseTimings()
+            for _ in range(n_repeats):
+                # Each repeat is prepared separately since the benchmarked
+                # steps can change the state of the run
+                func = BENCHMARKS[name](run)
+                if func is None:
+                    logger.info(f'Skipping {key}.')
+                    break
+                logger.info(f'Running {key}.')
+                with timed_phase(name, timings):
+                    func()
+            phase = timings.phases.get(name)
+            if phase is None:
+                continue
+            results[key] = {
+                'benchmark': name,
+                'scale': scale,
+                'repeats': phase['count'],
+                'wall_time': phase['wall_time'] / phase['count'],
+                'cpu_time': phase['cpu_time'] / phase['count'],
+                'peak_rss_mb': phase['peak_rss_mb']}
+            logger.info(f'{key}: {results[key]["wall_time"]:.3f} s')
+    return {'date_str': make_date_str(),
+            'emmaa_version': __version__,
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'results': results}
+
+
+def compare_to_baseline(results_json, baseline_json, tolerance=0.2):
+    """Return benchmarks that are slower than in the baseline.
+
+    Parameters
+    ----------
+    results_json : dict
+        Results returned by run_benchmarks.
+    baseline_json : dict
+        Stored results of a previous run.
+    tolerance : Optional[float]
+        The allowed relative increase of wall time. Default: 0.2.
+
+    Returns
+    -------
+    regressions : list[tuple]
+        A list of tuples of a benchmark key, its baseline wall time, its
+        current wall time and their ratio.
+    """
+    regressions = []
+    baseline = baseline_json['results']
+    for key, result in sorted(results_json['results'].items()):
+        if key not in baseline:
+            continue
+        old_time = baseline[key]['wall_time']
+        new_time = result['wall_time']
+        if new_time - old_time < MIN_COMPARED_TIME:
+            continue
+        if new_time > old_time * (1 + tolerance):
+            regressions.append((key, old_time, new_time,
+                                new_time / old_time if old_time else None))
+    return regressions
+
+
+def format_results(results_json, baseline_json=None):
+    """Return a table of benchmark results with baseline times if given."""
+    baseline = baseline_json['results'] if baseline_json else {}
+    lines = [f'{"benchmark":<32}{"wall (s)":>12}{"cpu (s)":>12}'
+             f'{"rss (MB)":>12}{"baseline (s)":>14}']
+    for key, result in sorted(results_json['results'].items()):
+        old = baseline.get(key)
+        rss = result['peak_rss_mb']
+        lines.append(
+            f'{key:<32}{result["wall_time"]:>12.3f}'
+            f'{result["cpu_time"]:>12.3f}'
+            f'{rss if rss is not None else float("nan"):>12.1f}'
+            f'{old["wall_time"] if old else float("nan"):>14.3f}')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Run EMMAA benchmarks on synthetic models.')
+    parser.add_argument('-s', '--scales', type=int, nargs='+',
+                        default=[1000, 10000],
+                        help='Numbers of model statements. Default is 1000 '
+                             'and 10000.')
+    parser.add_argument('-b', '--benchmarks', nargs='+',
+                        choices=list(BENCHMARKS),
+                        help='Benchmarks to run. Default is all.')
+    parser.add_argument('-t', '--n-tests', type=int, default=None,
+                        help='Number of tests. Default is one per 10 '
+                             'statements.')
+    parser.add_argument('-m', '--mc-types', nargs='+', default=None,
+                        help='Model types to test. Default is signed_graph '
+                             'and unsigned_graph.')
+    parser.add_argument('-r', '--repeats', type=int, default=1)
+    parser.add_argument('--db-url',
+                        help='URL of a (Postgres) statements database to '
+                             'benchmark loaders with.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help='File to save the results to.')
+    parser.add_argument('--baseline',
+                        help='Results of a previous run to compare with.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative slowdown. Default is 0.2.')
+    args = parser.parse_args()
+
+    results_json = run_benchmarks(args.scales, args.benchmarks, args.n_tests,
+                                  args.mc_types, args.repeats, args.db_url,
+                                  args.seed)
+    with open(args.output, 'w') as fh:
+        json.dump(results_json, fh, indent=1)
+    baseline_json = None
+    if args.baseline:
+        with open(args.baseline, 'r') as fh:
+            baseline_json = json.load(fh)
+    print(format_results(results_json, baseline_json))
+    if baseline_json:
+        regressions = compare_to_baseline(results_json, baseline_json,
+                                          args.tolerance)
+        for key, old_time, new_time, ratio in regressions:
+            ratio_str = f' ({ratio:.2f}x)' if ratio else ''
+            print(f'Regression in {key}: {old_time:.3f} s -> '
+                  f'{new_time:.3f} s{ratio_str}')
+        if regressions:
+            sys.exit(1)
@@ -1,15 +1,17 @@
 from datetime import date
 import json
 import logging
-import jsonpickle
 from collections import defaultdict
 from emmaa.model import load_stmts_from_s3
 from emmaa.statements import filter_emmaa_stmts_by_metadata, \
     filter_indra_stmts_by_metadata
-from emmaa.model_tests import load_model_manager_from_s3
+from emmaa.model_tests import load_model_manager_from_s3, RESULT_CODES
+from emmaa.results_format import is_compact_results, get_results_header, \
+    get_results_tests, get_path_results, get_path_json
 from emmaa.util import NotAClassName, find_latest_s3_file, find_nth_latest_s3_file, \
     strip_out_date, EMMAA_BUCKET_NAME, load_json_from_s3, save_json_to_s3, \
-    _make_delta_msg
+    _make_delta_msg, make_date_str, timed_phase, phase_timings, \
+    save_phase_timings_to_s3
 from indra.statements import agent
 from indra.statements.statements import Statement
 from indra.assemblers.english.assembler import EnglishAssembler
@@ -139,7 +141,7 @@ class ModelRound(Round):
         statements = mm.model.assembled_stmts
         date_str = mm.date_str
         try:
-            paper_ids = list(mm.model.paper_ids)
+            paper_ids = list(mm.get_paper_ids())
         except AttributeError:
             paper_ids = None
         paper_id_type = mm.model.reading_config.get('main_id_type', 'TRID')
@@ -415,16 +417,19 @@ class TestRound(Round):
 
     Parameters
     ----------
-    json_results : list[dict]
-        A list of JSON formatted dictionaries to store information about the
-        test results. The first dictionary contains information about the
-        model. Each consecutive dictionary contains information about a single
-        test applied to the model and test results.
+    json_results : dict or list[dict]
+        Test results in the compact format (see emmaa.results_format) or,
+        for older rounds, a list of JSON formatted dictionaries where the
+        first dictionary contains information about the model and each
+        consecutive dictionary contains information about a single test
+        applied to the model and test results.
     date_str : str
         Time when ModelManager responsible for this round was created.
 
     Attributes
     ----------
+    header : dict
+        Information about the model and the test round.
     mc_types_results : dict
         A dictionary mapping a type of a ModelChecker to a list of test
         results generated by this ModelChecker
@@ -438,7 +443,8 @@ class TestRound(Round):
     def __init__(self, json_results, date_str):
         super().__init__(date_str)
         self.json_results = json_results
-        mc_types = self.json_results[0].get('mc_types', ['pysb'])
+        self.header = get_results_header(json_results)
+        mc_types = self.header.get('mc_types', ['pysb'])
         self.mc_types_results = {}
         for mc_type in mc_types:
             self.mc_types_results[mc_type] = self._get_results(mc_type)
@@ -449,7 +455,8 @@ class TestRound(Round):
     def load_from_s3_key(cls, key, bucket=EMMAA_BUCKET_NAME):
         logger.info(f'Loading json from {key}')
         json_results = load_json_from_s3(bucket, key)
-        date_str = json_results[0].get('date_str', strip_out_date(key))
+        date_str = get_results_header(json_results).get(
+            'date_str', strip_out_date(key))
         return cls(json_results, date_str)
 
     def get_applied_test_hashes(self):
@@ -502,19 +509,18 @@ class TestRound(Round):
             # Here use result.paths because we care about actual path (i.e.
             # we can't get a path exceeding max path length)
             if res.paths:
-                try:
-                    path_or_code = (
-                        self.json_results[ix+1][mc_type]['path_json'])
-                # if json doesn't contain some of the fields
-                except KeyError:
-                    pass
+                path_or_code = get_path_json(self.json_results, mc_type, ix)
             # If path wasn't found or presented in json
             if not path_or_code:
-                try:
-                    path_or_code = (
-                        self.json_results[ix+1][mc_type]['result_code'])
-                except KeyError:
-                    pass
+                if is_compact_results(self.json_results):
+                    path_or_code = RESULT_CODES.get(res.result_code)
+                else:
+                    try:
+                        path_or_code = (
+                            self.json_results[ix+1][mc_type]['result_code'])
+                    # if json doesn't contain some of the fields
+                    except KeyError:
+                        pass
             # Couldn't get either path or code description from json
             if not path_or_code:
                 path_or_code = res.result_code
@@ -532,21 +538,18 @@ class TestRound(Round):
         return tests_by_hash
 
     def get_path_stmt_counts(self):
-        path_stmt_counts = self.json_results[0].get('path_stmt_counts')
+        path_stmt_counts = self.header.get('path_stmt_counts')
         if path_stmt_counts:
             return sorted(
                 path_stmt_counts.items(), key=lambda x: x[1], reverse=True)
         return []
 
     def _get_results(self, mc_type):
-        unpickler = jsonpickle.unpickler.Unpickler()
-        test_results = [unpickler.restore(result[mc_type]['result_json'])
-                        for result in self.json_results[1:]]
-        return test_results
+        return get_path_results(self.json_results, mc_type)
 
     def _get_tests(self):
         tests = [Statement._from_json(res['test_json'])
-                 for res in self.json_results[1:]]
+                 for res in get_results_tests(self.json_results)]
         return tests
 
 
@@ -883,7 +886,7 @@ class TestStatsGenerator(StatsGenerator):
         """Add latest test round summary to json_stats."""
         logger.info(f'Generating test summary for {self.model_name}.')
         self.json_stats['test_round_summary'] = {
-            'test_data': self.latest_round.json_results[0].get('test_data'),
+            'test_data': self.latest_round.header.get('test_data'),
             'number_applied_tests': self.latest_round.get_total_applied_tests(),
             'all_test_results': self.latest_round.english_test_results,
             'path_stmt_counts': self.latest_round.get_path_stmt_counts()}
@@ -898,7 +901,7 @@ class TestStatsGenerator(StatsGenerator):
         logger.info(f'Generating tests delta for {self.model_name}.')
         date = self.latest_round.date_str[:10]
         test_name = None
-        test_data = self.latest_round.json_results[0].get('test_data')
+        test_data = self.latest_round.header.get('test_data')
         if test_data:
             test_name = test_data.get('name')
         if not self.previous_round:
@@ -1143,16 +1146,25 @@ def generate_stats_on_s3(
         Whether to upload latest statistics about model and a test.
         Default: True
     """
+    # Only record the phases of this run in the timings artifact
+    phase_timings.reset()
     if mode == 'model':
         sg = ModelStatsGenerator(model_name, bucket=bucket)
     elif mode == 'tests':
         sg = TestStatsGenerator(model_name, test_corpus_str, bucket=bucket)
     else:
         raise TypeError('Mode must be either model or tests')
-    sg.make_stats()
+    with timed_phase(f'make_stats.{mode}'):
+        sg.make_stats()
     # Optionally upload stats to S3
     if upload_stats:
         sg.save_to_s3()
+        run_name = 'model_stats' if mode == 'model' else \
+            f'test_stats_{test_corpus_str}'
+        date_str = sg.latest_round.date_str if sg.latest_round else \
+            make_date_str()
+        save_phase_timings_to_s3(model_name, run_name, date_str,
+                                 bucket=bucket)
     return sg
 
 
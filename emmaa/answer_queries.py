@@ -5,7 +5,7 @@ from copy import deepcopy
 from emmaa.model_tests import load_model_manager_from_s3
 from emmaa.db import get_db
 from emmaa.util import make_date_str, find_latest_s3_file, EMMAA_BUCKET_NAME, \
-    FORMATTED_TYPE_NAMES
+    FORMATTED_TYPE_NAMES, phase_timings, save_phase_timings_to_s3
 
 
 logger = logging.getLogger(__name__)
@@ -218,6 +218,10 @@ def answer_queries_from_s3(model_name, db=None, bucket=EMMAA_BUCKET_NAME):
     db : Optional[emmaa.db.manager.EmmaaDatabaseManager]
         If given over-rides the default primary database.
     """
+    # Only record the phases of this run in the timings artifact
+    phase_timings.reset()
     mm = load_model_manager_from_s3(model_name=model_name, bucket=bucket)
     qm = QueryManager(db=db, model_managers=[mm])
     qm.answer_registered_queries(model_name)
+    save_phase_timings_to_s3(model_name, 'queries', make_date_str(),
+                             bucket=bucket)
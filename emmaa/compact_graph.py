@@ -0,0 +1,249 @@
+"""This module implements a compact array representation of IndraNet graphs
+that can be stored next to a ModelManager and turned back into a graph
+without reassembling the model."""
+import io
+import json
+import logging
+import numpy as np
+import networkx as nx
+from emmaa.util import get_s3_client, s3_put
+
+
+logger = logging.getLogger(__name__)
+
+
+class CompactGraph(object):
+    """Represent an IndraNet graph as CSR adjacency and attribute arrays.
+
+    Parameters
+    ----------
+    arrays : dict[str, numpy.ndarray]
+        A dictionary of named arrays describing the graph (as created by
+        from_graph or loaded from a file).
+
+    Attributes
+    ----------
+    arrays : dict[str, numpy.ndarray]
+        The arrays describing the graph (string columns are stored as a
+        UTF-8 encoded byte array with a <name>__offsets array of the start
+        of each string):
+        node_names - names of nodes in the order of the graph;
+        node_attrs - node attributes as JSON strings;
+        indptr, indices - CSR adjacency of edges sorted by source node;
+        edge_keys - keys of edges in a MultiDiGraph;
+        edge_stmt_ptr - offsets of each edge's statements in stmt columns;
+        edge__<attr> and stmt__<attr> - columns of edge and statement
+        attributes.
+    meta : dict
+        Graph type and the names and encodings of attribute columns.
+    """
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.meta = json.loads(str(arrays['meta']))
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Return a CompactGraph built from an IndraNet DiGraph or
+        MultiDiGraph."""
+        multi = graph.is_multigraph()
+        node_names = list(graph.nodes)
+        node_ix = {node: ix for ix, node in enumerate(node_names)}
+        indptr = [0]
+        indices = []
+        edge_keys = []
+        edge_data = []
+        for source in node_names:
+            for target, target_data in graph.adj[source].items():
+                if multi:
+                    for key, data in target_data.items():
+                        indices.append(node_ix[target])
+                        edge_keys.append(key)
+                        edge_data.append(data)
+                else:
+                    indices.append(node_ix[target])
+                    edge_data.append(target_data)
+            indptr.append(len(indices))
+        edge_attrs = [attr for attr in _get_keys(edge_data)
+                      if attr != 'statements']
+        stmt_ptr = [0]
+        stmts = []
+        for data in edge_data:
+            stmts += data.get('statements', [])
+            stmt_ptr.append(len(stmts))
+        stmt_attrs = _get_keys(stmts)
+        arrays = {
+            'indptr': np.array(indptr, dtype=np.int64),
+            'indices': np.array(indices, dtype=np.int64),
+            'edge_keys': np.array(edge_keys, dtype=np.int64),
+            'edge_stmt_ptr': np.array(stmt_ptr, dtype=np.int64)}
+        _add_string_column(arrays, 'node_names', node_names)
+        _add_string_column(
+            arrays, 'node_attrs', [json.dumps(data, default=_json_default)
+                                   for _, data in graph.nodes(data=True)])
+        encodings = {'edge': {}, 'stmt': {}}
+        for prefix, attrs, items in (('edge', edge_attrs, edge_data),
+                                     ('stmt', stmt_attrs, stmts)):
+            for attr in attrs:
+                encodings[prefix][attr] = _add_column(
+                    arrays, f'{prefix}__{attr}',
+                    [item.get(attr) for item in items])
+        meta = {'multi': multi,
+                'edge_attrs': edge_attrs,
+                'stmt_attrs': stmt_attrs,
+                'encodings': encodings}
+        arrays['meta'] = np.array(json.dumps(meta))
+        return cls(arrays)
+
+    def to_graph(self):
+        """Return a networkx graph with the same nodes, edges and attributes
+        as the graph this CompactGraph was built from."""
+        arrays = self.arrays
+        multi = self.meta['multi']
+        graph = nx.MultiDiGraph() if multi else nx.DiGraph()
+        node_names = _get_string_column(arrays, 'node_names')
+        graph.add_nodes_from(
+            (name, json.loads(attrs)) for name, attrs in
+            zip(node_names, _get_string_column(arrays, 'node_attrs')))
+        edge_columns = self._decode_columns('edge')
+        stmt_columns = self._decode_columns('stmt')
+        stmt_ptr = arrays['edge_stmt_ptr'].tolist()
+        indptr = arrays['indptr'].tolist()
+        indices = arrays['indices'].tolist()
+        edge_keys = arrays['edge_keys'].tolist()
+        edges = []
+        for source_ix, source in enumerate(node_names):
+            for edge_ix in range(indptr[source_ix], indptr[source_ix + 1]):
+                data = {'statements': [
+                    {attr: column[stmt_ix] for attr, column in
+                     stmt_columns.items()}
+                    for stmt_ix in range(stmt_ptr[edge_ix],
+                                         stmt_ptr[edge_ix + 1])]}
+                for attr, column in edge_columns.items():
+                    data[attr] = column[edge_ix]
+                target = node_names[indices[edge_ix]]
+                if multi:
+                    edges.append((source, target, edge_keys[edge_ix], data))
+                else:
+                    edges.append((source, target, data))
+        graph.add_edges_from(edges)
+        return graph
+
+    def get_stmt_hashes(self):
+        """Return a set of hashes of all statements supporting the edges."""
+        if 'stmt__stmt_hash' not in self.arrays:
+            return set()
+        return set(self.arrays['stmt__stmt_hash'].tolist())
+
+    def to_bytes(self):
+        """Return the arrays of this CompactGraph in compressed npz format."""
+        buf = io.BytesIO()
+        np.savez_compressed(buf, **self.arrays)
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, npz_bytes):
+        """Return a CompactGraph loaded from bytes in npz format."""
+        with np.load(io.BytesIO(npz_bytes), allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        return cls(arrays)
+
+    def _decode_columns(self, prefix):
+        columns = {}
+        for attr in self.meta[f'{prefix}_attrs']:
+            encoding = self.meta['encodings'][prefix][attr]
+            columns[attr] = _decode_column(
+                self.arrays, f'{prefix}__{attr}', encoding)
+        return columns
+
+
+def save_compact_graph_to_s3(graph, bucket, key):
+    """Save an IndraNet graph in compact format to S3."""
+    compact_graph = CompactGraph.from_graph(graph)
+    logger.info(f'Saving compact graph to {key}')
+    s3_put(bucket=bucket, key=key, body=compact_graph.to_bytes(),
+           unsigned_client=False)
+    return compact_graph
+
+
+def load_compact_graph_from_s3(bucket, key):
+    """Load a CompactGraph from S3."""
+    client = get_s3_client()
+    logger.info(f'Loading compact graph from {key}')
+    obj = client.get_object(Bucket=bucket, Key=key)
+    return CompactGraph.from_bytes(obj['Body'].read())
+
+
+def _get_keys(dicts):
+    # Return all keys of the dictionaries in the order they appear
+    keys = {}
+    for d in dicts:
+        for key in d:
+            keys[key] = None
+    return list(keys)
+
+
+def _add_column(arrays, name, values):
+    # Integers and floats are stored as numeric arrays, everything else
+    # (strings, None, booleans, nested structures) as JSON strings
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool)
+           for v in values):
+        arrays[name] = np.array(values, dtype=np.int64)
+        return 'int'
+    if all(isinstance(v, (int, float, np.integer, np.floating)) and
+           not isinstance(v, bool) for v in values):
+        arrays[name] = np.array(values, dtype=np.float64)
+        return 'float'
+    _add_string_column(arrays, name, [json.dumps(v, default=_json_default)
+                                      for v in values])
+    return 'json'
+
+
+def _add_string_column(arrays, name, strings):
+    # Strings are stored as one UTF-8 byte array and the offsets of each
+    # string rather than as a fixed width unicode array which takes four
+    # bytes per character of the longest string for each string
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    arrays[name] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    arrays[f'{name}__offsets'] = offsets
+
+
+def _get_string_column(arrays, name):
+    offsets_name = f'{name}__offsets'
+    # Artifacts written before strings were stored as bytes
+    if offsets_name not in arrays:
+        return arrays[name].tolist()
+    blob = arrays[name].tobytes()
+    offsets = arrays[offsets_name].tolist()
+    return [blob[start:end].decode('utf-8')
+            for start, end in zip(offsets, offsets[1:])]
+
+
+def _json_default(value):
+    # Numpy scalars can appear in values set by pandas based assembly
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON '
+                    'serializable')
+
+
+def _decode_column(arrays, name, encoding):
+    if encoding != 'json':
+        return arrays[name].tolist()
+    # Decoded strings and other immutable values that repeat in a column
+    # (e.g. statement types and sources) are shared between the edges
+    values = []
+    shared = {}
+    for encoded in _get_string_column(arrays, name):
+        value = shared.get(encoded)
+        if value is None:
+            value = json.loads(encoded)
+            if value is None or isinstance(value, (str, int, float, bool)):
+                shared[encoded] = value
+        values.append(value)
+    return values
@@ -17,8 +17,9 @@ from .schema import EmmaaTable, User, Query, Base, Result, UserQuery, \
     UserModel, Statement, QueriesDbTable, StatementsDbTable
 from emmaa.queries import Query as QueryObject
 from emmaa.model import get_models, load_config_from_s3
+from emmaa.results_format import get_results_header
 from emmaa.util import EMMAA_BUCKET_NAME, load_gzip_json_from_s3, \
-    sort_s3_files_by_date_str, strip_out_date, load_json_from_s3
+    sort_s3_files_by_date_str, strip_out_date, load_json_from_s3, timed_phase
 from indra.statements import stmts_from_json
 
 logger = logging.getLogger(__name__)
@@ -173,6 +174,7 @@ class QueryDatabaseManager(EmmaaDatabaseManager):
             logger.warning(f"A user with email {email} already exists.")
         return user_id
 
+    @timed_phase('db_write')
     def put_queries(self, user_email, user_id, query, model_ids,
                     subscribe=True):
         """Add queries to the database for a given user.
@@ -295,6 +297,7 @@ class QueryDatabaseManager(EmmaaDatabaseManager):
             queries = [QueryObject._from_json(q) for q, in q.all()]
         return queries
 
+    @timed_phase('db_write')
     def put_results(self, model_id, query_results):
         """Add new results for a set of queries tested on a model_id.
 
@@ -655,7 +658,8 @@ class StatementDatabaseManager(EmmaaDatabaseManager):
                 key = f'results/{model_id}/results_{test_corpus}_{dt}.json'
                 try:
                     results = load_json_from_s3(bucket, key)
-                    path_counts = results[0].get('path_stmt_counts')
+                    path_counts = get_results_header(results).get(
+                        'path_stmt_counts')
                     if path_counts:
                         self.update_statements_path_counts(
                             model_id, date, path_counts)
@@ -675,6 +679,7 @@ class StatementDatabaseManager(EmmaaDatabaseManager):
                 Statement.date == date)
             q.delete(synchronize_session=False)
 
+    @timed_phase('db_write')
     def add_statements(self, model_id, date, stmt_jsons, max_updates=3):
         """Add statements to the database.
 
@@ -801,6 +806,7 @@ class StatementDatabaseManager(EmmaaDatabaseManager):
             stmts = stmts_from_json([s for s, in q.all()])
         return stmts
 
+    @timed_phase('db_write')
     def update_statements_path_counts(self, model_id, date, path_counts):
         """Update the path counts for statements. The update is incremental
         because we can have the statement used in the paths in different
@@ -1,8 +1,10 @@
+import networkx as nx
 from indra.tools import assemble_corpus as ac
 
 
 node_filter_functions = {}
 edge_filter_functions = {}
+filter_masks = {}
 
 
 def register_filter(filter_type):
@@ -26,6 +28,68 @@ def register_filter(filter_type):
     return register
 
 
+def register_filter_mask(filter_name):
+    """Decorator to register a vectorized form of a filter function.
+
+    A mask function for a node filter should take a dictionary mapping node
+    names to agents and return a set of names of nodes that are not allowed
+    to be in a path.
+
+    A mask function for an edge filter should take a graph and return a set
+    of edges ((source, target) for DiGraph or (source, target, key) for
+    MultiDiGraph) that should not be in the graph.
+
+    The result of a mask function must be the same as evaluating the filter
+    function for each node or edge.
+    """
+    def register(function):
+        filter_masks[filter_name] = function
+        return function
+    return register
+
+
+def get_excluded_nodes(nodes_to_agents, agent_filter_func):
+    """Return names of nodes filtered out by a node filter function.
+
+    The filter is evaluated once per node (or by its registered mask
+    function) so that path searches only need to look up nodes in a set.
+    """
+    name = getattr(agent_filter_func, '__name__', None)
+    mask_func = filter_masks.get(name)
+    if mask_func is not None and \
+            node_filter_functions.get(name) is agent_filter_func:
+        return mask_func(nodes_to_agents)
+    return {node for node, agent in nodes_to_agents.items()
+            if not agent_filter_func(agent)}
+
+
+def get_excluded_edges(graph, edge_filter_func):
+    """Return edges of a graph filtered out by an edge filter function."""
+    name = getattr(edge_filter_func, '__name__', None)
+    mask_func = filter_masks.get(name)
+    if mask_func is not None and \
+            edge_filter_functions.get(name) is edge_filter_func:
+        return mask_func(graph)
+    if graph.is_multigraph():
+        edges = graph.edges(keys=True)
+    else:
+        edges = graph.edges()
+    return {edge for edge in edges if not edge_filter_func(graph, *edge)}
+
+
+def get_filtered_graph(graph, edge_filter_func):
+    """Return a copy of a graph without the edges filtered out by an edge
+    filter function.
+
+    This is equivalent to indra.explanation.pathfinding.get_subgraph but
+    uses the registered mask of the filter if there is one.
+    """
+    excluded = get_excluded_edges(graph, edge_filter_func)
+    view = nx.subgraph_view(
+        graph, filter_edge=lambda *edge: edge not in excluded)
+    return view.copy()
+
+
 @register_filter('node')
 def filter_chem_mesh_go(agent):
     """Filter ungrounded agents and agents grounded to MESH, CHEBI, GO unless
@@ -48,3 +112,14 @@ def filter_to_internal_edges(g, u, v, *args):
         if stmts_dict['internal']:
             return True
     return False
+
+
+@register_filter_mask('filter_to_internal_edges')
+def mask_to_internal_edges(g):
+    """Return edges that don't have any internal statements."""
+    if g.is_multigraph():
+        edges = g.edges(keys=True, data='statements')
+    else:
+        edges = g.edges(data='statements')
+    return {edge[:-1] for edge in edges
+            if not any(stmts_dict['internal'] for stmts_dict in edge[-1])}
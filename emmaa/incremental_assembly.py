@@ -0,0 +1,335 @@
+"""Incremental assembly of EMMAA models.
+
+The main assembly pipeline of a model is split into a prefix of steps that
+process each statement independently (e.g. grounding and sequence mapping
+and filters by properties of a statement) and the remaining steps (starting
+with preassembly). The outputs of the prefix are stored by the full hash of
+each raw statement so that only raw statements added since the previous
+assembly are run through the prefix. The refinement relations found by
+preassembly are stored as well so that refinements are only searched for
+between pairs of unique statements that include a new statement. The
+assembled statements are the same as those of a full assembly.
+"""
+import json
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+import indra
+from indra.ontology.bio import bio_ontology
+from indra.ontology.bio.ontology import BioOntology
+from indra.pipeline import AssemblyPipeline
+from indra.preassembler.refinement import RefinementFilter, \
+    OntologyRefinementFilter
+from indra.util import fast_deepcopy
+from emmaa.util import make_date_str, find_latest_s3_file, FORMAT, \
+    load_pickle_from_s3, save_pickle_to_s3, EMMAA_BUCKET_NAME
+
+
+logger = logging.getLogger(__name__)
+
+
+# Changing this version invalidates the stored assembly states
+ASSEMBLY_STATE_VERSION = 1
+
+
+# Pipeline functions whose output for a statement only depends on that
+# statement (and on the arguments of the step)
+STATEMENTWISE_FUNCTIONS = {
+    'filter_no_hypothesis', 'filter_no_negated', 'filter_by_type',
+    'filter_direct', 'filter_evidence_source', 'filter_grounded_only',
+    'filter_genes_only', 'filter_human_only', 'filter_gene_list',
+    'filter_by_db_refs', 'filter_concept_names', 'filter_complexes_by_size',
+    'filter_mutation_status', 'filter_mod_nokinase', 'filter_enzyme_kinase',
+    'filter_transcription_factor', 'filter_retracted_sources',
+    'filter_uuid_list', 'filter_relevance', 'filter_eidos_ungrounded',
+    'map_grounding', 'map_db_refs', 'map_sequence', 'ground_statements',
+    'fix_invalidities', 'standardize_names_groundings',
+    'strip_agent_context', 'rename_db_ref'}
+
+
+# Keyword arguments of run_preassembly that change how refinements are found
+REFINEMENT_KWARGS = {'filters', 'ontology', 'matches_fun', 'refinement_fun'}
+
+
+class AssemblyState(object):
+    """Intermediate results of a model assembly used by the next assembly.
+
+    Parameters
+    ----------
+    fingerprint : str
+        A fingerprint of the assembly pipeline and the search terms the
+        state was generated with.
+    full_build_date_str : str
+        The date of the last full assembly the state is derived from.
+    prefix_outputs : dict[int, list[indra.statements.Statement]]
+        A dictionary mapping full hashes of raw statements to the outputs
+        of the statement-wise steps of the pipeline for them.
+    refinements : dict[int, tuple(set, dict)]
+        A dictionary mapping indices of preassembly steps (among the steps
+        following the statement-wise steps) to the set of hashes of unique
+        statements and a dictionary mapping the hash of a statement to the
+        hashes of statements it refines.
+    """
+    def __init__(self, fingerprint, full_build_date_str, prefix_outputs=None,
+                 refinements=None):
+        self.fingerprint = fingerprint
+        self.full_build_date_str = full_build_date_str
+        self.prefix_outputs = prefix_outputs if prefix_outputs else {}
+        self.refinements = refinements if refinements else {}
+
+    def get_age(self):
+        """Return the time since the last full assembly."""
+        return datetime.utcnow() - datetime.strptime(
+            self.full_build_date_str, FORMAT)
+
+    def __repr__(self):
+        return (f'AssemblyState({len(self.prefix_outputs)} raw statements, '
+                f'full build on {self.full_build_date_str})')
+
+
+class KnownRefinementsFilter(RefinementFilter):
+    """A refinement filter skipping pairs of statements whose refinement
+    relation is already known.
+
+    For a statement that was among the unique statements of the previous
+    preassembly, only the statements it was found to refine (or to be
+    refined by) and new statements remain potentially related.
+
+    Parameters
+    ----------
+    known_hashes : set[int]
+        Hashes of the unique statements of the previous preassembly.
+    relations : dict[int, set[int]]
+        A dictionary mapping hashes of statements to hashes of the
+        statements they refine.
+    """
+    def __init__(self, known_hashes, relations):
+        super().__init__()
+        self.known_hashes = known_hashes
+        self.less_specifics = relations
+        self.more_specifics = defaultdict(set)
+        for refiner, refineds in relations.items():
+            for refined in refineds:
+                self.more_specifics[refined].add(refiner)
+        self.new_hashes = set()
+
+    def initialize(self, stmts_by_hash):
+        super().initialize(stmts_by_hash)
+        self.new_hashes = set(stmts_by_hash) - self.known_hashes
+        logger.info(f'Finding refinements of {len(self.new_hashes)} new '
+                    f'out of {len(stmts_by_hash)} unique statements.')
+
+    def get_related(self, stmt, possibly_related=None,
+                    direction='less_specific'):
+        stmt_hash = stmt.get_hash()
+        if possibly_related is None:
+            possibly_related = \
+                set(self.shared_data['stmts_by_hash']) - {stmt_hash}
+        if stmt_hash not in self.known_hashes:
+            return possibly_related
+        known = self.less_specifics if direction == 'less_specific' \
+            else self.more_specifics
+        return possibly_related & (known.get(stmt_hash, set()) |
+                                   self.new_hashes)
+
+
+def split_pipeline(steps):
+    """Return the statement-wise prefix and the rest of pipeline steps."""
+    for ix, step in enumerate(steps):
+        if step['function'] not in STATEMENTWISE_FUNCTIONS:
+            return steps[:ix], steps[ix:]
+    return steps, []
+
+
+def get_pipeline_fingerprint(steps, stnames=None):
+    """Return a fingerprint of an assembly pipeline and its inputs.
+
+    The fingerprint depends on the steps and their arguments, the search
+    term names and the versions of INDRA and its ontology.
+    """
+    fingerprint_json = json.dumps(
+        {'version': ASSEMBLY_STATE_VERSION,
+         'indra_version': indra.__version__,
+         'ontology_version': BioOntology.version,
+         'steps': steps,
+         'stnames': sorted(stnames) if stnames else None},
+        sort_keys=True, default=str)
+    return hashlib.sha256(fingerprint_json.encode('utf-8')).hexdigest()
+
+
+def run_statementwise_steps(steps, stmts, stnames=None):
+    """Run statement-wise pipeline steps on statements.
+
+    Returns
+    -------
+    outputs : list[list[indra.statements.Statement]] or None
+        A list with the outputs of the steps for each of the statements or
+        None if the outputs can't be matched to the input statements by
+        their UUIDs.
+    """
+    if not steps:
+        return [[stmt] for stmt in stmts]
+    uuids = [stmt.uuid for stmt in stmts]
+    if len(set(uuids)) != len(uuids):
+        logger.info('Raw statements do not have unique UUIDs.')
+        return None
+    # The raw statements of the model are not modified by the steps
+    stmts_out = AssemblyPipeline(steps).run(fast_deepcopy(stmts),
+                                            stnames=stnames)
+    outputs_by_uuid = defaultdict(list)
+    for stmt in stmts_out:
+        outputs_by_uuid[stmt.uuid].append(stmt)
+    if not set(outputs_by_uuid) <= set(uuids):
+        logger.info('Statement-wise steps changed the statement UUIDs.')
+        return None
+    return [outputs_by_uuid.get(uuid, []) for uuid in uuids]
+
+
+def is_refinement_step(step):
+    """Return True if a step is preassembly whose refinements can be reused.
+    """
+    kwargs = step.get('kwargs', {})
+    return step['function'] == 'run_preassembly' and \
+        not (set(kwargs) & REFINEMENT_KWARGS) and \
+        kwargs.get('run_refinement', True)
+
+
+def get_refinements(stmts):
+    """Return the hashes and refinement relations of preassembled statements.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        Statements returned by preassembly (the statements that are not
+        returned, e.g. if only top-level statements are returned, are found
+        through the supported_by attributes).
+
+    Returns
+    -------
+    stmt_hashes : set[int]
+        The hashes of all unique statements.
+    relations : dict[int, set[int]]
+        A dictionary mapping hashes of statements to hashes of the
+        statements they refine.
+    """
+    stmt_hashes = set()
+    relations = {}
+    to_visit = list(stmts)
+    while to_visit:
+        stmt = to_visit.pop()
+        stmt_hash = stmt.get_hash()
+        if stmt_hash in stmt_hashes:
+            continue
+        stmt_hashes.add(stmt_hash)
+        if stmt.supported_by:
+            relations[stmt_hash] = {st.get_hash() for st in stmt.supported_by}
+            to_visit += stmt.supported_by
+    return stmt_hashes, relations
+
+
+def run_incremental_assembly(steps, estmts, stnames=None, state=None,
+                             full_rebuild=False, full_rebuild_days=7):
+    """Assemble statements reusing the state of the previous assembly.
+
+    Parameters
+    ----------
+    steps : list[dict]
+        Steps of the assembly pipeline.
+    estmts : list[emmaa.statements.EmmaaStatement]
+        Raw statements of the model (without exact copies).
+    stnames : Optional[set[str]]
+        Names of the search terms of the model.
+    state : Optional[emmaa.incremental_assembly.AssemblyState]
+        The state of the previous assembly. If not given, a full assembly
+        is run.
+    full_rebuild : Optional[bool]
+        If True, the state is not used and a full assembly is run.
+        Default: False.
+    full_rebuild_days : Optional[int]
+        The number of days after which a full assembly is run regardless of
+        the state (e.g. to pick up changes in the resources of grounding
+        steps). Default: 7.
+
+    Returns
+    -------
+    assembled_stmts : list[indra.statements.Statement]
+        The assembled statements.
+    state : emmaa.incremental_assembly.AssemblyState
+        The state of this assembly.
+    """
+    prefix, rest = split_pipeline(steps)
+    fingerprint = get_pipeline_fingerprint(steps, stnames)
+    if state is not None and not full_rebuild:
+        if state.fingerprint != fingerprint:
+            logger.info('Assembly pipeline changed since the previous '
+                        'assembly.')
+            state = None
+        elif state.get_age() > timedelta(days=full_rebuild_days):
+            logger.info(f'Last full assembly was more than '
+                        f'{full_rebuild_days} days ago.')
+            state = None
+    if full_rebuild or state is None:
+        logger.info('Running a full assembly.')
+        state = AssemblyState(fingerprint, make_date_str())
+    raw_hashes = [estmt.get_hash() for estmt in estmts]
+    new_ixs = [ix for ix, raw_hash in enumerate(raw_hashes)
+               if raw_hash not in state.prefix_outputs]
+    logger.info(f'Running {len(prefix)} statement-wise steps on '
+                f'{len(new_ixs)} out of {len(estmts)} raw statements.')
+    new_outputs = run_statementwise_steps(
+        prefix, [estmts[ix].stmt for ix in new_ixs], stnames)
+    if new_outputs is None:
+        logger.info('Running the full assembly pipeline without a state.')
+        # The raw statements of the model are not modified by the steps
+        stmts = fast_deepcopy([estmt.stmt for estmt in estmts])
+        assembled_stmts = AssemblyPipeline(steps).run(stmts, stnames=stnames)
+        return assembled_stmts, None
+    # Outputs of raw statements that were removed from the model are dropped
+    prefix_outputs = {raw_hash: state.prefix_outputs[raw_hash]
+                      for raw_hash in raw_hashes
+                      if raw_hash in state.prefix_outputs}
+    for ix, outputs in zip(new_ixs, new_outputs):
+        prefix_outputs[raw_hashes[ix]] = outputs
+    stmts = [stmt for raw_hash in raw_hashes
+             for stmt in prefix_outputs[raw_hash]]
+    # Stored outputs have to stay unchanged by the rest of the pipeline
+    # (preassembly works on copies of its input statements)
+    if rest and rest[0]['function'] != 'run_preassembly':
+        stmts = fast_deepcopy(stmts)
+    refinements = {}
+    ap = AssemblyPipeline(rest)
+    for ix, step in enumerate(ap.steps):
+        if is_refinement_step(step):
+            known = state.refinements.get(ix)
+            if known:
+                step = dict(step)
+                step['kwargs'] = dict(step.get('kwargs', {}))
+                step['kwargs']['filters'] = [
+                    OntologyRefinementFilter(ontology=bio_ontology),
+                    KnownRefinementsFilter(*known)]
+            stmts = ap.run_function(step, stmts, stnames=stnames)
+            refinements[ix] = get_refinements(stmts)
+        else:
+            stmts = ap.run_function(step, stmts, stnames=stnames)
+    return stmts, AssemblyState(fingerprint, state.full_build_date_str,
+                                prefix_outputs, refinements)
+
+
+def save_assembly_state_to_s3(model_name, state, date_str,
+                              bucket=EMMAA_BUCKET_NAME):
+    """Save the state of a model assembly to S3."""
+    key = f'assembled/{model_name}/assembly_state_{date_str}.pkl'
+    logger.info(f'Saving the assembly state to {key}')
+    save_pickle_to_s3(state, bucket, key)
+
+
+def load_assembly_state_from_s3(model_name, bucket=EMMAA_BUCKET_NAME):
+    """Load the latest state of a model assembly from S3 if there is one."""
+    key = find_latest_s3_file(bucket, f'assembled/{model_name}/'
+                                      f'assembly_state_', '.pkl')
+    if not key:
+        logger.info(f'No assembly state found for {model_name}.')
+        return None
+    logger.info(f'Loading the assembly state from {key}')
+    return load_pickle_from_s3(bucket, key)
@@ -1,5 +1,8 @@
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, \
+    as_completed
 from copy import deepcopy
+import multiprocessing
 import time
 import logging
 import datetime
@@ -13,7 +16,7 @@ from indra.assemblers.cx import CxAssembler
 from indra.assemblers.pysb import PysbAssembler
 from indra.assemblers.pysb.sites import states
 from indra.assemblers.pybel import PybelAssembler
-from indra.assemblers.indranet import IndraNetAssembler
+from indra.assemblers.indranet import IndraNetAssembler, IndraNet
 from indra.statements import stmts_from_json, Agent, ModCondition, \
     RegulateActivity, RegulateAmount, Modification, ActivityCondition
 from indra.mechlinker import MechLinker
@@ -22,6 +25,7 @@ from indra.tools.assemble_corpus import filter_grounded_only, run_preassembly
 from indra.sources.indra_db_rest import get_statements_by_hash
 from indra.sources.minerva import process_from_web
 from indra.explanation.reporting import stmt_from_rule
+from indra.util import fast_deepcopy
 from indra_db.client.principal.curation import get_curations
 from indra_db.client import HasHash
 from indra_db.util import get_db, _get_trids
@@ -33,12 +37,23 @@ from emmaa.util import make_date_str, find_latest_s3_file, strip_out_date, \
     save_pickle_to_s3, load_json_from_s3, save_json_to_s3, \
     load_gzip_json_from_s3, get_s3_client
 from emmaa.statements import to_emmaa_stmts, is_internal
+from emmaa.incremental_assembly import run_incremental_assembly, \
+    load_assembly_state_from_s3, save_assembly_state_to_s3
 
 
 logger = logging.getLogger(__name__)
 register_pipeline(get_curations)
 
 
+# Methods of EmmaaModel assembling each type of model
+ASSEMBLERS = {
+    'pysb': 'assemble_pysb',
+    'pybel': 'assemble_pybel',
+    'signed_graph': 'assemble_signed_graph',
+    'unsigned_graph': 'assemble_unsigned_graph',
+    'dynamic': 'assemble_dynamic_pysb'}
+
+
 class EmmaaModel(object):
     """Represents an EMMAA model.
 
@@ -85,8 +100,16 @@ class EmmaaModel(object):
         self.human_readable_name = None
         self.export_formats = []
         self._load_config(config)
-        self.assembled_stmts = []
+        # The version of assembled statements is increased whenever they are
+        # set and is 0 if the statements have never been assembled
+        self._assembled_stmts = []
+        self._assembled_version = 0
+        # A function loading stored assembled statements when they are
+        # first used
+        self._assembled_stmts_loader = None
         self.dynamic_assembled_stmts = []
+        self._indranet_cache = None
+        self._assembly_state = None
         if paper_ids:
             self.paper_ids = set(paper_ids)
         else:
@@ -312,12 +335,12 @@ class EmmaaModel(object):
 
     def extend_unique(self, estmts):
         """Extend model statements only if it is not already there."""
-        source_hashes = {est.stmt.get_hash(shallow=False, refresh=True)
-                         for est in self.stmts}
+        source_hashes = {est.get_hash() for est in self.stmts}
         len_before = len(self.stmts)
         for estmt in estmts:
-            if estmt.stmt.get_hash(shallow=False, refresh=True) not in \
-                    source_hashes:
+            stmt_hash = estmt.get_hash()
+            if stmt_hash not in source_hashes:
+                source_hashes.add(stmt_hash)
                 self.stmts.append(estmt)
         len_after = len(self.stmts)
         logger.info('Extended EMMAA Statements by %d new Statements' %
@@ -447,28 +470,93 @@ class EmmaaModel(object):
         logger.info(f'Got {len(paper_ids)} {main_id_type}s from statements')
         return paper_ids
 
+    @property
+    def assembled_stmts(self):
+        """The assembled INDRA Statements of the model."""
+        if self._assembled_stmts_loader is not None:
+            loader = self._assembled_stmts_loader
+            self._assembled_stmts_loader = None
+            self._assembled_stmts = loader()
+        return self._assembled_stmts
+
+    @assembled_stmts.setter
+    def assembled_stmts(self, stmts):
+        self._assembled_stmts = stmts
+        self._assembled_stmts_loader = None
+        self._assembled_version += 1
+
+    def set_assembled_stmts_loader(self, loader):
+        """Set a function to load the assembled statements with when they
+        are first used.
+
+        Parameters
+        ----------
+        loader : function
+            A function that takes no arguments and returns a list of
+            assembled INDRA Statements.
+        """
+        self._assembled_stmts = []
+        self._assembled_stmts_loader = loader
+        self._assembled_version += 1
+
+    def _assemble_if_needed(self):
+        # Statements are assembled only once even if assembly returns no
+        # statements
+        if not self._assembled_version:
+            self.run_assembly()
+
     def eliminate_copies(self):
         """Filter out exact copies of the same Statement."""
         logger.info('Starting with %d raw EmmaaStatements' % len(self.stmts))
-        self.stmts = list({estmt.stmt.get_hash(shallow=False, refresh=True):
-                           estmt for estmt in self.stmts}.values())
+        self.stmts = list({estmt.get_hash(): estmt
+                           for estmt in self.stmts}.values())
         logger.info(('Continuing with %d raw EmmaaStatements'
                      ' that are not exact copies') % len(self.stmts))
 
-    def run_assembly(self):
-        """Run INDRA's assembly pipeline on the Statements."""
+    def run_assembly(self, full_rebuild=False):
+        """Run INDRA's assembly pipeline on the Statements.
+
+        If incremental assembly is enabled in the assembly config, the
+        state of the previous assembly (if loaded) is reused and the state
+        of this assembly is kept to be saved with save_assembly_state.
+
+        Parameters
+        ----------
+        full_rebuild : Optional[bool]
+            If True, the state of the previous assembly is not reused.
+            Default: False.
+        """
         from indra_world.belief import get_eidos_scorer
         from indra_world.ontology import load_world_ontology
         self.eliminate_copies()
-        stmts = self.get_indra_stmts()
         stnames = {s.name for s in self.search_terms}
+        incremental = self.assembly_config.get('incremental')
+        if incremental:
+            kwargs = incremental if isinstance(incremental, dict) else {}
+            self.assembled_stmts, self._assembly_state = \
+                run_incremental_assembly(
+                    self.assembly_config['main'], self.stmts, stnames,
+                    state=getattr(self, '_assembly_state', None),
+                    full_rebuild=full_rebuild, **kwargs)
+            return
+        # Some of the steps modify their input statements in place so they
+        # are run on copies to keep the raw statements and their cached
+        # hashes unchanged
+        stmts = fast_deepcopy(self.get_indra_stmts())
         ap = AssemblyPipeline(self.assembly_config['main'])
         self.assembled_stmts = ap.run(stmts, stnames=stnames)
 
+    def save_assembly_state(self, bucket=EMMAA_BUCKET_NAME):
+        """Save the state of the last incremental assembly to S3."""
+        state = getattr(self, '_assembly_state', None)
+        if state is None:
+            logger.info('No assembly state to save.')
+            return
+        save_assembly_state_to_s3(self.name, state, self.date_str, bucket)
+
     def update_to_ndex(self):
         """Update assembled model as CX on NDEx, updates existing network."""
-        if not self.assembled_stmts:
-            self.run_assembly()
+        self._assemble_if_needed()
         cxa = CxAssembler(self.assembled_stmts, network_name=self.name)
         cxa.make_model()
         cx_str = cxa.print_cx()
@@ -476,8 +564,7 @@ class EmmaaModel(object):
 
     def upload_to_ndex(self):
         """Upload the assembled model as CX to NDEx, creates new network."""
-        if not self.assembled_stmts:
-            self.run_assembly()
+        self._assemble_if_needed()
         cxa = CxAssembler(self.assembled_stmts, network_name=self.name)
         cxa.make_model()
         model_uuid = cxa.upload_model()
@@ -526,6 +613,9 @@ class EmmaaModel(object):
         em.stmts = stmts
         if not paper_ids:
             em.paper_ids = em.get_paper_ids_from_stmts(stmts)
+        if em.assembly_config.get('incremental'):
+            em._assembly_state = load_assembly_state_from_s3(model_name,
+                                                             bucket)
         return em
 
     def get_entities(self):
@@ -538,8 +628,7 @@ class EmmaaModel(object):
 
     def get_assembled_entities(self):
         """Return a list of Agent objects that the assembled model contains."""
-        if not self.assembled_stmts:
-            self.run_assembly()
+        self._assemble_if_needed()
         agents = []
         for stmt in self.assembled_stmts:
             agents += [a for a in stmt.agent_list() if a is not None]
@@ -547,91 +636,154 @@ class EmmaaModel(object):
 
     def assemble_pysb(self, mode='local', bucket=EMMAA_BUCKET_NAME):
         """Assemble the model into PySB and return the assembled model."""
-        if not self.assembled_stmts:
-            self.run_assembly()
+        self._assemble_if_needed()
         pa = PysbAssembler()
         pa.add_statements(self.assembled_stmts)
         pysb_model = pa.make_model()
         if mode == 's3':
-            for exp_f in self.export_formats:
-                if exp_f not in {'sbml', 'kappa', 'kappa_im', 'kappa_cm',
-                                 'bngl', 'sbgn', 'pysb_flat'}:  # , 'gromet'}:
-                    continue
-                elif exp_f == 'gromet':
-                    # fixme: this does not run currently
-                    # Export gromet here if there's no separate "dynamic" pysb
-                    if 'dynamic' not in self.assembly_config:
-                        fname = f'gromet_{self.date_str}.json'
-                        try:
-                            pysb_to_gromet(pysb_model, self.name,
-                                           self.assembled_stmts, fname)
-                        except Exception as e:
-                            logger.info(e)
-                            logger.info('Could not export to GroMEt')
-                            continue
-                else:
-                    fname = f'{exp_f}_{self.date_str}.{exp_f}'
-                    pa.export_model(exp_f, fname)
-                logger.info(f'Uploading {fname}')
-                client = get_s3_client(unsigned=False)
-                client.upload_file(fname, bucket,
-                                   f'exports/{self.name}/{fname}')
+            self.export_pysb(pysb_model, bucket=bucket)
         return pysb_model
 
+    def export_pysb(self, pysb_model, bucket=EMMAA_BUCKET_NAME):
+        """Export the PySB model into the model's export formats and upload
+        them to S3."""
+        pa = PysbAssembler()
+        pa.model = pysb_model
+        for exp_f in self.export_formats:
+            if exp_f not in {'sbml', 'kappa', 'kappa_im', 'kappa_cm',
+                             'bngl', 'sbgn', 'pysb_flat'}:  # , 'gromet'}:
+                continue
+            elif exp_f == 'gromet':
+                # fixme: this does not run currently
+                # Export gromet here if there's no separate "dynamic" pysb
+                if 'dynamic' not in self.assembly_config:
+                    fname = f'gromet_{self.date_str}.json'
+                    try:
+                        pysb_to_gromet(pysb_model, self.name,
+                                       self.assembled_stmts, fname)
+                    except Exception as e:
+                        logger.info(e)
+                        logger.info('Could not export to GroMEt')
+                        continue
+            else:
+                fname = f'{exp_f}_{self.date_str}.{exp_f}'
+                pa.export_model(exp_f, fname)
+            self._upload_export(fname, bucket)
+
     def assemble_pybel(self, mode='local', bucket=EMMAA_BUCKET_NAME):
         """Assemble the model into PyBEL and return the assembled model."""
-        if not self.assembled_stmts:
-            self.run_assembly()
+        self._assemble_if_needed()
         pba = PybelAssembler(self.assembled_stmts)
         pybel_model = pba.make_model()
-        if mode == 's3' and 'pybel' in self.export_formats:
-            fname = f'pybel_{self.date_str}.bel.nodelink.json.gz'
-            pybel.dump(pybel_model, fname)
-            logger.info(f'Uploading {fname}')
-            client = get_s3_client(unsigned=False)
-            client.upload_file(fname, bucket, f'exports/{self.name}/{fname}')
+        if mode == 's3':
+            self.export_pybel(pybel_model, bucket=bucket)
         return pybel_model
 
+    def export_pybel(self, pybel_model, bucket=EMMAA_BUCKET_NAME):
+        """Export the PyBEL model to node-link JSON and upload it to S3."""
+        if 'pybel' not in self.export_formats:
+            return
+        fname = f'pybel_{self.date_str}.bel.nodelink.json.gz'
+        pybel.dump(pybel_model, fname)
+        self._upload_export(fname, bucket)
+
     def assemble_signed_graph(self, mode='local', bucket=EMMAA_BUCKET_NAME):
         """Assemble the model into signed graph and return the assembled graph.
         """
-        if not self.assembled_stmts:
-            self.run_assembly()
-        ia = IndraNetAssembler(self.assembled_stmts)
-        method = self.test_config.get('indranet_method', 'preassembly')
-        signed_graph = ia.make_model(
-            method=method,
-            graph_type='signed',
-            extra_columns=[('internal', is_internal)],
-            keep_self_loops=False)
-        if mode == 's3' and 'indranet' in self.export_formats:
-            fname = f'indranet_{self.date_str}.tsv'
-            df = ia.make_df()
-            df.to_csv(fname, sep='\t', index=False)
-            logger.info(f'Uploading {fname}')
-            client = get_s3_client(unsigned=False)
-            client.upload_file(fname, bucket, f'exports/{self.name}/{fname}')
+        signed_graph = self._make_indranet_graph('signed')
+        if mode == 's3':
+            self.export_indranet(bucket=bucket)
         return signed_graph
 
+    def export_indranet(self, bucket=EMMAA_BUCKET_NAME):
+        """Export the assembled statements as an IndraNet TSV table and upload
+        it to S3."""
+        if 'indranet' not in self.export_formats:
+            return
+        fname = f'indranet_{self.date_str}.tsv'
+        # The export does not include the internal column used by the graphs
+        df = self.get_indranet_df().drop(columns=['internal'])
+        df.to_csv(fname, sep='\t', index=False)
+        self._upload_export(fname, bucket)
+
     def assemble_unsigned_graph(self, **kwargs):
         """Assemble the model into unsigned graph and return the assembled
         graph."""
-        if not self.assembled_stmts:
-            self.run_assembly()
-        ia = IndraNetAssembler(self.assembled_stmts)
+        return self._make_indranet_graph('digraph')
+
+    def get_indranet_assembler(self):
+        """Return an IndraNetAssembler over the assembled statements.
+
+        The assembler, the internal flags of statements and the IndraNet
+        dataframe are shared by the signed and unsigned graph assembly and
+        the IndraNet export, and are rebuilt when assembled statements
+        change.
+        """
+        self._assemble_if_needed()
+        key = self._assembled_version
+        cache = getattr(self, '_indranet_cache', None)
+        if cache is None or cache['key'] != key:
+            cache = {'key': key,
+                     'assembler': IndraNetAssembler(self.assembled_stmts),
+                     'internal': {},
+                     'df': None}
+            self._indranet_cache = cache
+        return cache['assembler']
+
+    def get_indranet_df(self):
+        """Return a dataframe of IndraNet edges of the assembled statements.
+
+        The dataframe keeps self-loops (they are filtered out when making
+        graphs) and has an extra column showing whether the statement is
+        internal to the model.
+        """
+        ia = self.get_indranet_assembler()
+        cache = self._indranet_cache
+        if cache['df'] is None:
+            cache['df'] = ia.make_df(
+                extra_columns=[('internal', self._is_internal)])
+        return cache['df']
+
+    def prepare_indranet(self):
+        """Run the IndraNet steps shared by all graph types.
+
+        This is useful before assembling the graphs in separate processes
+        so that each of them does not have to repeat these steps.
+        """
+        ia = self.get_indranet_assembler()
+        if self.test_config.get('indranet_method', 'preassembly') == 'df':
+            self.get_indranet_df()
+        else:
+            for stmt in ia.statements:
+                self._is_internal(stmt)
+
+    def _is_internal(self, stmt):
+        # Statements are kept by the cached assembler so their ids are stable
+        internal = self._indranet_cache['internal']
+        stmt_id = id(stmt)
+        if stmt_id not in internal:
+            internal[stmt_id] = is_internal(stmt)
+        return internal[stmt_id]
+
+    def _make_indranet_graph(self, graph_type):
+        ia = self.get_indranet_assembler()
         method = self.test_config.get('indranet_method', 'preassembly')
-        unsigned_graph = ia.make_model(
+        if method == 'df':
+            df = self.get_indranet_df()
+            df = df[df['agA_name'] != df['agB_name']]
+            if graph_type == 'signed':
+                return IndraNet.signed_from_df(df)
+            return IndraNet.digraph_from_df(df)
+        return ia.make_model(
             method=method,
-            graph_type='digraph',
-            extra_columns=[('internal', is_internal)],
+            graph_type=graph_type,
+            extra_columns=[('internal', self._is_internal)],
             keep_self_loops=False)
-        return unsigned_graph
 
     def assemble_dynamic_pysb(self, mode='local', bucket=EMMAA_BUCKET_NAME):
         """Assemble a version of a PySB model for dynamic simulation."""
         # First need to run regular assembly
-        if not self.assembled_stmts:
-            self.run_assembly()
+        self._assemble_if_needed()
         if 'dynamic' in self.assembly_config:
             logger.info('Assembling dynamic PySB model')
             ap = AssemblyPipeline(self.assembly_config['dynamic'])
@@ -641,21 +793,113 @@ class EmmaaModel(object):
             pa = PysbAssembler()
             pa.add_statements(self.dynamic_assembled_stmts)
             pysb_model = pa.make_model()
-            if mode == 's3' and 'gromet' in self.export_formats:
-                fname = f'gromet_{self.date_str}.json'
-                try:
-                    pysb_to_gromet(pysb_model, self.name,
-                                   self.dynamic_assembled_stmts, fname)
-                    logger.info(f'Uploading {fname}')
-                    client = get_s3_client(unsigned=False)
-                    client.upload_file(fname, bucket,
-                                       f'exports/{self.name}/{fname}')
-                except Exception as e:
-                    logger.info(e)
-                    logger.info('Could not export to GroMEt')
+            if mode == 's3':
+                self.export_dynamic_pysb(pysb_model, bucket=bucket)
             return pysb_model
         logger.info('Did not find dynamic assembly steps')
 
+    def export_dynamic_pysb(self, pysb_model, bucket=EMMAA_BUCKET_NAME):
+        """Export the dynamic PySB model to GroMEt and upload it to S3."""
+        if 'gromet' not in self.export_formats:
+            return
+        fname = f'gromet_{self.date_str}.json'
+        try:
+            pysb_to_gromet(pysb_model, self.name,
+                           self.dynamic_assembled_stmts, fname)
+            self._upload_export(fname, bucket)
+        except Exception as e:
+            logger.info(e)
+            logger.info('Could not export to GroMEt')
+
+    def _upload_export(self, fname, bucket):
+        logger.info(f'Uploading {fname}')
+        client = get_s3_client(unsigned=False)
+        client.upload_file(fname, bucket, f'exports/{self.name}/{fname}')
+
+    def assemble_all(self, mc_types=None, mode='local',
+                     bucket=EMMAA_BUCKET_NAME, n_proc=None):
+        """Assemble the model into several targets in parallel.
+
+        Each assembler runs in its own worker process on the same assembled
+        statements. In 's3' mode, the exports of each target are generated
+        and uploaded in background threads as soon as its model is
+        assembled, so the total time is bounded by the slowest assembler
+        rather than by the sum of all of them.
+
+        Parameters
+        ----------
+        mc_types : Optional[list[str]]
+            A list of model types to assemble (from 'pysb', 'pybel',
+            'signed_graph', 'unsigned_graph', 'dynamic'). By default, all
+            types are assembled.
+        mode : Optional[str]
+            If 's3', the exports are uploaded to S3. Default: 'local'.
+        bucket : Optional[str]
+            The S3 bucket to upload the exports to.
+        n_proc : Optional[int]
+            The number of worker processes. By default, one process per
+            model type is used.
+
+        Returns
+        -------
+        assembled_models : dict
+            A dictionary mapping a model type to an assembled model.
+        assembly_times : dict
+            A dictionary mapping a model type to the time in seconds it took
+            to assemble the model of this type.
+        """
+        global _assembly_model
+        # Statements are assembled once and shared with forked workers
+        self._assemble_if_needed()
+        mc_types = list(mc_types) if mc_types else list(ASSEMBLERS)
+        if {'signed_graph', 'unsigned_graph'} <= set(mc_types):
+            self.prepare_indranet()
+        n_proc = min(n_proc or len(mc_types), len(mc_types))
+        logger.info(f'Assembling {", ".join(mc_types)} models in '
+                    f'{n_proc} processes.')
+        assembled_models = {}
+        assembly_times = {}
+        exports = []
+        _assembly_model = self
+        try:
+            with ThreadPoolExecutor(max_workers=len(mc_types)) as \
+                    export_pool, ProcessPoolExecutor(
+                        max_workers=n_proc,
+                        mp_context=multiprocessing.get_context('fork')) \
+                    as pool:
+                futures = {pool.submit(_assemble_worker, mc_type): mc_type
+                           for mc_type in mc_types}
+                for future in as_completed(futures):
+                    mc_type = futures[future]
+                    assembled_model, dynamic_stmts, elapsed = \
+                        future.result()
+                    logger.info(f'Assembled the {mc_type} model in '
+                                f'{elapsed:.2f} seconds.')
+                    assembled_models[mc_type] = assembled_model
+                    assembly_times[mc_type] = elapsed
+                    if mc_type == 'dynamic' and dynamic_stmts is not None:
+                        self.dynamic_assembled_stmts = dynamic_stmts
+                    if mode == 's3' and assembled_model is not None:
+                        exports.append(export_pool.submit(
+                            self._export_model, mc_type, assembled_model,
+                            bucket))
+                # Wait for all uploads to finish and raise their errors
+                for export in exports:
+                    export.result()
+        finally:
+            _assembly_model = None
+        return assembled_models, assembly_times
+
+    def _export_model(self, mc_type, assembled_model, bucket):
+        if mc_type == 'pysb':
+            self.export_pysb(assembled_model, bucket=bucket)
+        elif mc_type == 'pybel':
+            self.export_pybel(assembled_model, bucket=bucket)
+        elif mc_type == 'signed_graph':
+            self.export_indranet(bucket=bucket)
+        elif mc_type == 'dynamic':
+            self.export_dynamic_pysb(assembled_model, bucket=bucket)
+
     def to_json(self):
         """Convert the model into a json dumpable dictionary"""
         logger.info('Converting a model to JSON')
@@ -666,11 +910,44 @@ class EmmaaModel(object):
                        'stmts': [st.to_json() for st in self.stmts]}
         return json_output
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The IndraNet cache is rebuilt when needed and should not be stored
+        state.pop('_indranet_cache', None)
+        # The assembly state is stored separately (see save_assembly_state)
+        state.pop('_assembly_state', None)
+        return state
+
+    def __setstate__(self, state):
+        # Models pickled before the version of assembled statements was kept
+        if 'assembled_stmts' in state:
+            stmts = state.pop('assembled_stmts')
+            state['_assembled_stmts'] = stmts
+            state['_assembled_version'] = 1 if stmts else 0
+        state.setdefault('_assembled_stmts_loader', None)
+        self.__dict__.update(state)
+        self._indranet_cache = None
+        self._assembly_state = None
+
     def __repr__(self):
         return "EmmaModel(%s, %d stmts, %d search terms)" % \
                    (self.name, len(self.stmts), len(self.search_terms))
 
 
+# Model assembled in parallel, inherited by forked assembly workers
+_assembly_model = None
+
+
+def _assemble_worker(mc_type):
+    # Assemble locally in the worker, exports are done by the parent
+    start = time.time()
+    assembled_model = getattr(_assembly_model, ASSEMBLERS[mc_type])(
+        mode='local')
+    dynamic_stmts = _assembly_model.dynamic_assembled_stmts \
+        if mc_type == 'dynamic' else None
+    return assembled_model, dynamic_stmts, time.time() - start
+
+
 @register_pipeline
 def filter_relevance(stmts, stnames, policy=None):
     """Filter a list of Statements to ones matching a search term."""
@@ -1,11 +1,27 @@
 """This module implements the object model for EMMAA model testing."""
 import logging
 import itertools
+import hashlib
+import heapq
+import json
 import jsonpickle
+import multiprocessing
+import networkx as nx
 import os
+import pickle
 import sys
-from collections import defaultdict
+import tempfile
+import threading
+import time
+from collections import defaultdict, OrderedDict
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from functools import lru_cache, partial
 from fnvhash import fnv1a_32
+from pysb.bng import generate_equations
+from pysb.core import ComponentSet, Model
+from pysb.pattern import SpeciesPatternMatcher
 from urllib import parse
 from copy import deepcopy
 from indra.explanation.model_checker import PysbModelChecker, \
@@ -13,13 +29,14 @@ from indra.explanation.model_checker import PysbModelChecker, \
 from indra.explanation.reporting import stmts_from_pysb_path, \
     stmts_from_pybel_path, stmts_from_indranet_path, PybelEdge, \
     pybel_edge_to_english, RefEdge
-from indra.explanation.pathfinding import bfs_search_multiple_nodes
+from indra.explanation.pathfinding import bfs_search
 from indra.assemblers.english.assembler import EnglishAssembler
-from indra.statements import Statement, Agent, stmts_to_json
+from indra.statements import Statement, Agent, Complex, stmts_to_json
 from indra.util.statement_presentation import group_and_sort_statements, \
     make_string_from_relation_key
 from indra.ontology.bio import bio_ontology
-from bioagents.tra.tra import TRA, MissingMonomerError, MissingMonomerSiteError
+from bioagents.tra.tra import TRA, MissingMonomerError, \
+    MissingMonomerSiteError, get_create_observable
 from emmaa.model import EmmaaModel, get_assembled_statements, \
     load_config_from_s3
 from emmaa.statements import filter_indra_stmts_by_metadata
@@ -28,8 +45,18 @@ from emmaa.queries import PathProperty, DynamicProperty, OpenSearchQuery, \
 from emmaa.util import make_date_str, get_s3_client, \
     EMMAA_BUCKET_NAME, find_latest_s3_file, load_pickle_from_s3, \
     save_pickle_to_s3, load_json_from_s3, save_json_to_s3, strip_out_date, \
-    save_gzip_json_to_s3
-from emmaa.filter_functions import node_filter_functions, edge_filter_functions
+    save_gzip_json_to_s3, load_jsonl_from_s3, sort_s3_files_by_date_str, \
+    S3StreamWriter, copy_s3_object, s3_put, timed_phase, phase_timings, \
+    save_phase_timings_to_s3
+from emmaa.filter_functions import node_filter_functions, \
+    edge_filter_functions, get_excluded_nodes, get_filtered_graph
+from emmaa.compact_graph import CompactGraph, load_compact_graph_from_s3
+from emmaa.reachability import ReachabilityIndex
+from emmaa.path_engine import GraphPathEngine, find_model_checker_paths
+from emmaa.results_format import path_result_to_row, \
+    make_compact_results, CompactResultsWriter, JsonLinesWriter, \
+    iter_compact_rows, get_results_header, get_results_tests, \
+    get_path_results
 from emmaa.db import get_db
 
 
@@ -63,6 +90,22 @@ ARROW_DICT = {'Complex': u"\u2194",
 # available model type will be used)
 MODEL_TYPES = {'path': ['pysb', 'pybel', 'signed_graph', 'unsigned_graph'],
                'simulation': ['dynamic', 'pysb']}
+# Maximum number of ModelChecker graphs cached by a ModelManager
+GRAPH_CACHE_SIZE = 10
+# Model types that are stored as compact graph artifacts next to the
+# pickled ModelManager
+COMPACT_GRAPH_TYPES = ['signed_graph', 'unsigned_graph']
+# Version of the format of stored PySB influence maps, included in their
+# content hash
+INFLUENCE_MAP_VERSION = 2
+# Version of the split format ModelManagers are saved in
+MODEL_MANAGER_FORMAT_VERSION = 1
+# Attributes of INDRA Statements that don't change what is checked
+STMT_META_ATTRS = {'evidence', 'supports', 'supported_by', 'belief', 'uuid',
+                   '_full_hash', '_shallow_hash'}
+# Names of the sets of components of a PySB model
+COMPONENT_SET_NAMES = [component_type.__name__.lower() + 's'
+                       for component_type in Model._component_types]
 
 
 class ModelManager(object):
@@ -75,16 +118,30 @@ class ModelManager(object):
     mode : str
         If 'local' (default), does not save any exports/images to S3. It is
         only set to 's3' mode in update_model_manager.py script.
+    assembled_models : Optional[dict]
+        A dictionary mapping a type of a ModelChecker to an already assembled
+        model (e.g. loaded from a compact graph artifact) to use instead of
+        assembling it from statements.
+    lazy : Optional[bool]
+        If True (default), the model of each type is only assembled when its
+        entry in mc_types is first accessed. If False, all models are
+        assembled when the ModelManager is created.
+    parallel_assembly : Optional[bool]
+        If True and lazy is False, the models of all types are assembled
+        in parallel worker processes. Default: False.
 
     Attributes
     ----------
     mc_mapping : dict
         A dictionary mapping a ModelChecker type to a corresponding method
         for assembling the model and a ModelChecker class.
-    mc_types : dict
+    mc_types : emmaa.model_tests.LazyModelTypes
         A dictionary in which each key is a type of a ModelChecker and value is
         a dictionary containing an instance of a model, an instance of a
         ModelChecker and a list of test results.
+    assembly_times : dict
+        A dictionary mapping a type of a ModelChecker to the time in seconds
+        it took to assemble the model of this type.
     entities : list[indra.statements.agent.Agent]
         A list of entities of EMMAA model.
     applicable_tests : list[emmaa.model_tests.EmmaaTest]
@@ -94,7 +151,8 @@ class ModelManager(object):
     path_stmt_types : dict
         A dictionary mapping statement hashes to a count of paths they are in.
     """
-    def __init__(self, model, mode='local'):
+    def __init__(self, model, mode='local', assembled_models=None,
+                 lazy=True, parallel_assembly=False):
         self.model = model
         self.mode = mode
         self.mc_mapping = {
@@ -109,19 +167,148 @@ class ModelManager(object):
                                UnsignedGraphModelChecker,
                                stmts_from_indranet_path),
             'dynamic': (self.model.assemble_dynamic_pysb, None, None)}
-        self.mc_types = {}
-        for mc_type in model.test_config.get('mc_types', ['pysb']):
-            self.mc_types[mc_type] = {}
-            assembled_model = self.mc_mapping[mc_type][0](mode=mode)
-            self.mc_types[mc_type]['model'] = assembled_model
-            if mc_type in MODEL_TYPES['path']:
-                self.mc_types[mc_type]['model_checker'] = (
-                    self.mc_mapping[mc_type][1](assembled_model))
-            self.mc_types[mc_type]['test_results'] = []
+        self._assembled_models = dict(assembled_models) \
+            if assembled_models else {}
+        self.assembly_times = {}
+        # Separately stored components of a ModelManager loaded from S3
+        self._components = None
+        self.mc_types = LazyModelTypes(
+            model.test_config.get('mc_types', ['pysb']),
+            self._assemble_mc_type)
+        if not lazy:
+            self.assemble_models(parallel=parallel_assembly)
         self.entities = self.model.get_assembled_entities()
         self.applicable_tests = []
         self.date_str = self.model.date_str
         self.path_stmt_counts = defaultdict(int)
+        # Reachability indexes of ModelChecker graphs are stored with the
+        # ModelManager
+        self.reachability_indexes = OrderedDict()
+        self._init_caches()
+
+    def set_components(self, components):
+        """Set the separately stored components to load models, assembled
+        statements and paper IDs from when they are first used.
+
+        Parameters
+        ----------
+        components : emmaa.model_tests.ModelManagerComponents
+            Components of the ModelManager stored on S3.
+        """
+        self._components = components
+        if components.has_assembled_stmts():
+            self.model.set_assembled_stmts_loader(
+                components.load_assembled_stmts)
+
+    def get_paper_ids(self):
+        """Return the paper IDs of the model, loading them if needed."""
+        if self.model.paper_ids is None:
+            paper_ids = self._components.load_paper_ids() \
+                if self._components else []
+            self.model.paper_ids = set(paper_ids)
+        return self.model.paper_ids
+
+    def _assemble_mc_type(self, mc_type):
+        """Return the mc_types entry with an assembled model of a given type.
+        """
+        logger.info(f'Assembling the {mc_type} model.')
+        start = time.time()
+        with timed_phase(f'assembly.{mc_type}'):
+            assembled_model = self._assembled_models.pop(mc_type, None)
+            if assembled_model is None and self._components is not None:
+                assembled_model = self._components.load_model(mc_type)
+            if assembled_model is None:
+                assembled_model = self.mc_mapping[mc_type][0](mode=self.mode)
+            mc_type_entry = {'model': assembled_model}
+            if mc_type in MODEL_TYPES['path']:
+                mc_type_entry['model_checker'] = (
+                    self.mc_mapping[mc_type][1](assembled_model))
+        mc_type_entry['test_results'] = []
+        self.assembly_times[mc_type] = time.time() - start
+        logger.info(f'Assembled the {mc_type} model in '
+                    f'{self.assembly_times[mc_type]:.2f} seconds.')
+        return mc_type_entry
+
+    def assemble_models(self, mc_types=None, parallel=False):
+        """Assemble the models of given (by default all) types if they were
+        not assembled yet.
+
+        Parameters
+        ----------
+        mc_types : Optional[list[str]]
+            A list of model types to assemble. By default, all types in
+            mc_types are assembled.
+        parallel : Optional[bool]
+            If True, the models that are neither assembled nor provided are
+            assembled in parallel worker processes (exports are uploaded in
+            the background in 's3' mode). Default: False.
+        """
+        mc_types = mc_types if mc_types else list(self.mc_types)
+        parallel_times = {}
+        if parallel:
+            to_assemble = [mc_type for mc_type in mc_types if not
+                           self.mc_types.is_assembled(mc_type) and
+                           mc_type not in self._assembled_models]
+            if to_assemble:
+                assembled_models, parallel_times = self.model.assemble_all(
+                    to_assemble, mode=self.mode)
+                self._assembled_models.update(
+                    {mc_type: assembled_model for mc_type, assembled_model
+                     in assembled_models.items()
+                     if assembled_model is not None})
+        for mc_type in mc_types:
+            self.mc_types[mc_type]
+        # Report the time spent by the workers rather than the time to pick
+        # up an already assembled model
+        self.assembly_times.update(parallel_times)
+
+    def _init_caches(self):
+        # English sentences and evidence links are cached by statement hash
+        self.english_cache = {}
+        self.english_cache_stats = {'hits': 0, 'misses': 0}
+        # Index of assembled statements by hash for path reporting
+        self._stmts_by_hash = None
+        self._stmts_by_hash_key = None
+        # Graphs built by model checkers for reuse between tests and queries
+        self._graph_cache = OrderedDict()
+        self._graph_cache_key = None
+        # Reachability index of the current graph of each ModelChecker
+        self._current_reachability = {}
+        # Versions of assembled statements that reachability indexes were
+        # built or checked for in this process by their key
+        self._reachability_versions = {}
+        # Path engines of graph models if selected in the test config
+        self._path_engines = {}
+        # PySB models prepared for simulation by model date and simulation
+        # settings
+        self._simulation_cache = {}
+        # Number of statements checked with and without a full search
+        self.reachability_stats = {'unreachable': 0, 'searched': 0}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Caches are rebuilt when needed and should not be stored
+        for attr in ('english_cache', 'english_cache_stats',
+                     '_stmts_by_hash', '_stmts_by_hash_key', '_graph_cache',
+                     '_graph_cache_key', '_simulation_cache',
+                     'reachability_stats', '_current_reachability',
+                     '_reachability_versions', '_path_engines',
+                     '_components'):
+            state.pop(attr, None)
+        # Indexes of graphs with filters that can't be pickled are not stored
+        state['reachability_indexes'] = OrderedDict(
+            (key, index) for key, index in
+            self.reachability_indexes.items() if not callable(key[1]))
+        return state
+
+    def __setstate__(self, state):
+        # Model managers pickled before lazy assembly lack these attributes
+        state.setdefault('assembly_times', {})
+        state.setdefault('_assembled_models', {})
+        state.setdefault('reachability_indexes', OrderedDict())
+        state.setdefault('_components', None)
+        self.__dict__.update(state)
+        self._init_caches()
 
     @classmethod
     def load_from_statements(cls, model_name, mode='local', date=None,
@@ -141,27 +328,324 @@ class ModelManager(object):
         stmts, fname = get_assembled_statements(model_name, date, bucket)
         model.assembled_stmts = stmts
         model.date_str = strip_out_date(fname, 'datetime')
-        mm = cls(model, mode=mode)
+        # Compact graphs are used instead of assembling graphs when available
+        assembled_models = {}
+        for mc_type in COMPACT_GRAPH_TYPES:
+            if mc_type in model.test_config.get('mc_types', ['pysb']):
+                assembled_models[mc_type] = load_compact_graph(
+                    model_name, mc_type, model.date_str, bucket=bucket)
+        mm = cls(model, mode=mode, assembled_models=assembled_models)
         return mm
 
+    def load_compact_graphs(self, bucket=EMMAA_BUCKET_NAME):
+        """Set graph models that were not pickled from compact graphs.
+
+        If a compact graph artifact can't be loaded, the graph is assembled
+        from the model's assembled statements.
+        """
+        for mc_type in COMPACT_GRAPH_TYPES:
+            # Models that were not assembled yet are loaded when first used
+            if not self.mc_types.is_assembled(mc_type) or \
+                    self.mc_types[mc_type].get('model') is not None:
+                continue
+            graph = load_compact_graph(self.model.name, mc_type,
+                                       self.date_str, bucket=bucket)
+            if graph is None:
+                logger.info(f'Assembling {mc_type} model from statements')
+                graph = self.mc_mapping[mc_type][0]()
+            self._set_graph_model(mc_type, graph)
+
+    def _set_graph_model(self, mc_type, graph):
+        self.mc_types[mc_type]['model'] = graph
+        mc = self.mc_types[mc_type]['model_checker']
+        mc.model = graph
+        mc.graph = None
+
     def get_updated_mc(self, mc_type, stmts, add_ns=False,
                        edge_filter_func=None):
-        """Update the ModelChecker and graph with stmts for tests/queries."""
+        """Update the ModelChecker and graph with stmts for tests/queries.
+
+        Graphs are cached by model type, edge filter, namespace option and
+        model date (and by the checked statements for PySB since its graph
+        contains observables for them) so that only the statements of the
+        ModelChecker are swapped when a graph was already built.
+        """
         mc = self.mc_types[mc_type]['model_checker']
         mc.statements = stmts
-        if mc_type == 'pysb':
-            mc.graph = None
-            mc.model_stmts = self.model.assembled_stmts
-            mc.get_graph(prune_im=True, prune_im_degrade=True,
-                         add_namespaces=add_ns,
-                         edge_filter_func=edge_filter_func)
+        key = self._get_graph_key(mc_type, stmts, add_ns, edge_filter_func)
+        cached = self._graph_cache.get(key)
+        if cached is not None:
+            logger.info(f'Reusing cached {mc_type} graph.')
+            self._graph_cache.move_to_end(key)
+            self._restore_graph(mc_type, mc, stmts, cached)
         else:
-            mc.graph = None
-            mc.get_graph(edge_filter_func=edge_filter_func)
+            with timed_phase(f'graph_build.{mc_type}'):
+                if mc_type == 'pysb':
+                    mc.graph = None
+                    mc.model_stmts = self.model.assembled_stmts
+                    self._get_pysb_graph(mc, add_ns, edge_filter_func)
+                else:
+                    mc.graph = None
+                    if edge_filter_func:
+                        self._get_filtered_graph(mc, edge_filter_func)
+                    else:
+                        mc.get_graph()
+                self._store_graph(key, mc_type, mc, stmts)
+        self._update_reachability_index(key, mc.graph)
         if mc_type in ('signed_graph', 'unsigned_graph'):
             mc.nodes_to_agents = {ag.name: ag for ag in self.entities}
         return mc
 
+    def _get_pysb_graph(self, mc, add_ns, edge_filter_func):
+        """Build the graph of the PySB ModelChecker from its pruned influence
+        map.
+
+        If the 'influence_map_cache' option is set in the model's test
+        config, the influence map between the rules of the model is loaded
+        from an artifact stored by the content hash of the PySB model (and
+        is only generated if there is no valid artifact). The artifact
+        doesn't depend on the checked statements: the influences of the
+        rules on the observables of the statements are generated for each
+        set of statements (see add_observable_influences) and the
+        influence map is pruned as in PysbModelChecker.get_graph.
+        """
+        if not self.model.test_config.get('influence_map_cache', False):
+            return mc.get_graph(prune_im=True, prune_im_degrade=True,
+                                add_namespaces=add_ns,
+                                edge_filter_func=edge_filter_func)
+        content_hash = get_pysb_content_hash(mc.model, mc.model_stmts)
+        artifact = load_influence_map(self.model.name, content_hash)
+        if artifact is not None and \
+                not is_valid_influence_map(artifact, content_hash, mc.model):
+            logger.warning('The stored influence map is stale, generating '
+                           'it again.')
+            artifact = None
+        if artifact is None:
+            artifact = {'content_hash': content_hash,
+                        'im': make_rule_influence_map(mc)}
+            save_influence_map(self.model.name, content_hash, artifact)
+        else:
+            logger.info('Using the stored influence map.')
+        # The ModelChecker adds observables of the statements to the model
+        # and generates an influence map with them
+        mc.generate_im = partial(add_observable_influences, artifact['im'],
+                                 mc.generate_im)
+        try:
+            return mc.get_graph(prune_im=True, prune_im_degrade=True,
+                                add_namespaces=add_ns,
+                                edge_filter_func=edge_filter_func)
+        finally:
+            del mc.generate_im
+
+    @staticmethod
+    def _get_filtered_graph(mc, edge_filter_func):
+        # The edge filter (or its registered mask) is evaluated once per edge
+        # of the model instead of through a view of the graph
+        model = mc.model
+        mc.model = get_filtered_graph(model, edge_filter_func)
+        try:
+            mc.get_graph()
+        finally:
+            mc.model = model
+        return mc.graph
+
+    def _update_reachability_index(self, graph_key, graph):
+        mc_type, edge_filter_func, add_ns, date_str, stmts_key = graph_key
+        key = (mc_type, _get_function_key(edge_filter_func), add_ns,
+               date_str, stmts_key)
+        index = self.reachability_indexes.get(key)
+        graph_name = f'{mc_type}:{key[1]}:{add_ns}'
+        version = self.model._assembled_version
+        # The graph of a key only changes with the assembled statements so
+        # only indexes restored from a pickle are checked against the graph
+        if index is not None and \
+                self._reachability_versions.get(key) != version and \
+                not index.is_valid_for(graph, graph_name):
+            index = None
+        if index is None:
+            logger.info(f'Building the reachability index of the {mc_type} '
+                        f'graph.')
+            index = ReachabilityIndex(graph, graph_name=graph_name)
+            # Indexes of older model versions are not needed anymore
+            for old_key in list(self.reachability_indexes):
+                if old_key[3] != self.date_str:
+                    self.reachability_indexes.pop(old_key)
+        self._reachability_versions[key] = version
+        self.reachability_indexes[key] = index
+        self.reachability_indexes.move_to_end(key)
+        while len(self.reachability_indexes) > GRAPH_CACHE_SIZE:
+            self.reachability_indexes.popitem(last=False)
+        self._current_reachability[mc_type] = index
+
+    def check_statements(self, mc_type, mc, max_path_length, max_paths,
+                         agent_filter_func=None, edge_filter_func=None,
+                         allow_direct=True):
+        """Check the statements of a ModelChecker updated with
+        get_updated_mc.
+
+        This is equivalent to ModelChecker.check_model, except that a
+        statement is only searched for paths if the reachability index of the
+        graph does not show that there is no path from its subject to its
+        object. Statements that map to the same subject and object nodes
+        (e.g. statements that only differ in evidence) are checked once and
+        share the PathResult. Each statement is processed into subject and
+        object nodes once and the nodes are searched without processing the
+        statement again. If the 'path_engine' option of the model's test
+        config is set to 'csr', signed and unsigned graph paths are searched
+        with emmaa.path_engine.GraphPathEngine instead of the ModelChecker.
+
+        Returns
+        -------
+        list of (Statement, PathResult)
+            Each tuple contains a checked Statement and a PathResult object
+            describing the results of model checking.
+        """
+        index = self._current_reachability.get(mc_type)
+        node_filter_func = self.get_node_filter_func(mc, agent_filter_func)
+        engine = self.get_path_engine(mc_type)
+        if engine is not None:
+            node_mask = engine.get_node_mask(node_filter_func)
+        results = []
+        # Results and reachability stats keys by checking signature
+        checked = {}
+        with timed_phase(f'check_model.{mc_type}'):
+            for stmt in mc.statements:
+                subj_nodes, obj_nodes, result_code = mc.process_statement(stmt)
+                signature = self._get_check_signature(
+                    subj_nodes, obj_nodes, result_code)
+                if signature in checked:
+                    result, stats_key = checked[signature]
+                elif index is not None and not self._may_have_paths(
+                        subj_nodes, obj_nodes, result_code, index):
+                    stats_key = 'unreachable'
+                    result = mc.make_false_result('NO_PATHS_FOUND', max_paths,
+                                                  max_path_length)
+                elif result_code:
+                    stats_key = 'searched'
+                    result = mc.make_false_result(result_code, max_paths,
+                                                  max_path_length)
+                elif engine is not None:
+                    stats_key = 'searched'
+                    result = engine.find_paths(
+                        mc, subj_nodes, obj_nodes, max_paths,
+                        max_path_length, node_filter_func=node_filter_func,
+                        edge_filter_func=edge_filter_func,
+                        allow_direct=allow_direct, node_mask=node_mask)
+                else:
+                    stats_key = 'searched'
+                    result = find_model_checker_paths(
+                        mc, subj_nodes, obj_nodes, max_paths,
+                        max_path_length, node_filter_func=node_filter_func,
+                        allow_direct=allow_direct)
+                checked[signature] = (result, stats_key)
+                self.reachability_stats[stats_key] += 1
+                results.append((stmt, result))
+        logger.info(f'Checked {len(checked)} unique signatures for '
+                    f'{len(results)} statements with {mc_type} '
+                    f'ModelChecker.')
+        return results
+
+    @staticmethod
+    def _get_check_signature(subj_nodes, obj_nodes, result_code):
+        # The result of a check only depends on the subject and object nodes
+        # and on the main agents used in refinement edges of the paths
+        if result_code:
+            return result_code
+        return (_get_nodes_signature(subj_nodes),
+                _get_nodes_signature(obj_nodes))
+
+    @staticmethod
+    def get_node_filter_func(mc, agent_filter_func):
+        """Return a node filter function for a ModelChecker.
+
+        Unlike ModelChecker.update_filter_func, the agent filter (or its
+        registered mask) is evaluated once for each node of the graph and
+        the returned function only looks up the node in the set of excluded
+        nodes.
+        """
+        if agent_filter_func is None:
+            return None
+        excluded = get_excluded_nodes(mc.nodes_to_agents, agent_filter_func)
+        logger.info(f'{agent_filter_func.__name__} filters out '
+                    f'{len(excluded)} nodes.')
+
+        def node_filter_func(node):
+            return node[0] not in excluded
+        return node_filter_func
+
+    def get_path_engine(self, mc_type):
+        """Return a GraphPathEngine for a model type if it is selected in
+        the test config, otherwise None."""
+        if self.model.test_config.get('path_engine', 'indra') != 'csr' or \
+                mc_type not in ('signed_graph', 'unsigned_graph'):
+            return None
+        graph = self.mc_types[mc_type]['model']
+        engine = self._path_engines.get(mc_type)
+        if engine is None or engine.graph is not graph:
+            logger.info(f'Building the path engine of the {mc_type} graph.')
+            engine = GraphPathEngine(graph, signed=mc_type == 'signed_graph')
+            self._path_engines[mc_type] = engine
+        return engine
+
+    @staticmethod
+    def _may_have_paths(subj_nodes, obj_nodes, result_code, index):
+        # Statements that can't be checked, statements without a subject
+        # and loops are left to the ModelChecker
+        if result_code or not subj_nodes.all_nodes:
+            return True
+        if subj_nodes.all_nodes == obj_nodes.all_nodes and \
+                len(subj_nodes.all_nodes) == 1:
+            return True
+        return index.may_reach(subj_nodes.all_nodes, obj_nodes.all_nodes)
+
+    def invalidate_graph_cache(self):
+        """Remove all cached ModelChecker graphs."""
+        self._graph_cache.clear()
+        self._graph_cache_key = None
+
+    def _get_graph_key(self, mc_type, stmts, add_ns, edge_filter_func):
+        # Cached graphs are only valid for the current assembled statements
+        assembled_key = self.model._assembled_version
+        if self._graph_cache_key != assembled_key:
+            # Stored reachability indexes are kept when the cache is first
+            # used after loading the ModelManager
+            if self._graph_cache_key is not None:
+                self.reachability_indexes.clear()
+            self.invalidate_graph_cache()
+            self._graph_cache_key = assembled_key
+        stmts_key = None
+        if mc_type == 'pysb':
+            stmts_key = frozenset(_get_stmt_key(stmt) for stmt in stmts)
+        return (mc_type, edge_filter_func, add_ns, self.date_str, stmts_key)
+
+    def _store_graph(self, key, mc_type, mc, stmts):
+        cached = {'graph': mc.graph}
+        if mc_type == 'pysb':
+            cached['im'] = mc._im
+            cached['rule_obs_dict'] = mc.rule_obs_dict
+            cached['observables'] = list(mc.model.observables)
+            cached['stmt_to_obs'] = {
+                _get_stmt_key(stmt): mc.stmt_to_obs[stmt] for stmt in stmts
+                if stmt in mc.stmt_to_obs}
+        self._graph_cache[key] = cached
+        while len(self._graph_cache) > GRAPH_CACHE_SIZE:
+            self._graph_cache.popitem(last=False)
+
+    def _restore_graph(self, mc_type, mc, stmts, cached):
+        mc.graph = cached['graph']
+        if mc_type == 'pysb':
+            mc._im = cached['im']
+            mc.rule_obs_dict = cached['rule_obs_dict']
+            mc.model.observables = ComponentSet(cached['observables'])
+            # Observables are looked up by statement objects which can be
+            # different from the ones the graph was built with
+            stmt_to_obs = cached['stmt_to_obs']
+            mc.stmt_to_obs = {}
+            for stmt in stmts:
+                stmt_key = _get_stmt_key(stmt)
+                if stmt_key in stmt_to_obs:
+                    mc.stmt_to_obs[stmt] = stmt_to_obs[stmt_key]
+
     def add_test(self, test):
         """Add a test to a list of applicable tests."""
         self.applicable_tests.append(test)
@@ -172,15 +656,205 @@ class ModelManager(object):
 
     def run_all_tests(self, filter_func=None, edge_filter_func=None,
                       allow_direct=True):
-        """Run all applicable tests with all available ModelCheckers."""
+        """Run all applicable tests with all available ModelCheckers.
+
+        If the 'parallel_mc_types' option is set in the model's test config
+        (to True or to a maximum number of worker processes), the tests for
+        each ModelChecker type are run in a separate process and the results
+        are merged back in the original order of model types.
+        """
         max_path_length, max_paths = self._get_test_configs()
-        for mc_type in self.mc_types:
-            if mc_type not in MODEL_TYPES['path']:
-                continue
+        mc_types = [mc_type for mc_type in self.mc_types
+                    if mc_type in MODEL_TYPES['path']]
+        n_workers = self._get_parallel_workers(len(mc_types))
+        if n_workers > 1:
+            self._run_all_tests_parallel(
+                mc_types, n_workers, max_path_length, max_paths, filter_func,
+                edge_filter_func, allow_direct)
+            return
+        for mc_type in mc_types:
             self.run_tests_per_mc(mc_type, max_path_length, max_paths,
                                   filter_func, edge_filter_func,
                                   allow_direct=allow_direct)
 
+    def _get_parallel_workers(self, n_mc_types):
+        parallel = self.model.test_config.get('parallel_mc_types', False)
+        if not parallel or n_mc_types < 2:
+            return 1
+        # Workers rely on fork to inherit the ModelManager without pickling
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            logger.info('Fork start method is not available, running the '
+                        'tests sequentially.')
+            return 1
+        if parallel is True:
+            return n_mc_types
+        return min(int(parallel), n_mc_types)
+
+    def _run_all_tests_parallel(self, mc_types, n_workers, max_path_length,
+                                max_paths, filter_func=None,
+                                edge_filter_func=None, allow_direct=True):
+        global _parallel_state
+        logger.info(f'Running the tests with {len(mc_types)} ModelCheckers '
+                    f'in {n_workers} processes.')
+        # Models are assembled once here rather than in each worker
+        self.assemble_models(mc_types)
+        # The forked workers inherit this state so that neither the
+        # ModelManager nor the filter functions need to be pickled
+        _parallel_state = (self, max_path_length, max_paths, filter_func,
+                           edge_filter_func, allow_direct)
+        try:
+            ctx = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=n_workers,
+                                     mp_context=ctx) as executor:
+                all_results = list(executor.map(_run_tests_per_mc_worker,
+                                                mc_types))
+        finally:
+            _parallel_state = None
+        for mc_type, results in zip(mc_types, all_results):
+            for result in results:
+                self.add_result(mc_type, result)
+
+    def run_incremental_tests(self, previous_results, previous_paths,
+                              previous_stmt_hashes, filter_func=None,
+                              edge_filter_func=None, allow_direct=True):
+        """Rerun only the tests that could be affected by the model changes.
+
+        New tests, tests that did not pass in the previous round, tests
+        whose previous paths contain removed statements, tests whose
+        endpoints are agents of added statements and tests whose subject
+        can reach an added statement and whose object can be reached from
+        it (so that the added statement could create a new, possibly
+        shorter path between them) are rerun. All other tests reuse their
+        results from the previous round.
+
+        Reachability is determined on a directed graph of agent names
+        built from the assembled statements within the maximum path length
+        used for the tests. This over-approximates the paths of each model
+        type so that reused results are the same as rerunning the tests
+        would produce up to the choice between equally long paths.
+
+        Parameters
+        ----------
+        previous_results : dict or list[dict]
+            Test results of the previous round in the compact format
+            produced by results_to_json or in the previous list format.
+        previous_paths : list[dict]
+            Path lines of the previous round in the format produced by
+            results_to_json.
+        previous_stmt_hashes : set[int]
+            Hashes of the assembled statements of the previous model.
+
+        Returns
+        -------
+        n_rerun : int
+            The number of tests that were rerun.
+        """
+        mc_types = [mc_type for mc_type in self.mc_types
+                    if mc_type in MODEL_TYPES['path']]
+        if get_results_header(previous_results).get('mc_types') != \
+                mc_types:
+            logger.info('Model types changed since the previous round, '
+                        'running all tests.')
+            self.run_all_tests(filter_func, edge_filter_func, allow_direct)
+            return len(self.applicable_tests)
+        previous_by_test = {}
+        for previous_ix, test_results in enumerate(
+                get_results_tests(previous_results)):
+            test_hash = Statement._from_json(
+                test_results['test_json']).get_hash(refresh=True)
+            previous_by_test[test_hash] = previous_ix
+        previous_lines = defaultdict(list)
+        for line in previous_paths:
+            previous_lines[line['test']].append(line)
+        stmt_hashes = set()
+        added_stmts = []
+        for stmt in self.model.assembled_stmts:
+            stmt_hash = stmt.get_hash()
+            stmt_hashes.add(stmt_hash)
+            if stmt_hash not in previous_stmt_hashes:
+                added_stmts.append(stmt)
+        added_names = {ag.name for stmt in added_stmts
+                       for ag in stmt.agent_list() if ag is not None}
+        logger.info(f'{len(added_stmts)} statements added and '
+                    f'{len(previous_stmt_hashes - stmt_hashes)} removed since '
+                    'the previous round.')
+        max_path_length = max(
+            self._get_test_configs(mc_type=mc_type)[0]
+            for mc_type in mc_types) if mc_types else 0
+        upstream, downstream = get_names_around_statements(
+            self.model.assembled_stmts, added_stmts, max_path_length)
+        all_tests = self.applicable_tests
+        reused_results = {}
+        rerun_tests = []
+        for ix, test in enumerate(all_tests):
+            test_hash = test.stmt.get_hash()
+            results = self._get_reusable_results(
+                test, mc_types, previous_results,
+                previous_by_test.get(test_hash), previous_lines[test_hash],
+                stmt_hashes, added_names, upstream, downstream)
+            if results is None:
+                rerun_tests.append(test)
+            else:
+                reused_results[ix] = results
+        logger.info(f'Rerunning {len(rerun_tests)} tests and reusing results '
+                    f'of {len(reused_results)} tests.')
+        n_results = {mc_type: len(self.mc_types[mc_type]['test_results'])
+                     for mc_type in mc_types}
+        if rerun_tests:
+            self.applicable_tests = rerun_tests
+            try:
+                self.run_all_tests(filter_func, edge_filter_func,
+                                   allow_direct)
+            finally:
+                self.applicable_tests = all_tests
+        # Put the reused and the new results in the order of the tests
+        for mc_type in mc_types:
+            test_results = self.mc_types[mc_type]['test_results']
+            new_results = iter(test_results[n_results[mc_type]:])
+            del test_results[n_results[mc_type]:]
+            for ix in range(len(all_tests)):
+                if ix in reused_results:
+                    test_results.append(reused_results[ix][mc_type])
+                else:
+                    test_results.append(next(new_results))
+        return len(rerun_tests)
+
+    @staticmethod
+    def _get_reusable_results(test, mc_types, previous_results, previous_ix,
+                              previous_lines, stmt_hashes, added_names,
+                              upstream, downstream):
+        # Return previous results of a test if they can't be affected by
+        # the changes in the model and None otherwise
+        if previous_ix is None:
+            return None
+        endpoints = {ag.name for ag in test.stmt.agent_list()
+                     if ag is not None}
+        # An added statement can create a new path between the endpoints
+        if endpoints & upstream and endpoints & downstream:
+            return None
+        for line in previous_lines:
+            if line['nodes']:
+                endpoints |= {line['nodes'][0], line['nodes'][-1]}
+            for edge in line['edges']:
+                if set(edge.get('hashes', [])) - stmt_hashes:
+                    return None
+        if endpoints & added_names:
+            return None
+        results = {}
+        for mc_type in mc_types:
+            try:
+                result = get_path_results(
+                    previous_results, mc_type, [previous_ix])[0]
+            except KeyError:
+                return None
+            # Only passed tests with reported paths and tests that can't be
+            # checked are reused
+            if not result.paths and \
+                    result.result_code != 'STATEMENT_TYPE_NOT_HANDLED':
+                return None
+            results[mc_type] = result
+        return results
+
     def run_tests_per_mc(self, mc_type, max_path_length, max_paths,
                          filter_func=None, edge_filter_func=None,
                          allow_direct=True):
@@ -194,8 +868,8 @@ class ModelManager(object):
         mc = self.get_updated_mc(
             mc_type, [test.stmt for test in self.applicable_tests],
             edge_filter_func=edge_filter_func)
-        results = mc.check_model(
-            max_path_length=max_path_length, max_paths=max_paths,
+        results = self.check_statements(
+            mc_type, mc, max_path_length, max_paths,
             agent_filter_func=filter_func, edge_filter_func=edge_filter_func,
             allow_direct=allow_direct)
         for (stmt, result) in results:
@@ -220,10 +894,11 @@ class ModelManager(object):
                 path_stmts = report_function(path, model, False, stmts)
                 merge = False
             elif mc_type == 'signed_graph':
-                path_stmts = report_function(path, model, True, False, stmts)
+                path_stmts = self._stmts_from_indranet_path(path, model, True)
                 merge = True
             elif mc_type == 'unsigned_graph':
-                path_stmts = report_function(path, model, False, False, stmts)
+                path_stmts = self._stmts_from_indranet_path(
+                    path, model, False)
                 merge = True
             for i, step in enumerate(path_stmts):
                 edge_nodes = []
@@ -285,39 +960,107 @@ class ModelManager(object):
             json_lines.append(one_line_path_json)
         return paths, json_lines
 
+    def _stmts_from_indranet_path(self, path, model, signed):
+        """Return statements supporting the steps of an IndraNet path.
+
+        This is equivalent to indra.explanation.reporting.
+        stmts_from_indranet_path with from_db=False but looks up the
+        statements by hash instead of scanning all assembled statements for
+        every step.
+        """
+        stmts_by_hash = self._get_stmts_by_hash()
+        steps = []
+        for source, target in zip(path[:-1], path[1:]):
+            if len(source) == 3:
+                steps.append([RefEdge._from_json(source)])
+                continue
+            elif len(target) == 3:
+                steps.append([RefEdge._from_json(target)])
+                continue
+            if signed:
+                sign = 0 if source[1] == target[1] else 1
+                stmt_data = model[source[0]][target[0]][sign]['statements']
+            else:
+                stmt_data = model[source[0]][target[0]]['statements']
+            # Keep the order of assembled statements
+            indexed_stmts = sorted(
+                itertools.chain.from_iterable(
+                    stmts_by_hash.get(stmt_hash, []) for stmt_hash in
+                    {stmt['stmt_hash'] for stmt in stmt_data}),
+                key=lambda x: x[0])
+            steps.append([stmt for _, stmt in indexed_stmts])
+        return steps
+
+    def _get_stmts_by_hash(self):
+        stmts = self.model.assembled_stmts
+        key = (id(stmts), len(stmts))
+        if self._stmts_by_hash is None or self._stmts_by_hash_key != key:
+            self._stmts_by_hash = defaultdict(list)
+            for ix, stmt in enumerate(stmts):
+                self._stmts_by_hash[stmt.get_hash()].append((ix, stmt))
+            self._stmts_by_hash_key = key
+        return self._stmts_by_hash
+
     def _make_path_stmts(self, stmts, merge=False):
-        sentences = []
         date = strip_out_date(self.date_str, 'date')
         if merge and isinstance(stmts[0], Statement):
-            groups = group_and_sort_statements(stmts, grouping_level='relation')
-            for _, rel_key, group_stmts, _ in groups:
-                sentence = make_string_from_relation_key(rel_key) + '.'
-                stmt_hashes = [gr_st.get_hash()
-                               for _, _, gr_st, _ in group_stmts]
-                url_param = parse.urlencode(
-                    {'stmt_hash': stmt_hashes, 'source': 'model_statement',
-                     'model': self.model.name, 'date': date}, doseq=True)
-                link = f'/evidence?{url_param}'
-                sentences.append((link, sentence, ''))
-        else:
-            for stmt in stmts:
-                if isinstance(stmt, PybelEdge):
-                    sentence = pybel_edge_to_english(stmt)
-                    sentences.append(('', sentence, ''))
-                elif isinstance(stmt, RefEdge):
-                    sentence = stmt.to_english()
-                    sentences.append(('', sentence, ''))
-                else:
+            key = ('relations', date,
+                   tuple(stmt.get_hash() for stmt in stmts))
+            sentences = self._get_cached_english(key)
+            if sentences is None:
+                sentences = []
+                groups = group_and_sort_statements(
+                    stmts, grouping_level='relation')
+                for _, rel_key, group_stmts, _ in groups:
+                    sentence = make_string_from_relation_key(rel_key) + '.'
+                    stmt_hashes = [gr_st.get_hash()
+                                   for _, _, gr_st, _ in group_stmts]
+                    link = self._make_evidence_link(stmt_hashes, date)
+                    sentences.append((link, sentence, ''))
+                self.english_cache[key] = sentences
+            return list(sentences)
+        sentences = []
+        for stmt in stmts:
+            if isinstance(stmt, PybelEdge):
+                sentence = pybel_edge_to_english(stmt)
+                sentences.append(('', sentence, ''))
+            elif isinstance(stmt, RefEdge):
+                sentence = stmt.to_english()
+                sentences.append(('', sentence, ''))
+            else:
+                key = ('statement', date, stmt.get_hash())
+                sentence_tuple = self._get_cached_english(key)
+                if sentence_tuple is None:
                     ea = EnglishAssembler([stmt])
                     sentence = ea.make_model()
-                    stmt_hashes = [stmt.get_hash()]
-                    url_param = parse.urlencode(
-                        {'stmt_hash': stmt_hashes, 'source': 'model_statement',
-                         'model': self.model.name, 'date': date}, doseq=True)
-                    link = f'/evidence?{url_param}'
-                    sentences.append((link, sentence, ''))
+                    link = self._make_evidence_link([stmt.get_hash()], date)
+                    sentence_tuple = (link, sentence, '')
+                    self.english_cache[key] = sentence_tuple
+                sentences.append(sentence_tuple)
         return sentences
 
+    def _get_cached_english(self, key):
+        value = self.english_cache.get(key)
+        if value is None:
+            self.english_cache_stats['misses'] += 1
+        else:
+            self.english_cache_stats['hits'] += 1
+        return value
+
+    def _make_evidence_link(self, stmt_hashes, date):
+        url_param = parse.urlencode(
+            {'stmt_hash': stmt_hashes, 'source': 'model_statement',
+             'model': self.model.name, 'date': date}, doseq=True)
+        return f'/evidence?{url_param}'
+
+    def get_english_cache_hit_rate(self):
+        """Return the fraction of English sentence lookups found in cache."""
+        total = self.english_cache_stats['hits'] + \
+            self.english_cache_stats['misses']
+        if total == 0:
+            return 0
+        return self.english_cache_stats['hits'] / total
+
     def make_result_code(self, result):
         result_code = result.result_code
         return RESULT_CODES[result_code]
@@ -342,8 +1085,8 @@ class ModelManager(object):
                 mc = self.get_updated_mc(mc_type, [query.path_stmt])
                 max_path_length, max_paths = self._get_test_configs(
                     mode='query', mc_type=mc_type, default_paths=5)
-                result = mc.check_statement(
-                    query.path_stmt, max_paths, max_path_length)
+                _, result = self.check_statements(
+                    mc_type, mc, max_path_length, max_paths)[0]
                 hashed_res, path_lines = self.process_response(mc_type, result)
                 results.append((mc_type, hashed_res, path_lines))
             return results
@@ -354,14 +1097,27 @@ class ModelManager(object):
 
     def answer_dynamic_query(self, query, bucket=EMMAA_BUCKET_NAME):
         """Answer user query by simulating a PySB model."""
-        pysb_model, use_kappa, time_limit, num_times, num_sim, hyp_tester = \
+        sim_model, use_kappa, time_limit, num_times, num_sim, hyp_tester = \
             self._get_dynamic_components('dynamic')
         tra = TRA(use_kappa=use_kappa)
         tp = query.get_temporal_pattern(time_limit)
+        # Only stochastic or repeated simulations benefit from parallelism
+        n_workers = self._get_simulation_workers(
+            num_sim if not hyp_tester else None) \
+            if use_kappa or hyp_tester else 1
         try:
-            sat_rate, num_sim, kpat, pat_obj, fig_path = tra.check_property(
-                pysb_model, tp, num_times=num_times, num_sim=num_sim,
-                hypothesis_tester=hyp_tester)
+            with sim_model.use([query.entity]) as pysb_model:
+                if n_workers > 1:
+                    sat_rate, num_sim, kpat, fig_path = \
+                        run_parallel_simulations(
+                            tra, pysb_model, tp, num_times, n_workers,
+                            num_sim=num_sim, hypothesis_tester=hyp_tester)
+                else:
+                    sat_rate, num_sim, kpat, _, fig_path = \
+                        tra.check_property(pysb_model, tp,
+                                           num_times=num_times,
+                                           num_sim=num_sim,
+                                           hypothesis_tester=hyp_tester)
             if self.mode == 's3':
                 fig_name, ext = os.path.splitext(os.path.basename(fig_path))
                 date_str = make_date_str()
@@ -380,17 +1136,91 @@ class ModelManager(object):
             return [('pysb', self.hash_response_list(resp_json),
                      {'fail_reason': RESULT_CODES['QUERY_NOT_APPLICABLE']})]
 
+    def answer_simulation_queries(self, queries, **kwargs):
+        """Answer dynamic and intervention queries.
+
+        If the 'parallel_queries' option is set in the model's query config
+        (to True or to a maximum number of worker processes), the queries
+        are answered concurrently in separate processes.
+
+        Parameters
+        ----------
+        queries : list[emmaa.queries.Query]
+            A list of DynamicProperty and SimpleInterventionProperty queries.
+
+        Returns
+        -------
+        results : list[tuple]
+            A tuple of mc_type, hashed response and response json for each
+            query in the order of queries.
+        """
+        n_workers = self._get_parallel_query_workers(len(queries))
+        if n_workers == 1:
+            return [self._answer_simulation_query(query, **kwargs)
+                    for query in queries]
+        global _query_state
+        logger.info(f'Answering {len(queries)} simulation queries in '
+                    f'{n_workers} processes.')
+        # Models are prepared once here rather than in each worker
+        for query in queries:
+            self._get_dynamic_components(
+                'dynamic' if isinstance(query, DynamicProperty)
+                else 'intervention')
+        _query_state = (self, queries, kwargs)
+        try:
+            ctx = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=n_workers,
+                                     mp_context=ctx) as executor:
+                return list(executor.map(_answer_simulation_query_worker,
+                                         range(len(queries))))
+        finally:
+            _query_state = None
+
+    def _answer_simulation_query(self, query, **kwargs):
+        if isinstance(query, DynamicProperty):
+            return self.answer_dynamic_query(query, **kwargs)[0]
+        return self.answer_intervention_query(query, **kwargs)[0]
+
+    def _get_parallel_query_workers(self, n_queries):
+        parallel = self.model.query_config.get('parallel_queries', False)
+        if not parallel or n_queries < 2:
+            return 1
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            logger.info('Fork start method is not available, answering the '
+                        'queries sequentially.')
+            return 1
+        if parallel is True:
+            return min(n_queries, multiprocessing.cpu_count())
+        return min(int(parallel), n_queries)
+
+    def _get_simulation_workers(self, num_sim=None):
+        # Simulations of queries answered in worker processes are not
+        # parallelized further
+        parallel = self.model.query_config.get('dynamic', {}).get(
+            'parallel_sims', False)
+        if not parallel or _query_state is not None or \
+                (num_sim is not None and num_sim < 2):
+            return 1
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            logger.info('Fork start method is not available, running the '
+                        'simulations sequentially.')
+            return 1
+        n_workers = multiprocessing.cpu_count() if parallel is True \
+            else int(parallel)
+        return min(n_workers, num_sim) if num_sim is not None else n_workers
+
     def answer_intervention_query(self, query, bucket=EMMAA_BUCKET_NAME):
         """Answer user intervention query by simulating a PySB model."""
-        pysb_model, use_kappa, time_limit, num_times, num_sim, _ = \
+        sim_model, use_kappa, time_limit, num_times, num_sim, _ = \
             self._get_dynamic_components('intervention')
         tra = TRA(use_kappa=use_kappa)
         try:
-            res, fig_path = tra.compare_conditions(pysb_model,
-                                                   query.condition_entity,
-                                                   query.target_entity,
-                                                   query.direction,
-                                                   time_limit, num_times)
+            with sim_model.use([query.target_entity]) as pysb_model:
+                res, fig_path = tra.compare_conditions(pysb_model,
+                                                       query.condition_entity,
+                                                       query.target_entity,
+                                                       query.direction,
+                                                       time_limit, num_times)
             if self.mode == 's3':
                 fig_name, ext = os.path.splitext(os.path.basename(fig_path))
                 date_str = make_date_str()
@@ -433,11 +1263,80 @@ class ModelManager(object):
 
     def open_query_per_mc(self, mc_type, mc, query, max_path_length,
                           max_paths):
-        g = mc.get_graph()
-        subj_nodes, obj_nodes, res_code = mc.process_statement(query.path_stmt)
+        return self.answer_open_queries(
+            mc_type, mc, [query], max_path_length, max_paths)[0]
+
+    def answer_open_queries(self, mc_type, mc, queries, max_path_length,
+                            max_paths, query_limits=None):
+        """Answer open search queries with one ModelChecker.
+
+        Queries are grouped by their search shape (start nodes, direction,
+        sign and terminal namespaces) and a single breadth first search is
+        run for each group. The paths of each query are then selected from
+        the shared search within the limits of the query and the responses
+        of queries with the same shape and limits are only processed once.
+
+        Parameters
+        ----------
+        mc_type : str
+            A type of a ModelChecker.
+        mc : indra.explanation.model_checker.ModelChecker
+            A ModelChecker updated with the statements of the queries.
+        queries : list[emmaa.queries.OpenSearchQuery]
+            A list of open search queries to answer.
+        max_path_length : int
+            The maximum length of paths.
+        max_paths : int
+            The maximum number of paths per query.
+        query_limits : Optional[list[tuple(int, int)]]
+            A list of (max_path_length, max_paths) limits for each query
+            overriding the shared limits.
+
+        Returns
+        -------
+        results : list[tuple(dict, list)]
+            A list of hashed responses and paths in the order of queries.
+        """
+        if query_limits is None:
+            query_limits = [(max_path_length, max_paths)] * len(queries)
+        results = [None] * len(queries)
+        shapes = {}
+        groups = defaultdict(list)
+        for ix, query in enumerate(queries):
+            shape = self._get_open_query_shape(mc_type, mc, query, shapes)
+            if isinstance(shape, str):
+                results[ix] = (self.hash_response_list(RESULT_CODES[shape]),
+                               [{'fail_reason': RESULT_CODES[shape]}])
+            else:
+                groups[shape].append(ix)
+        if groups:
+            g = mc.get_graph()
+        for shape, ixs in groups.items():
+            logger.info(f'Running open search for {len(ixs)} queries')
+            search = _SharedOpenSearch(
+                g, *shape, [query_limits[ix] for ix in ixs])
+            responses = {}
+            for ix in ixs:
+                limits = query_limits[ix]
+                if limits not in responses:
+                    responses[limits] = self.process_open_query_response(
+                        mc_type, search.get_paths(*limits))
+                results[ix] = responses[limits]
+        return results
+
+    def _get_open_query_shape(self, mc_type, mc, query, shapes):
+        # Return a hashable search shape of an open query or a result code
+        # if it can't be searched, queries with the same statement share
+        # the shape
+        terminal_ns = None if mc_type == 'pysb' else query.terminal_ns
+        key = (_get_stmt_key(query.path_stmt), query.entity_role,
+               tuple(terminal_ns) if terminal_ns else None)
+        if key in shapes:
+            return shapes[key]
+        subj_nodes, obj_nodes, res_code = mc.process_statement(
+            query.path_stmt)
         if res_code:
-            return self.hash_response_list(RESULT_CODES[res_code]), \
-                [{'fail_reason': RESULT_CODES[res_code]}]
+            shape = res_code
         else:
             if query.entity_role == 'subject':
                 reverse = False
@@ -447,21 +1346,10 @@ class ModelManager(object):
                 reverse = True
                 assert obj_nodes
                 nodes = obj_nodes.all_nodes
-            sign = query.get_sign(mc_type)
-            if mc_type == 'pysb':
-                terminal_ns = None
-            else:
-                terminal_ns = query.terminal_ns
-            paths_gen = bfs_search_multiple_nodes(
-                g, nodes, reverse=reverse, terminal_ns=terminal_ns,
-                depth_limit=max_path_length, path_limit=max_paths, sign=sign)
-            paths = []
-            for p in paths_gen:
-                if reverse:
-                    paths.append(p[::-1])
-                else:
-                    paths.append(p)
-            return self.process_open_query_response(mc_type, paths)
+            shape = (tuple(nodes), reverse, query.get_sign(mc_type),
+                     key[2])
+        shapes[key] = shape
+        return shape
 
     def answer_queries(self, queries, **kwargs):
         """Answer all queries registered for this model.
@@ -481,17 +1369,13 @@ class ModelManager(object):
         applicable_stmts = []
         applicable_open_queries = []
         applicable_open_stmts = []
+        simulation_queries = []
         for query in queries:
             # Dynamic queries need to be answered individually, while for
             # path and open queries some parts can be shared
-            if isinstance(query, DynamicProperty):
-                mc_type, response, resp_json = self.answer_dynamic_query(
-                    query, **kwargs)[0]
-                responses.append((query, mc_type, response))
-            if isinstance(query, SimpleInterventionProperty):
-                mc_type, response, resp_json = self.answer_intervention_query(
-                    query, **kwargs)[0]
-                responses.append((query, mc_type, response))
+            if isinstance(query, (DynamicProperty,
+                                  SimpleInterventionProperty)):
+                simulation_queries.append(query)
             elif isinstance(query, PathProperty):
                 if ScopeTestConnector.applicable(self, query):
                     applicable_queries.append(query)
@@ -509,6 +1393,12 @@ class ModelManager(object):
                         (query, '', self.hash_response_list(
                             RESULT_CODES['QUERY_NOT_APPLICABLE'])))
 
+        if simulation_queries:
+            for query, (mc_type, response, resp_json) in zip(
+                    simulation_queries, self.answer_simulation_queries(
+                        simulation_queries, **kwargs)):
+                responses.append((query, mc_type, response))
+
         # Only do the following steps if there are applicable queries
         # Path queries
         if applicable_queries:
@@ -518,8 +1408,8 @@ class ModelManager(object):
                 mc = self.get_updated_mc(mc_type, applicable_stmts)
                 max_path_length, max_paths = self._get_test_configs(
                     mode='query', mc_type=mc_type, default_paths=5)
-                results = mc.check_model(
-                    max_path_length=max_path_length, max_paths=max_paths)
+                results = self.check_statements(
+                    mc_type, mc, max_path_length, max_paths)
                 for ix, (_, result) in enumerate(results):
                     resp, paths = self.process_response(mc_type, result)
                     responses.append(
@@ -534,9 +1424,11 @@ class ModelManager(object):
                     mode='query', qtype='open_search', mc_type=mc_type,
                     default_paths=50, default_length=2)
                 mc = self.get_updated_mc(mc_type, applicable_open_stmts, True)
-                for query in applicable_open_queries:
-                    res, paths = self.open_query_per_mc(
-                        mc_type, mc, query, max_path_length, max_paths)
+                results = self.answer_open_queries(
+                    mc_type, mc, applicable_open_queries, max_path_length,
+                    max_paths)
+                for query, (res, paths) in zip(applicable_open_queries,
+                                               results):
                     responses.append((query, mc_type, res))
 
         return sorted(responses, key=lambda x: x[0].matches_key())
@@ -599,9 +1491,45 @@ class ModelManager(object):
         for mc_type in MODEL_TYPES['simulation']:
             if mc_type in self.mc_types:
                 logger.info(f'Using {mc_type} model for simulation')
-                pysb_model = deepcopy(self.mc_types[mc_type]['model'])
+                sim_model = self.get_simulation_model(
+                    mc_type, use_kappa, time_limit, num_times)
                 break
-        return pysb_model, use_kappa, time_limit, num_times, num_sim, hyp_tester
+        return sim_model, use_kappa, time_limit, num_times, num_sim, hyp_tester
+
+    def get_simulation_model(self, mc_type, use_kappa=False, time_limit=None,
+                             num_times=100):
+        """Return a PySB model of a given type prepared for simulation.
+
+        Prepared models are cached by the date of the model and simulation
+        settings so that the model is copied and its reaction network is
+        generated only once for all dynamic and intervention queries.
+
+        Parameters
+        ----------
+        mc_type : str
+            A model type to simulate ('dynamic' or 'pysb').
+        use_kappa : bool
+            Whether the model is simulated with Kappa instead of ODEs.
+        time_limit : Optional[int]
+            The time limit of simulations.
+        num_times : int
+            The number of time points in simulations.
+
+        Returns
+        -------
+        sim_model : emmaa.model_tests.SimulationModel
+            A prepared model to use in simulations.
+        """
+        key = (self.date_str, mc_type, use_kappa, time_limit, num_times)
+        if key not in self._simulation_cache:
+            # Models prepared for an earlier version of the model are
+            # not needed anymore
+            for old_key in list(self._simulation_cache):
+                if old_key[0] != self.date_str:
+                    self._simulation_cache.pop(old_key)
+            self._simulation_cache[key] = SimulationModel(
+                self.mc_types[mc_type]['model'], use_kappa)
+        return self._simulation_cache[key]
 
     def process_response(self, mc_type, result):
         """Return a dictionary in which every key is a hash and value is a list
@@ -611,7 +1539,9 @@ class ModelManager(object):
         sentence.
         """
         if result.paths:
-            response, path_lines = self.make_path_json(mc_type, result.paths)
+            with timed_phase(f'make_path_json.{mc_type}'):
+                response, path_lines = self.make_path_json(
+                    mc_type, result.paths)
             return self.hash_response_list(response), path_lines
         else:
             response = self.make_result_code(result)
@@ -619,7 +1549,8 @@ class ModelManager(object):
 
     def process_open_query_response(self, mc_type, paths):
         if paths:
-            response, path_lines = self.make_path_json(mc_type, paths)
+            with timed_phase(f'make_path_json.{mc_type}'):
+                response, path_lines = self.make_path_json(mc_type, paths)
             return self.hash_response_list(response), path_lines
         else:
             response = 'No paths found that satisfy this query'
@@ -656,53 +1587,198 @@ class ModelManager(object):
         return response_dict
 
     def results_to_json(self, test_data=None):
-        """Put test results to json format."""
+        """Put test results to json format.
+
+        Returns
+        -------
+        results_json : dict
+            Test results in the compact format (see emmaa.results_format).
+        json_lines : list[dict]
+            Path lines, one for each path found.
+        """
         pickler = jsonpickle.pickler.Pickler()
-        results_json = []
-        results_json.append({
+        test_rows = []
+        json_lines = []
+        for ix, test in enumerate(self.applicable_tests):
+            test_row, test_json_lines = self._test_results_to_json(
+                ix, test, pickler)
+            test_rows.append(test_row)
+            json_lines += test_json_lines
+        logger.info(f'Rendered {len(self.english_cache)} unique English '
+                    'sentences, cache hit rate: '
+                    f'{self.get_english_cache_hit_rate():.2f}')
+        results_json = make_compact_results(
+            self._make_results_header(test_data), test_rows)
+        return results_json, json_lines
+
+    def _make_results_header(self, test_data=None):
+        return {
             'model_name': self.model.name,
             'mc_types': [mc_type for mc_type in self.mc_types
                          if mc_type in MODEL_TYPES['path']],
             'path_stmt_counts': self.path_stmt_counts,
             'date_str': self.date_str,
-            'test_data': test_data})
+            'test_data': test_data}
+
+    def _test_results_to_json(self, ix, test, pickler):
+        """Return the results row and path lines of one applicable test."""
+        test_ix_results = {'test_type': test.__class__.__name__,
+                           'test_json': test.to_json()}
         json_lines = []
-        for ix, test in enumerate(self.applicable_tests):
-            test_ix_results = {'test_type': test.__class__.__name__,
-                               'test_json': test.to_json()}
-            for mc_type in self.mc_types:
-                if mc_type not in MODEL_TYPES['path']:
-                    continue
-                result = self.mc_types[mc_type]['test_results'][ix]
+        for mc_type in self.mc_types:
+            if mc_type not in MODEL_TYPES['path']:
+                continue
+            result = self.mc_types[mc_type]['test_results'][ix]
+            with timed_phase(f'make_path_json.{mc_type}'):
                 path_json, test_json_lines = self.make_path_json(
                     mc_type, result.paths)
-                test_ix_results[mc_type] = {
-                    'result_json': pickler.flatten(result),
-                    'path_json': path_json,
-                    'result_code': self.make_result_code(result)}
-                for line in test_json_lines:
-                    # Only include lines with paths
-                    if line:
-                        line.update({'test': test.stmt.get_hash()})
-                        json_lines.append(line)
-            results_json.append(test_ix_results)
-        return results_json, json_lines
+            test_ix_results[mc_type] = path_result_to_row(
+                result, path_json, pickler)
+            for line in test_json_lines:
+                # Only include lines with paths
+                if line:
+                    line.update({'test': test.stmt.get_hash()})
+                    json_lines.append(line)
+        return test_ix_results, json_lines
+
+    def write_results(self, results_file, paths_file, test_data=None):
+        """Write test results and paths to files one test at a time.
+
+        The written content is the same as the output of results_to_json
+        saved in json and jsonl formats but the results of all tests are not
+        kept in memory at once. Large columns of results are spooled to
+        temporary files and written out after all paths are rendered.
+
+        Parameters
+        ----------
+        results_file : file-like
+            A text file to write the results in json format to.
+        paths_file : file-like
+            A text file to write the path lines in jsonl format to.
+        test_data : Optional[dict]
+            Test data to include in the results header.
+        """
+        pickler = jsonpickle.pickler.Pickler()
+        header = self._make_results_header(test_data)
+        writer = CompactResultsWriter(results_file, header['mc_types'])
+        lines_writer = JsonLinesWriter(paths_file)
+        for ix, test in enumerate(self.applicable_tests):
+            test_row, test_json_lines = self._test_results_to_json(
+                ix, test, pickler)
+            writer.add_test(test_row)
+            for line in test_json_lines:
+                lines_writer.write(line)
+        logger.info(f'Rendered {len(self.english_cache)} unique English '
+                    'sentences, cache hit rate: '
+                    f'{self.get_english_cache_hit_rate():.2f}')
+        writer.close(header)
 
     def upload_results(self, test_corpus='large_corpus_tests',
                        test_data=None, bucket=EMMAA_BUCKET_NAME):
-        """Upload results to s3 bucket."""
-        json_dict, json_lines = self.results_to_json(test_data)
-        result_key = (f'results/{self.model.name}/results_'
-                      f'{test_corpus}_{self.date_str}.json')
-        paths_key = (f'paths/{self.model.name}/paths_{test_corpus}_'
-                     f'{self.date_str}.jsonl')
-        latest_paths_key = (f'paths/{self.model.name}/{test_corpus}'
-                            '_latest_paths.jsonl')
-        logger.info(f'Uploading test results to {result_key}')
-        save_json_to_s3(json_dict, bucket, result_key)
-        logger.info(f'Uploading test paths to {paths_key}')
-        save_json_to_s3(json_lines, bucket, paths_key, save_format='jsonl')
-        save_json_to_s3(json_lines, bucket, latest_paths_key, 'jsonl')
+        """Upload results to s3 bucket.
+
+        Results and paths are streamed to S3 test by test and the latest
+        paths are copied on the server side from the dated paths.
+        """
+        result_key, paths_key, latest_paths_key = _get_test_results_keys(
+            self.model.name, test_corpus, self.date_str)
+        logger.info(f'Uploading test results to {result_key} and paths to '
+                    f'{paths_key}')
+        with S3StreamWriter(bucket, result_key) as results_writer, \
+                S3StreamWriter(bucket, paths_key) as paths_writer:
+            self.write_results(results_writer, paths_writer, test_data)
+        copy_s3_object(bucket, paths_key, latest_paths_key)
+
+    def select_test_shard(self, n_shards, shard_ix):
+        """Keep only the applicable tests that belong to a given shard.
+
+        Parameters
+        ----------
+        n_shards : int
+            The total number of shards the applicable tests are split into.
+        shard_ix : int
+            The index of the shard to keep.
+
+        Returns
+        -------
+        test_indices : list[int]
+            Indices of the kept tests in the full list of applicable tests.
+        """
+        test_indices = get_shard_indices(
+            self.applicable_tests, n_shards, shard_ix)
+        self.applicable_tests = [self.applicable_tests[ix]
+                                 for ix in test_indices]
+        logger.info(f'Selected {len(test_indices)} tests for shard '
+                    f'{shard_ix} out of {n_shards}.')
+        return test_indices
+
+    def shard_results_to_json(self, n_shards, shard_ix, test_indices,
+                              test_data=None):
+        """Put test results of a shard to json format for a later merge."""
+        pickler = jsonpickle.pickler.Pickler()
+        shard_json = {'n_shards': n_shards,
+                      'shard_ix': shard_ix,
+                      'header': self._make_results_header(test_data),
+                      'test_indices': test_indices,
+                      'results': [],
+                      'paths': []}
+        for ix, test in enumerate(self.applicable_tests):
+            test_ix_results, test_json_lines = self._test_results_to_json(
+                ix, test, pickler)
+            shard_json['results'].append(test_ix_results)
+            shard_json['paths'].append(test_json_lines)
+        return shard_json
+
+    def upload_shard_results(self, n_shards, shard_ix, test_indices,
+                             test_corpus='large_corpus_tests', test_data=None,
+                             bucket=EMMAA_BUCKET_NAME):
+        """Upload the results of a test shard to s3 bucket."""
+        shard_json = self.shard_results_to_json(
+            n_shards, shard_ix, test_indices, test_data)
+        shard_key = _get_shard_key(self.model.name, test_corpus,
+                                   self.date_str, n_shards, shard_ix)
+        logger.info(f'Uploading test shard results to {shard_key}')
+        save_json_to_s3(shard_json, bucket, shard_key)
+
+    def run_sharded_tests(self, n_shards, filter_func=None,
+                          edge_filter_func=None, allow_direct=True,
+                          test_data=None):
+        """Run applicable tests split into shards in parallel processes.
+
+        The test results are collected back into this ModelManager and the
+        merged results are returned in the same format as results_to_json.
+        """
+        global _parallel_state
+        logger.info(f'Running {len(self.applicable_tests)} tests in '
+                    f'{n_shards} shards.')
+        # Models are assembled once here rather than in each worker
+        self.assemble_models([mc_type for mc_type in self.mc_types
+                              if mc_type in MODEL_TYPES['path']])
+        _parallel_state = (self, n_shards, filter_func, edge_filter_func,
+                           allow_direct, test_data)
+        try:
+            ctx = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=n_shards,
+                                     mp_context=ctx) as executor:
+                shard_outputs = list(executor.map(_run_test_shard_worker,
+                                                  range(n_shards)))
+        finally:
+            _parallel_state = None
+        # Put the test results back in the order of applicable tests
+        n_tests = len(self.applicable_tests)
+        for mc_type in self.mc_types:
+            if mc_type not in MODEL_TYPES['path']:
+                continue
+            results = [None] * n_tests
+            for shard_json, shard_results in shard_outputs:
+                for ix, result in zip(shard_json['test_indices'],
+                                      shard_results[mc_type]):
+                    results[ix] = result
+            self.mc_types[mc_type]['test_results'] += results
+        json_dict, json_lines = merge_shard_results(
+            [shard_json for shard_json, _ in shard_outputs])
+        self.path_stmt_counts = json_dict['header']['path_stmt_counts']
+        return json_dict, json_lines
 
     def save_assembled_statements(self, upload_to_db=True,
                                   bucket=EMMAA_BUCKET_NAME):
@@ -738,6 +1814,734 @@ class ModelManager(object):
                        f'{self.model.name}_dynamic', save_to_db=False)
 
 
+class SimulationModel(object):
+    """A copy of a PySB model prepared once for repeated simulations.
+
+    For ODE simulations the reaction network of the model is generated when
+    the model is prepared. Queries change the observables and initial
+    conditions of the model in place and these changes are reverted after
+    each query. If a query (e.g. an intervention query through TRA's
+    compare_conditions) adds initial conditions of species that are not in
+    the network, the network is generated again for the new initial
+    species and kept for later queries with the same initial species.
+
+    Parameters
+    ----------
+    pysb_model : pysb.Model
+        A PySB model to simulate. The model is copied and not modified.
+    use_kappa : bool
+        Whether the model is simulated with Kappa instead of ODEs. If
+        False, the reaction network of the model is generated.
+    """
+    def __init__(self, pysb_model, use_kappa=False):
+        self.model = deepcopy(pysb_model)
+        self.use_kappa = use_kappa
+        self.lock = threading.Lock()
+        if not use_kappa:
+            _NetworkCachingModel.prepare(self.model)
+            try:
+                generate_equations(self.model)
+            except Exception as e:
+                logger.warning(f'Could not generate the reaction network '
+                               f'of the model: {e}')
+                self.model.reset_equations()
+
+    @contextmanager
+    def use(self, agents):
+        """Use the model with observables of given agents in a query.
+
+        Parameters
+        ----------
+        agents : list[indra.statements.Agent]
+            Agents to create observables for.
+
+        Returns
+        -------
+        pysb_model : pysb.Model
+            The prepared model which is restored to its original state
+            when the context is exited.
+        """
+        model = self.model
+        with self.lock:
+            components = {name: list(getattr(model, name))
+                          for name in COMPONENT_SET_NAMES}
+            initials = [(initial, initial.value) for initial in model.initials]
+            param_values = [(param, param.value) for param in model.parameters]
+            try:
+                for agent in agents:
+                    obs = get_create_observable(model, agent)
+                    _set_observable_species(model,
+                                            model.observables[obs.name])
+                yield model
+            finally:
+                # Remove components added during the query
+                for name, name_components in components.items():
+                    if len(getattr(model, name)) != len(name_components):
+                        setattr(model, name, ComponentSet(name_components))
+                model.initials = [initial for initial, _ in initials]
+                for initial, value in initials:
+                    initial.value = value
+                for param, value in param_values:
+                    param.value = value
+                if isinstance(model, _NetworkCachingModel):
+                    model.switch_network()
+
+
+class _NetworkCachingModel(Model):
+    """A PySB model that keeps a reaction network for each set of initial
+    species.
+
+    generate_equations only generates the reaction network of a model that
+    has no reactions. The reactions of this model are looked up for its
+    current initial species: if the initial species changed since the
+    network was generated, the network generated earlier for the new
+    initial species is restored or, if there is none, the network is
+    cleared so that it is generated again.
+    """
+    # Attributes set by generate_equations
+    network_attrs = ['species', '_reactions', 'reactions_bidirectional',
+                     '_stoichiometry_matrix', '_derived_parameters',
+                     '_derived_expressions']
+
+    @classmethod
+    def prepare(cls, model):
+        """Turn a PySB model into a _NetworkCachingModel in place."""
+        model.__class__ = cls
+        model._reactions = model.__dict__.pop('reactions')
+        model._networks = {}
+        model._network_key = model.get_network_key()
+
+    @property
+    def reactions(self):
+        self.switch_network()
+        return self._reactions
+
+    @reactions.setter
+    def reactions(self, reactions):
+        self._reactions = reactions
+
+    def get_network_key(self):
+        """Return a key of the initial species of the model."""
+        return tuple((str(initial.pattern), initial.fixed)
+                     for initial in self.initials)
+
+    def switch_network(self):
+        """Set the network of the model for its current initial species."""
+        key = self.get_network_key()
+        if key == self._network_key:
+            return
+        if self._reactions:
+            network = {attr: getattr(self, attr)
+                       for attr in self.network_attrs}
+            network['observables'] = {
+                _get_observable_key(obs): (obs.species, obs.coefficients)
+                for obs in self.observables}
+            self._networks[self._network_key] = network
+        network = self._networks.get(key)
+        self._network_key = key
+        if network is None:
+            self.reset_equations()
+            return
+        for attr in self.network_attrs:
+            setattr(self, attr, network[attr])
+        for obs in self.observables:
+            obs_key = _get_observable_key(obs)
+            if obs_key in network['observables']:
+                obs.species, obs.coefficients = \
+                    network['observables'][obs_key]
+            else:
+                obs.species, obs.coefficients = [], []
+                _set_observable_species(self, obs)
+
+
+def _get_observable_key(obs):
+    return obs.name, str(obs.reaction_pattern), obs.match
+
+
+def _set_observable_species(model, obs):
+    # Observables added after the reaction network was generated need
+    # their species and coefficients
+    if not model.species or obs.species:
+        return
+    matches = SpeciesPatternMatcher(model).match(
+        obs.reaction_pattern, index=True, counts=True)
+    obs.species = list(matches)
+    obs.coefficients = list(matches.values()) \
+        if obs.match == 'molecules' else [1] * len(matches)
+
+
+class _SharedOpenSearch(object):
+    """Breadth first search from a list of nodes shared by open queries.
+
+    The search from each node is run lazily with the largest path length of
+    all queries: paths are only generated when a query needs more paths
+    than were generated for the previous queries, and the generated prefix
+    of the search is cached and shared between queries. Because paths from
+    each node are found in the order of their length, the selected paths
+    are the same as the ones found by a separate search with the limits of
+    the query (see bfs_search_multiple_nodes), and a query without a limit
+    on the number of paths does not remove the limit of other queries.
+    """
+    def __init__(self, g, nodes, reverse, sign, terminal_ns, limits):
+        self.g = g
+        self.nodes = nodes
+        self.reverse = reverse
+        self.sign = sign
+        self.terminal_ns = list(terminal_ns) if terminal_ns else None
+        self.depth_limit = max(length for length, _ in limits)
+        # For each node, a list of generated paths and the generator of the
+        # rest of the paths (None once it is exhausted)
+        self.node_searches = {}
+
+    def _iter_node_paths(self, node):
+        if node not in self.node_searches:
+            self.node_searches[node] = [[], bfs_search(
+                self.g, node, reverse=self.reverse,
+                terminal_ns=self.terminal_ns, depth_limit=self.depth_limit,
+                sign=self.sign)]
+        node_search = self.node_searches[node]
+        paths = node_search[0]
+        ix = 0
+        while True:
+            if ix == len(paths):
+                if node_search[1] is None:
+                    return
+                try:
+                    paths.append(next(node_search[1]))
+                except StopIteration:
+                    node_search[1] = None
+                    return
+            yield paths[ix]
+            ix += 1
+
+    def get_paths(self, max_path_length, max_paths):
+        """Return paths within given limits in the direction of the query.
+        """
+        paths = []
+        for node in self.nodes:
+            for path in self._iter_node_paths(node):
+                if len(path) > max_path_length + 1:
+                    break
+                paths.append(path[::-1] if self.reverse else path)
+                if max_paths and len(paths) >= max_paths:
+                    return paths
+        return paths
+
+
+class LazyModelTypes(MutableMapping):
+    """A dictionary of ModelChecker types that assembles the model of a type
+    when its entry is first accessed.
+
+    Parameters
+    ----------
+    mc_types : list[str]
+        A list of ModelChecker types in the order of iteration.
+    assemble_func : function
+        A function that takes a ModelChecker type and returns its entry (a
+        dictionary containing an instance of a model, an instance of a
+        ModelChecker and a list of test results).
+    """
+    def __init__(self, mc_types, assemble_func):
+        # None marks a type that has not been assembled yet
+        self._entries = dict.fromkeys(mc_types)
+        self._assemble_func = assemble_func
+
+    def is_assembled(self, mc_type):
+        """Return True if the model of a given type was already assembled."""
+        return self._entries.get(mc_type) is not None
+
+    def __getitem__(self, mc_type):
+        entry = self._entries[mc_type]
+        if entry is None:
+            entry = self._assemble_func(mc_type)
+            self._entries[mc_type] = entry
+        return entry
+
+    def __setitem__(self, mc_type, entry):
+        self._entries[mc_type] = entry
+
+    def reset(self, mc_type):
+        """Mark the entry of a given type as not assembled."""
+        self._entries[mc_type] = None
+
+    def __delitem__(self, mc_type):
+        del self._entries[mc_type]
+
+    def __contains__(self, mc_type):
+        return mc_type in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(
+            f'{mc_type}{"" if self.is_assembled(mc_type) else " (lazy)"}'
+            for mc_type in self._entries))
+
+
+def _get_function_key(func):
+    """Return the importable name of a function or the function itself
+    if it does not have one (e.g. lambdas)."""
+    if func is None:
+        return None
+    qualname = getattr(func, '__qualname__', '')
+    if not qualname or '<' in qualname:
+        return func
+    return f'{func.__module__}.{qualname}'
+
+
+def _get_stmt_key(stmt):
+    """Return a hashable key of a checked statement.
+
+    Statements of open searches have a missing subject or object for which
+    some statement types can't make their hash, their key is made from the
+    type and the other attributes of the statement instead.
+    """
+    try:
+        return stmt.get_hash()
+    except AttributeError:
+        return (type(stmt).__name__,) + tuple(
+            (attr, _get_value_key(value))
+            for attr, value in sorted(vars(stmt).items())
+            if attr not in STMT_META_ATTRS)
+
+
+def _get_value_key(value):
+    if isinstance(value, Agent):
+        return value.matches_key()
+    if isinstance(value, list):
+        return tuple(_get_value_key(item) for item in value)
+    return str(value)
+
+
+def _get_nodes_signature(nodes):
+    """Return a hashable signature of a NodesContainer."""
+    if nodes.all_nodes is None:
+        return None
+    agent_key = None
+    if nodes.main_agent is not None:
+        agent_key = json.dumps(nodes.main_agent.to_json(), sort_keys=True)
+    return (tuple(nodes.main_nodes), tuple(nodes.ref_nodes), agent_key)
+
+
+_parallel_state = None
+_query_state = None
+_simulation_state = None
+
+
+def run_parallel_simulations(tra, pysb_model, pattern, num_times, n_workers,
+                             num_sim=2, hypothesis_tester=None):
+    """Check a temporal pattern with simulations run in parallel.
+
+    With a fixed number of simulations, the simulations are split into
+    batches checked in separate processes and the satisfaction rate is the
+    fraction of all simulations satisfying the pattern. With a hypothesis
+    tester, single simulations are run in parallel until the tester reaches
+    a decision on the simulations completed so far.
+
+    Parameters
+    ----------
+    tra : bioagents.tra.tra.TRA
+        A TRA instance to check the pattern with.
+    pysb_model : pysb.Model
+        A model to simulate.
+    pattern : bioagents.tra.tra.TemporalPattern
+        A temporal pattern to check.
+    num_times : int
+        The number of time points in simulations.
+    n_workers : int
+        The number of worker processes.
+    num_sim : Optional[int]
+        The number of simulations if a hypothesis tester is not given.
+    hypothesis_tester : Optional[bioagents.tra.model_checker.HypothesisTester]
+        A hypothesis tester to decide the number of simulations.
+
+    Returns
+    -------
+    sat_rate : float
+        The fraction of simulations satisfying the pattern.
+    num_sim : int
+        The number of simulations used.
+    kpat : str
+        The pattern in the format returned by TRA.
+    fig_path : str
+        The path to the figure with the results of the first batch of
+        simulations.
+    """
+    global _simulation_state
+    # Workers inherit the model and the pattern through fork
+    _simulation_state = (tra, pysb_model, pattern, num_times)
+    try:
+        ctx = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx,
+                                 initializer=_init_simulation_worker) \
+                as executor:
+            if hypothesis_tester is None:
+                batches = [num_sim // n_workers + (ix < num_sim % n_workers)
+                           for ix in range(n_workers)]
+                batch_results = list(executor.map(
+                    _check_property_worker, [b for b in batches if b]))
+            else:
+                batch_results = _run_until_decision(executor, n_workers,
+                                                    hypothesis_tester)
+    finally:
+        _simulation_state = None
+    num_sim = sum(n for _, n, _, _ in batch_results)
+    sat_rate = sum(rate * n for rate, n, _, _ in batch_results) / num_sim
+    _, _, kpat, fig_path = batch_results[0]
+    return sat_rate, num_sim, kpat, fig_path
+
+
+def _run_until_decision(executor, n_workers, hypothesis_tester):
+    # Keep n_workers single simulations running and stop as soon as the
+    # hypothesis tester decides on the completed ones
+    results = []
+    samples = []
+    pending = {executor.submit(_check_property_worker, 1)
+               for _ in range(n_workers)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result = future.result()
+            results.append(result)
+            samples.append(result[0] == 1)
+            if hypothesis_tester.test(samples) is not None:
+                for other_future in pending:
+                    other_future.cancel()
+                return results
+        pending |= {executor.submit(_check_property_worker, 1)
+                    for _ in done}
+    return results
+
+
+def _init_simulation_worker():
+    # Figures made by workers at the same time should not overwrite each
+    # other
+    os.chdir(tempfile.mkdtemp())
+
+
+def _check_property_worker(num_sim):
+    """Check the pattern with a batch of simulations in a forked worker
+    process."""
+    tra, pysb_model, pattern, num_times = _simulation_state
+    sat_rate, num_sim, kpat, _, fig_path = tra.check_property(
+        pysb_model, pattern, num_times=num_times, num_sim=num_sim)
+    return sat_rate, num_sim, kpat, os.path.abspath(fig_path)
+
+
+def _answer_simulation_query_worker(query_ix):
+    """Answer a dynamic or intervention query in a forked worker
+    process."""
+    model_manager, queries, kwargs = _query_state
+    return model_manager._answer_simulation_query(queries[query_ix],
+                                                  **kwargs)
+
+
+def _run_tests_per_mc_worker(mc_type):
+    """Run the tests with one ModelChecker in a forked worker process."""
+    (model_manager, max_path_length, max_paths, filter_func,
+     edge_filter_func, allow_direct) = _parallel_state
+    n_results = len(model_manager.mc_types[mc_type]['test_results'])
+    model_manager.run_tests_per_mc(mc_type, max_path_length, max_paths,
+                                   filter_func, edge_filter_func,
+                                   allow_direct=allow_direct)
+    # Only send back the results produced in this run
+    return model_manager.mc_types[mc_type]['test_results'][n_results:]
+
+
+def _run_test_shard_worker(shard_ix):
+    """Run the tests of one shard in a forked worker process."""
+    (model_manager, n_shards, filter_func, edge_filter_func, allow_direct,
+     test_data) = _parallel_state
+    test_indices = model_manager.select_test_shard(n_shards, shard_ix)
+    model_manager.run_all_tests(filter_func, edge_filter_func,
+                                allow_direct=allow_direct)
+    shard_json = model_manager.shard_results_to_json(
+        n_shards, shard_ix, test_indices, test_data)
+    shard_results = {mc_type: model_manager.mc_types[mc_type]['test_results']
+                     for mc_type in model_manager.mc_types
+                     if mc_type in MODEL_TYPES['path']}
+    return shard_json, shard_results
+
+
+def get_names_around_statements(stmts, center_stmts, max_depth):
+    """Return names of agents that can reach or be reached from statements.
+
+    Parameters
+    ----------
+    stmts : list[indra.statements.Statement]
+        Statements defining a directed graph of agent names (statements
+        point from their first agent to the others, Complexes point in both
+        directions).
+    center_stmts : list[indra.statements.Statement]
+        Statements to find the surrounding agents of.
+    max_depth : int
+        The maximum number of edges between an agent and the statements.
+
+    Returns
+    -------
+    upstream : set[str]
+        Names of agents from which the first agent of any of the center
+        statements can be reached in at most max_depth edges.
+    downstream : set[str]
+        Names of agents that can be reached from any of the other agents
+        of the center statements in at most max_depth edges.
+    """
+    def get_edges(stmt):
+        names = [ag.name for ag in stmt.agent_list() if ag is not None]
+        if isinstance(stmt, Complex):
+            return [(a, b) for a in names for b in names if a != b]
+        return [(names[0], name) for name in names[1:]]
+
+    successors = defaultdict(set)
+    predecessors = defaultdict(set)
+    for stmt in stmts:
+        for source, target in get_edges(stmt):
+            successors[source].add(target)
+            predecessors[target].add(source)
+    sources = set()
+    targets = set()
+    for stmt in center_stmts:
+        for source, target in get_edges(stmt):
+            sources.add(source)
+            targets.add(target)
+
+    def bfs(start, neighbors):
+        visited = set(start)
+        frontier = set(start)
+        for _ in range(max_depth):
+            frontier = {neighbor for node in frontier
+                        for neighbor in neighbors[node]} - visited
+            if not frontier:
+                break
+            visited |= frontier
+        return visited
+    return bfs(sources, predecessors), bfs(targets, successors)
+
+
+def get_test_shard(test, n_shards):
+    """Return the index of the shard that a test deterministically belongs
+    to based on the hash of its statement."""
+    return test.stmt.get_hash() % n_shards
+
+
+def get_shard_indices(tests, n_shards, shard_ix):
+    """Return indices of tests belonging to a given shard."""
+    return [ix for ix, test in enumerate(tests)
+            if get_test_shard(test, n_shards) == shard_ix]
+
+
+def merge_shard_results(shard_jsons):
+    """Merge the results of test shards into the unsharded results format.
+
+    Parameters
+    ----------
+    shard_jsons : list[dict]
+        A list of all shard results produced by
+        ModelManager.shard_results_to_json.
+
+    Returns
+    -------
+    results_json : dict
+        Test results in the same format as ModelManager.results_to_json
+        would produce them in an unsharded run.
+    json_lines : list[dict]
+        Path lines in the same format as ModelManager.results_to_json
+        would produce them in an unsharded run.
+    """
+    _check_shard_ixs([shard_json['shard_ix'] for shard_json in shard_jsons],
+                     shard_jsons[0]['n_shards'])
+    tests = []
+    for shard_json in shard_jsons:
+        tests += zip(shard_json['test_indices'], shard_json['results'],
+                     shard_json['paths'])
+    tests = sorted(tests, key=lambda x: x[0])
+    header = dict(shard_jsons[0]['header'])
+    json_lines = [line for _, _, test_json_lines in tests
+                  for line in test_json_lines]
+    header['path_stmt_counts'] = _count_path_stmts(json_lines)
+    results_json = make_compact_results(
+        header, [test_row for _, test_row, _ in tests])
+    return results_json, json_lines
+
+
+def write_merged_shard_results(shard_jsons, results_file, paths_file):
+    """Merge the results of test shards and write them to files.
+
+    The written content is the same as ModelManager.write_results writes
+    in an unsharded run. Shards are consumed one at a time and their tests
+    are spooled to temporary files so that only one shard is held in memory.
+
+    Parameters
+    ----------
+    shard_jsons : iterable[dict]
+        An iterable (e.g. a generator loading them one by one) of all shard
+        results produced by ModelManager.shard_results_to_json.
+    results_file : file-like
+        A text file to write the results in json format to.
+    paths_file : file-like
+        A text file to write the path lines in jsonl format to.
+
+    Returns
+    -------
+    header : dict
+        The header of the merged results.
+    """
+    spools = []
+    shard_ixs = []
+    header = None
+    n_shards = None
+    try:
+        for shard_json in shard_jsons:
+            if header is None:
+                header = dict(shard_json['header'])
+                n_shards = shard_json['n_shards']
+            shard_ixs.append(shard_json['shard_ix'])
+            spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+            spools.append(spool)
+            # Tests of a shard are in the order of their indices
+            for test in zip(shard_json['test_indices'],
+                            shard_json['results'], shard_json['paths']):
+                spool.write(json.dumps(test) + '\n')
+            spool.seek(0)
+        if header is None:
+            raise ValueError('No shard results to merge.')
+        _check_shard_ixs(shard_ixs, n_shards)
+        tests = heapq.merge(*[map(json.loads, spool) for spool in spools],
+                            key=lambda x: x[0])
+        writer = CompactResultsWriter(results_file, header['mc_types'])
+        lines_writer = JsonLinesWriter(paths_file)
+
+        def iter_lines():
+            for _, test_row, test_json_lines in tests:
+                writer.add_test(test_row)
+                for line in test_json_lines:
+                    lines_writer.write(line)
+                    yield line
+        header['path_stmt_counts'] = _count_path_stmts(iter_lines())
+        writer.close(header)
+    finally:
+        for spool in spools:
+            spool.close()
+    return header
+
+
+def write_compact_results(results_json, json_lines, results_file,
+                          paths_file):
+    """Write test results and path lines to files.
+
+    The written content is the same as ModelManager.write_results writes
+    for the same results.
+    """
+    writer = CompactResultsWriter(results_file,
+                                  list(results_json['results']))
+    for test_row in iter_compact_rows(results_json):
+        writer.add_test(test_row)
+    writer.close(results_json['header'])
+    lines_writer = JsonLinesWriter(paths_file)
+    for line in json_lines:
+        lines_writer.write(line)
+
+
+def _check_shard_ixs(shard_ixs, n_shards):
+    shard_ixs = sorted(shard_ixs)
+    if shard_ixs != list(range(n_shards)):
+        raise ValueError(f'Expected results of {n_shards} shards, got '
+                         f'shards {shard_ixs}.')
+
+
+def _count_path_stmts(json_lines):
+    # Counts are recomputed in the order in which an unsharded run
+    # encounters the statements so that the merged output is identical
+    path_stmt_counts = defaultdict(int)
+    for line in json_lines:
+        for edge in line['edges']:
+            if edge['type'] == 'statements':
+                for stmt_hash in edge['hashes']:
+                    path_stmt_counts[stmt_hash] += 1
+    return path_stmt_counts
+
+
+def _get_shard_key(model_name, test_corpus, date_str, n_shards, shard_ix):
+    return (f'results/{model_name}/shards/{test_corpus}_shard_{shard_ix}_of_'
+            f'{n_shards}_{date_str}.json')
+
+
+def _get_test_results_keys(model_name, test_corpus, date_str):
+    result_key = (f'results/{model_name}/results_'
+                  f'{test_corpus}_{date_str}.json')
+    paths_key = (f'paths/{model_name}/paths_{test_corpus}_'
+                 f'{date_str}.jsonl')
+    latest_paths_key = (f'paths/{model_name}/{test_corpus}'
+                        '_latest_paths.jsonl')
+    return result_key, paths_key, latest_paths_key
+
+
+def upload_test_results_to_s3(model_name, test_corpus, date_str, json_dict,
+                              json_lines, bucket=EMMAA_BUCKET_NAME):
+    """Upload test results and paths in json format to s3 bucket."""
+    result_key, paths_key, latest_paths_key = _get_test_results_keys(
+        model_name, test_corpus, date_str)
+    logger.info(f'Uploading test results to {result_key} and paths to '
+                f'{paths_key}')
+    with S3StreamWriter(bucket, result_key) as results_writer, \
+            S3StreamWriter(bucket, paths_key) as paths_writer:
+        write_compact_results(json_dict, json_lines, results_writer,
+                              paths_writer)
+    copy_s3_object(bucket, paths_key, latest_paths_key)
+
+
+def merge_test_shards_on_s3(model_name, n_shards,
+                            test_corpus='large_corpus_tests', date_str=None,
+                            bucket=EMMAA_BUCKET_NAME):
+    """Merge the results of test shards on s3 and upload the merged results.
+
+    Parameters
+    ----------
+    model_name : str
+        Name of EmmaaModel the tests were run against.
+    n_shards : int
+        The number of shards the tests were split into.
+    test_corpus : str
+        Name of the test corpus.
+    date_str : Optional[str]
+        Date string of the model manager the tests were run with. If not
+        given, the latest shard results for the model are merged.
+    bucket : str
+        The bucket to load the shards from and to save the results to.
+
+    Returns
+    -------
+    header : dict
+        The header of the merged results.
+    """
+    if date_str is None:
+        first_key = find_latest_s3_file(
+            bucket, f'results/{model_name}/shards/{test_corpus}_shard_0_of_'
+            f'{n_shards}_', '.json')
+        date_str = strip_out_date(first_key, 'datetime')
+
+    def load_shards():
+        for shard_ix in range(n_shards):
+            shard_key = _get_shard_key(model_name, test_corpus, date_str,
+                                       n_shards, shard_ix)
+            logger.info(f'Loading test shard results from {shard_key}')
+            yield load_json_from_s3(bucket, shard_key)
+    result_key, paths_key, latest_paths_key = _get_test_results_keys(
+        model_name, test_corpus, date_str)
+    logger.info(f'Uploading merged test results to {result_key} and paths '
+                f'to {paths_key}')
+    with S3StreamWriter(bucket, result_key) as results_writer, \
+            S3StreamWriter(bucket, paths_key) as paths_writer:
+        header = write_merged_shard_results(load_shards(), results_writer,
+                                            paths_writer)
+    copy_s3_object(bucket, paths_key, latest_paths_key)
+    return header
+
+
 class TestManager(object):
     """Manager to generate and run a set of tests on a set of models.
 
@@ -764,13 +2568,32 @@ class TestManager(object):
         logger.info(f'Checking applicability of {len(self.tests)} tests to '
                     f'{len(self.model_managers)} models with '
                     f'{type(test_connector).__name__}')
-        for model_manager, test in itertools.product(self.model_managers,
-                                                     self.tests):
-            if test_connector.applicable(model_manager, test):
-                model_manager.add_test(test)
-                logger.debug(f'Test {test.stmt} is applicable')
+        # Index the models by the names of their entities so that each test
+        # is resolved against all models at once with set lookups
+        models_by_name = defaultdict(set)
+        for ix, model_manager in enumerate(self.model_managers):
+            for entity in model_manager.entities:
+                models_by_name[entity.name].add(ix)
+        all_models = set(range(len(self.model_managers)))
+        for test in self.tests:
+            name_groups = test_connector.get_entity_name_groups(test)
+            # Connectors that can't be resolved by names are called directly
+            if name_groups is None:
+                applicable_models = {
+                    ix for ix, model_manager in
+                    enumerate(self.model_managers)
+                    if test_connector.applicable(model_manager, test)}
             else:
-                logger.debug(f'Test {test.stmt} is not applicable')
+                applicable_models = all_models
+                for name_group in name_groups:
+                    group_models = set()
+                    for name in name_group:
+                        group_models |= models_by_name.get(name, set())
+                    applicable_models = applicable_models & group_models
+                    if not applicable_models:
+                        break
+            for ix in sorted(applicable_models):
+                self.model_managers[ix].add_test(test)
         logger.info(f'Created tests for {len(self.model_managers)} models.')
         for model_manager in self.model_managers:
             logger.info(f'Created {len(model_manager.applicable_tests)} tests '
@@ -797,6 +2620,16 @@ class TestConnector(object):
         """Return True if the test is applicable to the given model."""
         return True
 
+    @staticmethod
+    def get_entity_name_groups(test):
+        """Return groups of entity names that a model has to overlap with.
+
+        A test is applicable to a model if the model has at least one entity
+        with a name in each of the groups. Connectors that can't be expressed
+        this way return None and applicable is called for each model instead.
+        """
+        return None
+
 
 class ScopeTestConnector(TestConnector):
     """Determines applicability of a test to a model by overlap in scope."""
@@ -806,6 +2639,11 @@ class ScopeTestConnector(TestConnector):
         test_entities = test.get_entities()
         return ScopeTestConnector._overlap(model, test_entities)
 
+    @staticmethod
+    def get_entity_name_groups(test):
+        """Return a group with the name of each test entity."""
+        return [{e.name} for e in test.get_entities()]
+
     @staticmethod
     def _overlap(model, test_entities):
         if model not in model_entity_names:
@@ -824,20 +2662,21 @@ class RefinementTestConnector(TestConnector):
     @staticmethod
     def applicable(model, test):
         """Return True of all test entities are in the set of model entities"""
-        test_entities = test.get_entities()
-        test_entity_groups = []
-        for te in test_entities:
-            te_group = [te]
-            ns, gr = te.get_grounding()
-            children = bio_ontology.get_children(ns, gr)
-            for ns, gr in children:
-                name = bio_ontology.get_name(ns, gr)
-                ag = Agent(name, db_refs={ns: gr})
-                te_group.append(ag)
-            test_entity_groups.append(te_group)
+        test_entity_groups = [
+            [Agent(name) for name in name_group] for name_group in
+            RefinementTestConnector.get_entity_name_groups(test)]
         return RefinementTestConnector._overlap(model,
                                                 test_entity_groups)
 
+    @staticmethod
+    def get_entity_name_groups(test):
+        """Return groups of names of each test entity and its refinements."""
+        name_groups = []
+        for te in test.get_entities():
+            ns, gr = te.get_grounding()
+            name_groups.append({te.name} | _get_refinement_names(ns, gr))
+        return name_groups
+
     @staticmethod
     def _ref_group_overlap(model, test_entity_group):
         if model not in model_entity_names:
@@ -854,6 +2693,13 @@ class RefinementTestConnector(TestConnector):
             model, te_group) for te_group in test_entity_groups])
 
 
+@lru_cache(maxsize=None)
+def _get_refinement_names(ns, gr):
+    # The names of all refinements of a grounding are only looked up once
+    return frozenset(bio_ontology.get_name(ch_ns, ch_gr)
+                     for ch_ns, ch_gr in bio_ontology.get_children(ns, gr))
+
+
 class EmmaaTest(object):
     """Represent an EMMAA test condition"""
     def get_entities(self):
@@ -920,13 +2766,362 @@ def load_tests_from_s3(test_name, bucket=EMMAA_BUCKET_NAME):
 
 def save_model_manager_to_s3(model_name, model_manager,
                              bucket=EMMAA_BUCKET_NAME):
+    """Save a ModelManager to S3 in a split format.
+
+    The ModelManager is pickled without its statements, paper IDs and
+    assembled models. The config, the paper IDs and the models that were
+    already assembled are stored as separate components listed in a manifest
+    (graph models as compact graph artifacts) and are loaded on demand after
+    the ModelManager is loaded with load_model_manager_from_s3. The assembled
+    statements are expected to be saved with save_assembled_statements and
+    models that were not assembled are assembled from them when first used.
+    """
     logger.info(f'Saving a model manager for {model_name} model to S3.')
     date_str = model_manager.date_str
-    model_manager.model.stmts = []
-    model_manager.model.assembled_stmts = []
-    model_manager.model.dynamic_assembled_stmts = []
-    save_pickle_to_s3(model_manager, bucket,
-                      f'results/{model_name}/model_manager_{date_str}.pkl')
+    model = model_manager.model
+    prefix = _get_components_prefix(model_name, date_str)
+    components = {
+        'config': _save_component(
+            json.dumps(model_manager.model.config).encode('utf-8'), bucket,
+            f'{prefix}/config.json'),
+        'paper_ids': _save_component(
+            json.dumps(list(model_manager.get_paper_ids())).encode('utf-8'),
+            bucket, f'{prefix}/paper_ids.json'),
+        # Assembled statements are stored when the model is assembled
+        'assembled_stmts': {'date': strip_out_date(date_str, 'date')},
+        'models': {}}
+    # Models are detached from the ModelManager while it is pickled and are
+    # set back after pickling
+    detached_entries = {}
+    for mc_type in list(model_manager.mc_types):
+        if not model_manager.mc_types.is_assembled(mc_type):
+            continue
+        entry = model_manager.mc_types[mc_type]
+        assembled_model = entry.get('model')
+        if assembled_model is None:
+            continue
+        if mc_type in COMPACT_GRAPH_TYPES:
+            component = _save_component(
+                CompactGraph.from_graph(assembled_model).to_bytes(), bucket,
+                _get_compact_graph_key(model_name, mc_type, date_str))
+            component['format'] = 'compact_graph'
+        else:
+            component = _save_component(
+                pickle.dumps(assembled_model, protocol=4), bucket,
+                f'{prefix}/{mc_type}_model.pkl')
+            component['format'] = 'pickle'
+        components['models'][mc_type] = component
+        detached_entries[mc_type] = entry
+        model_manager.mc_types.reset(mc_type)
+    # Statements and paper IDs are also detached while pickling. Assembled
+    # statements are detached without the property so that they are not
+    # loaded if they weren't used and their version (that caches are keyed
+    # on) doesn't change.
+    paper_ids = model_manager.get_paper_ids()
+    detached_attrs = {'paper_ids': None, 'stmts': [],
+                      '_assembled_stmts': [], '_assembled_stmts_loader': None,
+                      'dynamic_assembled_stmts': []}
+    detached_values = {attr: getattr(model, attr) for attr in detached_attrs}
+    detached_values['paper_ids'] = paper_ids
+    for attr, value in detached_attrs.items():
+        setattr(model, attr, value)
+    try:
+        _save_component(
+            pickle.dumps(model_manager, protocol=4), bucket,
+            f'results/{model_name}/model_manager_{date_str}.pkl')
+    finally:
+        for attr, value in detached_values.items():
+            setattr(model, attr, value)
+        for mc_type, entry in detached_entries.items():
+            model_manager.mc_types[mc_type] = entry
+    manifest = {'version': MODEL_MANAGER_FORMAT_VERSION,
+                'model_name': model_name,
+                'date_str': date_str,
+                'components': components}
+    save_json_to_s3(manifest, bucket, f'{prefix}/manifest.json')
+    return manifest
+
+
+def _get_components_prefix(model_name, date_str):
+    return f'results/{model_name}/components_{date_str}'
+
+
+def _save_component(body, bucket, key):
+    s3_put(bucket=bucket, key=key, body=body, unsigned_client=False)
+    logger.info(f'Saved {len(body) / 1e6:.2f} MB to {key}')
+    return {'key': key, 'size': len(body)}
+
+
+def load_model_manager_manifest(model_name, date_str,
+                                bucket=EMMAA_BUCKET_NAME):
+    """Load the manifest of the components of a saved ModelManager.
+
+    Returns None if the ModelManager was saved as a single pickle.
+    """
+    key = f'{_get_components_prefix(model_name, date_str)}/manifest.json'
+    try:
+        return load_json_from_s3(bucket, key)
+    except Exception as e:
+        logger.info(f'Could not load the manifest from {key}')
+        logger.info(e)
+        return None
+
+
+class ModelManagerComponents(object):
+    """Components of a ModelManager stored separately on S3.
+
+    Parameters
+    ----------
+    manifest : dict
+        A manifest written by save_model_manager_to_s3 listing the keys and
+        sizes of the components.
+    bucket : Optional[str]
+        The S3 bucket the components are stored in.
+
+    Attributes
+    ----------
+    load_times : dict
+        A dictionary mapping names of loaded components to the time in
+        seconds it took to load them.
+    """
+    def __init__(self, manifest, bucket=EMMAA_BUCKET_NAME):
+        self.manifest = manifest
+        self.bucket = bucket
+        self.load_times = {}
+
+    def _load_body(self, name, component):
+        start = time.time()
+        client = get_s3_client()
+        with timed_phase('s3_read'):
+            body = client.get_object(Bucket=self.bucket,
+                                     Key=component['key'])['Body'].read()
+        self.load_times[name] = time.time() - start
+        logger.info(f'Loaded {name} ({len(body) / 1e6:.2f} MB) from '
+                    f'{component["key"]} in {self.load_times[name]:.2f} '
+                    f'seconds.')
+        return body
+
+    def load_config(self):
+        """Return the config of the model."""
+        component = self.manifest['components']['config']
+        return json.loads(self._load_body('config', component))
+
+    def load_paper_ids(self):
+        """Return the list of paper IDs of the model."""
+        component = self.manifest['components']['paper_ids']
+        return json.loads(self._load_body('paper_ids', component))
+
+    def has_assembled_stmts(self):
+        """Return True if the manifest lists the assembled statements."""
+        return 'assembled_stmts' in self.manifest['components']
+
+    def load_assembled_stmts(self):
+        """Return the assembled statements of the model."""
+        component = self.manifest['components']['assembled_stmts']
+        start = time.time()
+        with timed_phase('s3_read'):
+            stmts, key = get_assembled_statements(
+                self.manifest['model_name'], component['date'],
+                bucket=self.bucket)
+        self.load_times['assembled_stmts'] = time.time() - start
+        logger.info(f'Loaded assembled statements from {key} in '
+                    f'{self.load_times["assembled_stmts"]:.2f} seconds.')
+        return stmts if stmts is not None else []
+
+    def load_model(self, mc_type):
+        """Return the assembled model of a given type or None if it is not
+        stored or could not be loaded."""
+        component = self.manifest['components']['models'].get(mc_type)
+        if component is None:
+            return None
+        try:
+            body = self._load_body(mc_type, component)
+        except Exception as e:
+            logger.info(f'Could not load the {mc_type} model')
+            logger.info(e)
+            return None
+        if component['format'] == 'compact_graph':
+            return CompactGraph.from_bytes(body).to_graph()
+        return pickle.loads(body)
+
+
+def _get_compact_graph_key(model_name, mc_type, date_str):
+    return f'results/{model_name}/{mc_type}_graph_{date_str}.npz'
+
+
+def load_compact_graph(model_name, mc_type, date_str,
+                       bucket=EMMAA_BUCKET_NAME):
+    """Load a graph model of a given type from a compact graph artifact.
+
+    Parameters
+    ----------
+    model_name : str
+        Name of EmmaaModel.
+    mc_type : str
+        A type of a graph model ('signed_graph' or 'unsigned_graph').
+    date_str : str
+        Date string of the ModelManager the graph was saved with.
+
+    Returns
+    -------
+    graph : networkx.DiGraph or networkx.MultiDiGraph or None
+        The graph model or None if the artifact could not be loaded.
+    """
+    key = _get_compact_graph_key(model_name, mc_type, date_str)
+    try:
+        return load_compact_graph_from_s3(bucket, key).to_graph()
+    except Exception as e:
+        logger.info(f'Could not load compact graph from {key}')
+        logger.info(e)
+        return None
+
+
+def get_pysb_content_hash(pysb_model, model_stmts):
+    """Return a hash of the content the influence map of model rules
+    depends on.
+
+    Parameters
+    ----------
+    pysb_model : pysb.Model
+        A PySB model. Its observables are not included since they are
+        generated from the checked statements.
+    model_stmts : list[indra.statements.Statement]
+        Statements the model was assembled from (used to prune the influence
+        map).
+
+    Returns
+    -------
+    content_hash : str
+        A hex digest of the SHA-256 hash of the content.
+    """
+    parts = [f'version: {INFLUENCE_MAP_VERSION}']
+    for set_name in COMPONENT_SET_NAMES:
+        if set_name == 'observables':
+            continue
+        parts += [repr(component) for component in
+                  getattr(pysb_model, set_name)]
+    parts += [repr(initial) for initial in pysb_model.initials]
+    # Annotations of observables are added by the ModelChecker each time an
+    # influence map is generated
+    parts += [repr(ann) for ann in pysb_model.annotations
+              if not str(ann.subject).endswith('_obs')]
+    parts.append('model statements')
+    parts += sorted(str(stmt.get_hash()) for stmt in model_stmts)
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def is_valid_influence_map(artifact, content_hash, pysb_model):
+    """Return True if a stored influence map matches a PySB model."""
+    if artifact.get('content_hash') != content_hash:
+        return False
+    im_rules = {node for node, node_type in
+                artifact['im'].nodes(data='node_type') if node_type == 'rule'}
+    return im_rules == {rule.name for rule in pysb_model.rules}
+
+
+def make_rule_influence_map(mc):
+    """Return the influence map of the model of a PysbModelChecker without
+    observables."""
+    model = mc.model
+    observables = model.observables
+    model.observables = ComponentSet([])
+    try:
+        return mc.generate_im(model)
+    finally:
+        model.observables = observables
+
+
+def add_observable_influences(rule_im, generate_im, model):
+    """Return the influence map of a PySB model with observables made from
+    the influence map of its rules.
+
+    The influence of a rule on an observable only depends on the rule and
+    the observable, so the influences on observables are generated from
+    the model reduced to the rules that contain monomers of the observables.
+    The nodes and edges of the returned influence map are in the same order
+    as in the influence map generated from the whole model.
+
+    Parameters
+    ----------
+    rule_im : networkx.MultiDiGraph
+        The influence map of the model without observables (see
+        make_rule_influence_map).
+    generate_im : function
+        A function generating the influence map of a PySB model (e.g.
+        PysbModelChecker.generate_im).
+    model : pysb.Model
+        The model with observables.
+
+    Returns
+    -------
+    im : networkx.MultiDiGraph
+        The influence map of the model with observables.
+    """
+    obs_monomers = {mp.monomer.name for obs in model.observables
+                    for cp in obs.reaction_pattern.complex_patterns
+                    for mp in cp.monomer_patterns}
+    obs_im = nx.MultiDiGraph()
+    if model.observables:
+        rules = model.rules
+        model.rules = ComponentSet(
+            [rule for rule in rules
+             if _get_rule_monomers(rule) & obs_monomers])
+        try:
+            obs_im = generate_im(model)
+        finally:
+            model.rules = rules
+    im = nx.MultiDiGraph()
+    im.add_nodes_from(rule_im.nodes(data=True))
+    im.add_nodes_from((obs.name, obs_im.nodes[obs.name])
+                      for obs in model.observables if obs.name in obs_im)
+    # Influence maps have all positive edges followed by all negative edges
+    # and edges of each source to rules followed by edges to observables
+    for sign in (1, -1):
+        for node in rule_im.nodes:
+            for graph in (rule_im, obs_im):
+                if node not in graph:
+                    continue
+                for _, target, data in graph.edges(node, data=True):
+                    if data['sign'] == sign and \
+                            (graph is rule_im or target not in rule_im):
+                        im.add_edge(node, target, **data)
+    return im
+
+
+def _get_rule_monomers(rule):
+    return {mp.monomer.name for cp in
+            rule.rule_expression.reactant_pattern.complex_patterns +
+            rule.rule_expression.product_pattern.complex_patterns
+            if cp is not None for mp in cp.monomer_patterns}
+
+
+def _get_influence_map_key(model_name, content_hash):
+    return f'results/{model_name}/influence_map_{content_hash}.pkl'
+
+
+def load_influence_map(model_name, content_hash, bucket=EMMAA_BUCKET_NAME):
+    """Load a stored pruned influence map of a PySB model.
+
+    Returns None if the artifact could not be loaded.
+    """
+    key = _get_influence_map_key(model_name, content_hash)
+    try:
+        return load_pickle_from_s3(bucket, key)
+    except Exception as e:
+        logger.info(f'Could not load influence map from {key}')
+        logger.info(e)
+        return None
+
+
+def save_influence_map(model_name, content_hash, artifact,
+                       bucket=EMMAA_BUCKET_NAME):
+    """Store a pruned influence map of a PySB model by its content hash."""
+    key = _get_influence_map_key(model_name, content_hash)
+    try:
+        save_pickle_to_s3(artifact, bucket, key)
+    except Exception as e:
+        logger.warning(f'Could not save influence map to {key}')
+        logger.warning(e)
 
 
 def load_model_manager_from_s3(model_name=None, key=None,
@@ -934,13 +3129,24 @@ def load_model_manager_from_s3(model_name=None, key=None,
     # First try find the file from specified key
     if key:
         try:
+            start = time.time()
             model_manager = load_pickle_from_s3(bucket, key)
-            if not model_manager.model.assembled_stmts:
+            logger.info(f'Loaded the model manager from {key} in '
+                        f'{time.time() - start:.2f} seconds.')
+            manifest = load_model_manager_manifest(
+                model_manager.model.name, model_manager.date_str,
+                bucket=bucket)
+            if manifest:
+                # Assembled statements are loaded when they are first used
+                model_manager.set_components(
+                    ModelManagerComponents(manifest, bucket=bucket))
+            elif not model_manager.model.assembled_stmts:
                 stmts, _ = get_assembled_statements(
                     model_manager.model.name,
                     strip_out_date(model_manager.date_str, 'date'),
                     bucket=bucket)
                 model_manager.model.assembled_stmts = stmts
+            model_manager.load_compact_graphs(bucket=bucket)
             return model_manager
         except Exception as e:
             logger.info('Could not load the model manager directly')
@@ -975,7 +3181,7 @@ def load_model_manager_from_s3(model_name=None, key=None,
 
 def update_model_manager_on_s3(model_name, bucket=EMMAA_BUCKET_NAME):
     model = EmmaaModel.load_from_s3(model_name, bucket=bucket)
-    mm = ModelManager(model)
+    mm = ModelManager(model, lazy=False)
     save_model_manager_to_s3(model_name, mm, bucket=bucket)
     return mm
 
@@ -1018,8 +3224,57 @@ def save_tests_to_s3(tests, bucket, key, save_format='pkl'):
         save_json_to_s3(stmts_json, bucket, key, save_format)
 
 
+def load_previous_test_round(model_name, test_corpus, date_str,
+                             bucket=EMMAA_BUCKET_NAME):
+    """Load results, paths and statement hashes of a previous test round.
+
+    Parameters
+    ----------
+    model_name : str
+        Name of EmmaaModel the tests were run against.
+    test_corpus : str
+        Name of the test corpus.
+    date_str : str
+        Date string of the current model manager. The latest test round
+        with a different date string is loaded.
+
+    Returns
+    -------
+    previous_round : tuple or None
+        A tuple of previous test results, path lines and a set of hashes of
+        the statements in the previous model or None if any of them can't
+        be loaded.
+    """
+    keys = sort_s3_files_by_date_str(
+        bucket, f'results/{model_name}/results_{test_corpus}_', '.json')
+    keys = [key for key in keys if strip_out_date(key) != date_str]
+    if not keys:
+        logger.info('Could not find previous test results.')
+        return None
+    previous_date = strip_out_date(keys[0])
+    logger.info(f'Loading previous test round from {previous_date}')
+    try:
+        results = load_json_from_s3(bucket, keys[0])
+        paths = load_jsonl_from_s3(
+            bucket, f'paths/{model_name}/paths_{test_corpus}_'
+                    f'{previous_date}.jsonl')
+        stmts, _ = get_assembled_statements(
+            model_name,
+            get_results_header(results).get('date_str', previous_date),
+            bucket)
+    except Exception as e:
+        logger.info('Could not load the previous test round')
+        logger.info(e)
+        return None
+    if not stmts:
+        logger.info('Could not find previous assembled statements.')
+        return None
+    return results, paths, {stmt.get_hash() for stmt in stmts}
+
+
 def run_model_tests_from_s3(model_name, test_corpus='large_corpus_tests',
-                            upload_results=True, bucket=EMMAA_BUCKET_NAME):
+                            upload_results=True, bucket=EMMAA_BUCKET_NAME,
+                            n_shards=1, shard_ix=None, incremental=False):
     """Run a given set of tests on a given model, both loaded from S3.
 
     After loading both the model and the set of tests, model/test overlap
@@ -1035,6 +3290,19 @@ def run_model_tests_from_s3(model_name, test_corpus='large_corpus_tests',
     upload_results : Optional[bool]
         Whether to upload test results to S3 in JSON format. Can be set
         to False when running tests. Default: True
+    n_shards : Optional[int]
+        The number of shards to split the applicable tests into based on
+        their hashes. Default: 1 (no sharding).
+    shard_ix : Optional[int]
+        If given together with n_shards, only the tests in this shard are
+        run and the shard results are uploaded to be merged later with
+        merge_test_shards_on_s3. Otherwise, all shards are run in parallel
+        processes and the merged results are uploaded.
+    incremental : Optional[bool]
+        If True, only the tests that could be affected by the changes in the
+        model since the previous test round are rerun and the results of
+        other tests are reused. Only used when tests are not sharded.
+        Default: False
 
     Returns
     -------
@@ -1042,6 +3310,8 @@ def run_model_tests_from_s3(model_name, test_corpus='large_corpus_tests',
         Instance of ModelManager containing the model data, list of applied
         tests and the test results.
     """
+    # Only record the phases of this run in the timings artifact
+    phase_timings.reset()
     mm = load_model_manager_from_s3(model_name=model_name, bucket=bucket)
     test_dict, _ = load_tests_from_s3(test_corpus, bucket=bucket)
     if isinstance(test_dict, dict):
@@ -1074,8 +3344,41 @@ def run_model_tests_from_s3(model_name, test_corpus='large_corpus_tests',
     if mm.model.test_config.get('direct_paths'):
         allow_direct = mm.model.test_config['direct_paths'].get(
             test_corpus, True)
-    tm.run_tests(filter_func, edge_filter_func, allow_direct)
+    # Run a single shard of tests (e.g. as one of several batch jobs)
+    if n_shards > 1 and shard_ix is not None:
+        test_indices = mm.select_test_shard(n_shards, shard_ix)
+        tm.run_tests(filter_func, edge_filter_func, allow_direct)
+        if upload_results:
+            mm.upload_shard_results(n_shards, shard_ix, test_indices,
+                                    test_corpus, test_data, bucket=bucket)
+            save_phase_timings_to_s3(
+                mm.model.name, f'model_tests_{test_corpus}_shard_{shard_ix}',
+                mm.date_str, bucket=bucket)
+        return mm
+    # Run all shards in parallel processes and merge the results
+    if n_shards > 1:
+        json_dict, json_lines = mm.run_sharded_tests(
+            n_shards, filter_func, edge_filter_func, allow_direct, test_data)
+        if upload_results:
+            upload_test_results_to_s3(mm.model.name, test_corpus,
+                                      mm.date_str, json_dict, json_lines,
+                                      bucket=bucket)
+            save_phase_timings_to_s3(mm.model.name,
+                                     f'model_tests_{test_corpus}',
+                                     mm.date_str, bucket=bucket)
+        return mm
+    previous_round = None
+    if incremental:
+        previous_round = load_previous_test_round(
+            mm.model.name, test_corpus, mm.date_str, bucket=bucket)
+    if previous_round:
+        mm.run_incremental_tests(*previous_round, filter_func,
+                                 edge_filter_func, allow_direct)
+    else:
+        tm.run_tests(filter_func, edge_filter_func, allow_direct)
     # Optionally upload test results to S3
     if upload_results:
         mm.upload_results(test_corpus, test_data, bucket=bucket)
+        save_phase_timings_to_s3(mm.model.name, f'model_tests_{test_corpus}',
+                                 mm.date_str, bucket=bucket)
     return mm
@@ -0,0 +1,474 @@
+"""This module implements a path search engine for IndraNet model checkers.
+
+The engine is an alternative to the path search of INDRA's
+SignedGraphModelChecker and UnsignedGraphModelChecker that can be selected
+with the `path_engine` option of the model's test config. The IndraNet graph
+is converted once into integer-indexed CSR adjacency arrays (with each node
+doubled into a positive and a negative node for the signed graph). Node and
+edge filters are applied as masks over these arrays instead of copying the
+graph.
+
+The shortest path length is found by a bidirectional breadth first search
+bounded by the maximum path length. Paths of that length are then generated
+lazily by a depth first search pruned by the distances to the target so that
+it never enters branches that can't reach the target in time. The results
+are PathResult objects in the same format as the results of ModelCheckers.
+"""
+import logging
+from array import array
+from collections import deque
+from indra.explanation.model_checker import PathResult, PathMetric
+from emmaa.filter_functions import get_excluded_edges
+
+
+logger = logging.getLogger(__name__)
+
+
+class GraphPathEngine(object):
+    """Path search over a CSR representation of an IndraNet graph.
+
+    Parameters
+    ----------
+    graph : indra.assemblers.indranet.IndraNet
+        A signed (MultiDiGraph with edge signs) or unsigned (DiGraph) graph
+        assembled from the model.
+    signed : bool
+        Whether the graph is signed. The nodes of a signed graph are doubled
+        into (node, 0) and (node, 1) as in the signed graph of
+        SignedGraphModelChecker.
+    """
+    def __init__(self, graph, signed):
+        self.graph = graph
+        self.signed = signed
+        signs = (0, 1) if signed else (0,)
+        self.nodes = [(node, sign) for node in graph.nodes for sign in signs]
+        self.node_ix = {node: ix for ix, node in enumerate(self.nodes)}
+        # Edges of the original graph that each CSR edge comes from
+        edge_sources = {}
+        edges = graph.edges(keys=True, data='sign') if graph.is_multigraph() \
+            else ((u, v, None, sign) for u, v, sign in graph.edges(data='sign'))
+        for u, v, key, sign in edges:
+            orig_edge = (u, v) if key is None else (u, v, key)
+            if signed:
+                if sign is None:
+                    continue
+                signed_edges = [((u, s), (v, s ^ sign)) for s in signs]
+            else:
+                signed_edges = [((u, 0), (v, 0))]
+            for source, target in signed_edges:
+                edge_sources.setdefault(
+                    (self.node_ix[source], self.node_ix[target]),
+                    []).append(orig_edge)
+        self._edge_sources = list(edge_sources.values())
+        self.succ_ptr, self.succ_ix, self.succ_edge = \
+            _make_csr(len(self.nodes), list(edge_sources), reverse=False)
+        self.pred_ptr, self.pred_ix, self.pred_edge = \
+            _make_csr(len(self.nodes), list(edge_sources), reverse=True)
+        self._edge_masks = {}
+
+    def get_edge_mask(self, edge_filter_func):
+        """Return a mask of CSR edges allowed by an edge filter function.
+
+        An edge between signed nodes is allowed if any of the edges of the
+        IndraNet graph it comes from is allowed.
+        """
+        if edge_filter_func is None:
+            return None
+        if edge_filter_func not in self._edge_masks:
+            excluded = get_excluded_edges(self.graph, edge_filter_func)
+            self._edge_masks[edge_filter_func] = bytearray(
+                any(edge not in excluded for edge in edges)
+                for edges in self._edge_sources)
+        return self._edge_masks[edge_filter_func]
+
+    def get_node_mask(self, node_filter_func):
+        """Return a mask of nodes allowed by a node filter function."""
+        if node_filter_func is None:
+            return None
+        return bytearray(bool(node_filter_func(node)) for node in self.nodes)
+
+    def check_statement(self, mc, stmt, max_paths=1, max_path_length=5,
+                        node_filter_func=None, edge_filter_func=None,
+                        allow_direct=True, node_mask=None):
+        """Check a statement in the same way as ModelChecker.check_statement.
+
+        Parameters
+        ----------
+        mc : indra.explanation.model_checker.ModelChecker
+            A SignedGraphModelChecker or UnsignedGraphModelChecker used to
+            find the subject and object nodes of the statement.
+        stmt : indra.statements.Statement
+            The statement to check.
+        max_paths : int
+            The maximum number of paths to return.
+        max_path_length : int
+            The maximum length of paths to return.
+        node_filter_func : Optional[function]
+            A function taking a node and returning True if the node is
+            allowed to be in a path.
+        edge_filter_func : Optional[function]
+            A function taking a graph and the nodes (and key) of an edge and
+            returning True if the edge is allowed to be in a path.
+        allow_direct : Optional[bool]
+            Whether to allow direct paths of length 1.
+        node_mask : Optional[bytearray]
+            A mask of node_filter_func made by get_node_mask. It is made
+            from node_filter_func if not given.
+
+        Returns
+        -------
+        result : indra.explanation.model_checker.PathResult
+            The result of checking the statement.
+        """
+        subj, obj, result_code = mc.process_statement(stmt)
+        if result_code:
+            return mc.make_false_result(result_code, max_paths,
+                                        max_path_length)
+        return self.find_paths(mc, subj, obj, max_paths, max_path_length,
+                               node_filter_func=node_filter_func,
+                               edge_filter_func=edge_filter_func,
+                               allow_direct=allow_direct, node_mask=node_mask)
+
+    def find_paths(self, mc, subj, obj, max_paths=1, max_path_length=5,
+                   node_filter_func=None, edge_filter_func=None,
+                   allow_direct=True, node_mask=None):
+        """Find paths between the subject and object nodes of a statement
+        that were found by ModelChecker.process_statement.
+
+        The parameters other than subj and obj are the same as in
+        check_statement.
+
+        Parameters
+        ----------
+        subj : indra.explanation.model_checker.NodesContainer
+            The subject nodes of the statement.
+        obj : indra.explanation.model_checker.NodesContainer
+            The object nodes of the statement.
+
+        Returns
+        -------
+        result : indra.explanation.model_checker.PathResult
+            The result of checking the statement.
+        """
+        # Statements without a subject, loops and statements with subject
+        # and object nodes in common are left to the ModelChecker
+        if not subj.all_nodes or set(subj.all_nodes) & set(obj.all_nodes):
+            return find_model_checker_paths(
+                mc, subj, obj, max_paths, max_path_length,
+                node_filter_func=node_filter_func, allow_direct=allow_direct)
+        if node_mask is None:
+            node_mask = self.get_node_mask(node_filter_func)
+        search = _Search(self, subj, obj, node_mask,
+                         self.get_edge_mask(edge_filter_func))
+        path_length = None
+        if allow_direct and max_paths:
+            path_length = search.shortest_length(max_path_length)
+        if path_length is not None:
+            # Only the sources with the shortest paths are found and listed
+            # in the path metrics
+            sources = search.sources_at_length(path_length)
+            path_metrics = [PathMetric(self.nodes[source], search.target_node,
+                                       path_length) for source in sources]
+        else:
+            pr, path_length, sources = search.classify(
+                max_paths, max_path_length, allow_direct)
+            if pr.result_code != 'PATHS_FOUND':
+                return pr
+            path_metrics = pr.path_metrics
+        pr = PathResult(True, 'PATHS_FOUND', max_paths, max_path_length)
+        pr.path_metrics = path_metrics
+        for path in search.iter_paths(sources, path_length):
+            path = [self.nodes[ix] for ix in path]
+            if subj.is_ref(path[0]):
+                path.insert(0, mc.get_ref(subj.main_agent, path[0],
+                                          'has_ref'))
+            if obj.is_ref(path[-1]):
+                path.append(mc.get_ref(obj.main_agent, path[-1], 'is_ref'))
+            pr.add_path(tuple(path))
+            if len(pr.paths) >= max_paths:
+                break
+        return pr
+
+
+def find_model_checker_paths(mc, subj, obj, max_paths=1, max_path_length=5,
+                             node_filter_func=None, allow_direct=True):
+    """Find paths with a ModelChecker between the subject and object nodes of
+    a statement that were found by ModelChecker.process_statement.
+
+    This is the same as ModelChecker.check_statement without processing the
+    statement again. The graph of the ModelChecker has to be built.
+
+    Parameters
+    ----------
+    mc : indra.explanation.model_checker.ModelChecker
+        A ModelChecker with a graph.
+    subj : indra.explanation.model_checker.NodesContainer
+        The subject nodes of the statement.
+    obj : indra.explanation.model_checker.NodesContainer
+        The object nodes of the statement.
+    max_paths : int
+        The maximum number of paths to return.
+    max_path_length : int
+        The maximum length of paths to return.
+    node_filter_func : Optional[function]
+        A function taking a node and returning True if the node is allowed
+        to be in a path.
+    allow_direct : Optional[bool]
+        Whether to allow direct paths of length 1.
+
+    Returns
+    -------
+    result : indra.explanation.model_checker.PathResult
+        The result of checking the statement.
+    """
+    loop = subj.get_total_nodes() == obj.get_total_nodes() == 1 and \
+        subj.all_nodes[0] == obj.all_nodes[0]
+    # As in ModelChecker.check_statement, several objects and loops are
+    # searched with a common target linked to the objects (or to the
+    # predecessors of the object in a loop)
+    common_target = None
+    if obj.get_total_nodes() > 1 or loop:
+        common_target = ('common_target', 0)
+        mc.graph.add_node(common_target)
+        obj.common_target = common_target
+        if loop:
+            for node in list(mc.graph.predecessors(obj.all_nodes[0])):
+                mc.graph.add_edge(node, common_target)
+        else:
+            for node in obj.all_nodes:
+                mc.graph.add_edge(node, common_target)
+    try:
+        result = mc.find_paths(subj, obj, max_paths, max_path_length, loop,
+                               filter_func=node_filter_func,
+                               allow_direct=allow_direct)
+    finally:
+        if common_target:
+            mc.graph.remove_node(common_target)
+    if result.path_found:
+        return result
+    return mc.make_false_result('NO_PATHS_FOUND', max_paths, max_path_length)
+
+
+class _Search(object):
+    # The search for paths between the nodes of a statement
+    def __init__(self, engine, subj, obj, node_mask, edge_mask):
+        self.engine = engine
+        self.sources = [engine.node_ix[node] for node in subj.all_nodes
+                        if node[1] == 0 and node in engine.node_ix]
+        self.source_set = set(self.sources)
+        self.targets = [engine.node_ix[node] for node in obj.all_nodes
+                        if node in engine.node_ix]
+        # With several object nodes, ModelCheckers search paths to a common
+        # target linked to all of them, so the object nodes are filtered as
+        # intermediate nodes
+        self.dummy_target = len(obj.all_nodes) > 1
+        self.target_node = ('common_target', 0) if self.dummy_target \
+            else obj.all_nodes[0]
+        self.node_mask = node_mask
+        self.edge_mask = edge_mask
+        self._target_dist = None
+
+    def _allowed(self, node, exempt):
+        return self.node_mask is None or self.node_mask[node] or \
+            node in exempt
+
+    def _roots(self, exempt):
+        if not self.dummy_target:
+            return self.targets
+        return [t for t in self.targets if self._allowed(t, exempt)]
+
+    def _neighbors(self, node, reverse):
+        e = self.engine
+        ptr, ix, edge = (e.pred_ptr, e.pred_ix, e.pred_edge) if reverse \
+            else (e.succ_ptr, e.succ_ix, e.succ_edge)
+        mask = self.edge_mask
+        for j in range(ptr[node], ptr[node + 1]):
+            if mask is None or mask[edge[j]]:
+                yield ix[j]
+
+    def shortest_length(self, bound):
+        """Return the length of the shortest path if it is at most bound."""
+        # Source nodes are never filtered when finding the path length
+        exempt = self.source_set | (set() if self.dummy_target
+                                    else set(self.targets))
+        fwd = {s: 0 for s in self.sources}
+        bwd = {t: 0 for t in self._roots(self.source_set)}
+        fwd_frontier, bwd_frontier = list(fwd), list(bwd)
+        fwd_depth = bwd_depth = 0
+        while fwd_frontier and bwd_frontier and \
+                fwd_depth + bwd_depth < bound:
+            reverse = len(bwd_frontier) < len(fwd_frontier)
+            if reverse:
+                bwd_depth += 1
+                frontier, dist, other = bwd_frontier, bwd, fwd
+            else:
+                fwd_depth += 1
+                frontier, dist, other = fwd_frontier, fwd, bwd
+            depth = bwd_depth if reverse else fwd_depth
+            best = None
+            new_frontier = []
+            for node in frontier:
+                for nb in self._neighbors(node, reverse):
+                    if nb in dist or not self._allowed(nb, exempt):
+                        continue
+                    if nb in other:
+                        length = depth + other[nb]
+                        best = length if best is None else min(best, length)
+                    dist[nb] = depth
+                    new_frontier.append(nb)
+            if best is not None:
+                return best
+            if reverse:
+                bwd_frontier = new_frontier
+            else:
+                fwd_frontier = new_frontier
+        return None
+
+    def _get_target_dist(self, max_depth):
+        # Distances to the target with the node filter of path enumeration
+        # in which only the target is exempt
+        if self._target_dist is None or self._target_dist[0] < max_depth:
+            exempt = set() if self.dummy_target else set(self.targets)
+            dist = {t: 0 for t in self._roots(exempt)}
+            queue = deque(dist)
+            while queue:
+                node = queue.popleft()
+                if dist[node] >= max_depth:
+                    continue
+                for nb in self._neighbors(node, True):
+                    if nb not in dist and self._allowed(nb, exempt):
+                        dist[nb] = dist[node] + 1
+                        queue.append(nb)
+            self._target_dist = (max_depth, dist)
+        return self._target_dist[1]
+
+    def source_length(self, source, path_length):
+        """Return True if a source has paths of a given length."""
+        # The source itself is not filtered, so its distance is found from
+        # its successors
+        dist = self._get_target_dist(path_length)
+        return any(dist.get(nb, path_length) < path_length
+                   for nb in self._neighbors(source, False))
+
+    def iter_paths(self, sources, path_length):
+        """Generate simple paths with path_length edges from the sources to
+        the targets."""
+        dist = self._get_target_dist(path_length)
+        target_set = set(self.targets)
+        for source in sources:
+            path = [source]
+            on_path = {source}
+            stack = [self._neighbors(source, False)]
+            while stack:
+                nb = next(stack[-1], None)
+                if nb is None:
+                    stack.pop()
+                    on_path.discard(path.pop())
+                    continue
+                remaining = path_length - len(path)
+                if remaining == 0:
+                    # Like simple_paths_with_constraints, the last step may
+                    # return to a single target that the path went through
+                    if nb in target_set and nb in dist and \
+                            (nb not in on_path or not self.dummy_target):
+                        yield path + [nb]
+                    continue
+                if nb in on_path or dist.get(nb, remaining + 1) > remaining:
+                    continue
+                path.append(nb)
+                on_path.add(nb)
+                stack.append(self._neighbors(nb, False))
+
+    def _find_sources(self, max_length=None):
+        # Breadth first search upstream from the target as in find_sources,
+        # yielding sources with the lengths of paths to the target (with the
+        # edge to a common target) in the same order
+        exempt = self.source_set
+        if self.dummy_target:
+            visited = set()
+            queue = deque([(self._roots(exempt), 0)])
+        else:
+            visited = {self.targets[0]}
+            queue = deque([(self._neighbors(self.targets[0], True), 0)])
+        while queue:
+            children, length = queue.popleft()
+            if max_length is not None and length >= max_length:
+                break
+            for child in children:
+                if not self._allowed(child, exempt):
+                    continue
+                if child in self.source_set:
+                    yield child, length + 1
+                if child not in visited:
+                    visited.add(child)
+                    queue.append((self._neighbors(child, True), length + 1))
+
+    def sources_at_length(self, path_length):
+        """Return the sources with shortest paths of a given length in the
+        order they are found by find_sources."""
+        if self.dummy_target:
+            path_length += 1
+        sources = []
+        for source, length in self._find_sources(path_length):
+            if length == path_length and source not in sources:
+                sources.append(source)
+        return sources
+
+    def classify(self, max_paths, max_path_length, allow_direct):
+        """Return a result following ModelChecker.find_paths along with the
+        path length and sources to search paths from."""
+        path_metrics = []
+        path_lengths = []
+        sources = []
+        for source, length in self._find_sources():
+            # Lengths to a common target include the edge to it
+            if self.dummy_target:
+                length -= 1
+            if length > 0:
+                path_metrics.append(PathMetric(self.engine.nodes[source],
+                                               self.target_node, length))
+                path_lengths.append(length)
+                if source not in sources:
+                    sources.append(source)
+        if path_metrics and max_paths == 0:
+            pr = PathResult(True, 'MAX_PATHS_ZERO', max_paths,
+                            max_path_length)
+        elif path_metrics:
+            min_path_length = min(path_lengths)
+            if not allow_direct and min_path_length == 1 and \
+                    len(path_lengths) > 1:
+                # ModelChecker.find_paths fails if all of several paths are
+                # direct, the direct paths are returned instead
+                min_path_length = min([pl for pl in path_lengths if pl != 1],
+                                      default=min_path_length)
+            if min_path_length <= max_path_length:
+                pr = PathResult(True, 'PATHS_FOUND', max_paths,
+                                max_path_length)
+                pr.path_metrics = path_metrics
+                return pr, min_path_length, sources
+            pr = PathResult(True, 'MAX_PATH_LENGTH_EXCEEDED', max_paths,
+                            max_path_length)
+        else:
+            return PathResult(False, 'NO_PATHS_FOUND', max_paths,
+                              max_path_length), None, []
+        pr.path_metrics = path_metrics
+        return pr, None, sources
+
+
+def _make_csr(n_nodes, edges, reverse):
+    # Return pointers, neighbors and edge indices of CSR adjacency arrays
+    counts = [0] * (n_nodes + 1)
+    for u, v in edges:
+        counts[(v if reverse else u) + 1] += 1
+    for ix in range(n_nodes):
+        counts[ix + 1] += counts[ix]
+    ptr = array('l', counts)
+    neighbors = array('l', [0] * len(edges))
+    edge_ixs = array('l', [0] * len(edges))
+    position = list(counts[:-1])
+    for edge_ix, (u, v) in enumerate(edges):
+        node, nb = (v, u) if reverse else (u, v)
+        neighbors[position[node]] = nb
+        edge_ixs[position[node]] = edge_ix
+        position[node] += 1
+    return ptr, neighbors, edge_ixs
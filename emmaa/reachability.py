@@ -0,0 +1,175 @@
+"""This module implements a reachability index of ModelChecker graphs.
+
+The index is used to find out quickly that there are no paths between the
+subject and object nodes of a test or query so that the full search of a
+ModelChecker can be skipped. The strongly connected components of a graph
+are condensed into a DAG and each component gets interval labels from
+randomized depth first traversals (as in GRAIL, Yildirim et al., 2010). If
+a component reaches another one, the interval labels of the reachable
+component are contained in the labels of the reaching one, so most
+unreachable pairs are rejected by comparing labels. The remaining pairs are
+resolved by a depth first search over the DAG pruned by the labels.
+
+The graphs of signed ModelCheckers have signed nodes, so the index of these
+graphs is sign-aware.
+"""
+import hashlib
+import logging
+import random
+import networkx as nx
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReachabilityIndex(object):
+    """An index of reachability between the nodes of a directed graph.
+
+    Parameters
+    ----------
+    graph : networkx.DiGraph or networkx.MultiDiGraph
+        A graph to index.
+    n_labels : Optional[int]
+        The number of interval labels of each component. Default: 2.
+    seed : Optional[int]
+        A seed for the randomized traversals. Default: 0.
+    graph_name : Optional[str]
+        A name of the graph (e.g. of the edge filter it was built with)
+        that is part of its fingerprint.
+
+    Attributes
+    ----------
+    components : dict
+        A dictionary mapping nodes of the graph to the indices of their
+        strongly connected components.
+    successors : list[tuple[int]]
+        Successors of each component in the condensed DAG.
+    labels : list[tuple[list[int], list[int]]]
+        For each labeling, the lowest and the post-order rank of each
+        component.
+    fingerprint : str
+        A hash of the name, nodes and edges of the indexed graph.
+    """
+    def __init__(self, graph, n_labels=2, seed=0, graph_name=None):
+        self.fingerprint = get_graph_fingerprint(graph, graph_name)
+        self.components = {}
+        for ix, component in enumerate(
+                nx.strongly_connected_components(graph)):
+            for node in component:
+                self.components[node] = ix
+        successors = [set() for _ in range(max(self.components.values(),
+                                               default=-1) + 1)]
+        for u, v in graph.edges():
+            cu, cv = self.components[u], self.components[v]
+            if cu != cv:
+                successors[cu].add(cv)
+        self.successors = [tuple(succ) for succ in successors]
+        rng = random.Random(seed)
+        self.labels = [self._make_labels(rng) for _ in range(n_labels)]
+
+    def _make_labels(self, rng):
+        # Assign post-order ranks in a randomized depth first traversal of
+        # the DAG and the lowest rank of all components below each one
+        n_components = len(self.successors)
+        has_predecessors = [False] * n_components
+        for succ in self.successors:
+            for component in succ:
+                has_predecessors[component] = True
+        roots = [ix for ix in range(n_components)
+                 if not has_predecessors[ix]]
+        rng.shuffle(roots)
+        low = [0] * n_components
+        rank = [0] * n_components
+        visited = [False] * n_components
+        next_rank = 1
+        for root in roots:
+            visited[root] = True
+            stack = [(root, iter(rng.sample(self.successors[root],
+                                            len(self.successors[root]))))]
+            while stack:
+                component, children = stack[-1]
+                for child in children:
+                    if not visited[child]:
+                        visited[child] = True
+                        stack.append((child, iter(rng.sample(
+                            self.successors[child],
+                            len(self.successors[child])))))
+                        break
+                else:
+                    stack.pop()
+                    rank[component] = next_rank
+                    low[component] = min(
+                        [next_rank] + [low[child] for child in
+                                       self.successors[component]])
+                    next_rank += 1
+        return low, rank
+
+    def is_valid_for(self, graph, graph_name=None):
+        """Return True if the index was built for a graph with the same
+        name, nodes and edges."""
+        # Indexes pickled before fingerprints were stored are rebuilt
+        return getattr(self, 'fingerprint', None) == \
+            get_graph_fingerprint(graph, graph_name)
+
+    def _contains(self, source, target):
+        # Labels of a reachable component are within the source labels
+        for low, rank in self.labels:
+            if low[target] < low[source] or rank[target] > rank[source]:
+                return False
+        return True
+
+    def may_reach(self, sources, targets):
+        """Return False if none of the targets is reachable from the sources.
+
+        Parameters
+        ----------
+        sources : list
+            Nodes to start paths from.
+        targets : list
+            Nodes to end paths at.
+
+        Returns
+        -------
+        may_reach : bool
+            False if there is no path from any of the sources to any of the
+            targets. True if there is a path or if some of the nodes are not
+            in the index.
+        """
+        try:
+            source_components = {self.components[node] for node in sources}
+            target_components = {self.components[node] for node in targets}
+        except KeyError:
+            return True
+        if source_components & target_components:
+            return True
+        stack = [component for component in source_components
+                 if any(self._contains(component, target)
+                        for target in target_components)]
+        visited = set(stack)
+        while stack:
+            component = stack.pop()
+            for child in self.successors[component]:
+                if child in target_components:
+                    return True
+                if child not in visited and \
+                        any(self._contains(child, target)
+                            for target in target_components):
+                    visited.add(child)
+                    stack.append(child)
+        return False
+
+
+def get_graph_fingerprint(graph, graph_name=None):
+    """Return a hash of the name, nodes and edges of a graph.
+
+    Nodes and edges are sorted by their representation so that the
+    fingerprint doesn't depend on the order in which they were added.
+    """
+    hasher = hashlib.sha256(repr(graph_name).encode('utf-8'))
+    for part in (sorted(repr(node) for node in graph.nodes()),
+                 sorted(repr(edge) for edge in graph.edges())):
+        hasher.update(b'\0')
+        for line in part:
+            hasher.update(line.encode('utf-8'))
+            hasher.update(b'\n')
+    return hasher.hexdigest()
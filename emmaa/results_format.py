@@ -0,0 +1,326 @@
+"""This module implements the compact columnar format of test results.
+
+Test results used to be stored as a list of dictionaries with a header
+followed by one dictionary per test containing the jsonpickle-flattened
+PathResult of each model type. In the compact format (version 2) the results
+are stored as a dictionary with the following structure:
+
+- format_version : the version of the format (2);
+- header : information about the model and the test round;
+- tests : the test type and the JSON of each test statement;
+- results : for each model type, columns with one value per test
+  (path_found, result_code, max_paths, max_path_length, path_metrics,
+  path_ids and path_json);
+- paths : a table of paths referenced by the path_ids column.
+
+Functions in this module read results in both the compact and the previous
+format.
+"""
+import json
+import logging
+import shutil
+import tempfile
+import jsonpickle
+from indra.explanation.model_checker import PathResult, PathMetric
+
+
+logger = logging.getLogger(__name__)
+
+
+RESULTS_FORMAT_VERSION = 2
+# Columns of the results of each model type, path_ids refer to the rows of
+# the paths table
+RESULT_COLUMNS = ['path_found', 'result_code', 'max_paths', 'max_path_length',
+                  'path_metrics', 'path_ids', 'path_json']
+# Columns that can be large and are spooled to disk by the writer
+SPOOLED_COLUMNS = {'path_json'}
+
+
+def path_result_to_row(result, path_json, pickler=None):
+    """Return a dictionary with the data of a PathResult in compact format.
+
+    Parameters
+    ----------
+    result : indra.explanation.model_checker.PathResult
+        A result of checking a test statement.
+    path_json : list[dict]
+        Paths of the result in the format produced by
+        ModelManager.make_path_json.
+    pickler : Optional[jsonpickle.pickler.Pickler]
+        A pickler to flatten path nodes that are not strings or numbers
+        (e.g. PyBEL nodes).
+
+    Returns
+    -------
+    row : dict
+        The values of result columns except path_ids and the encoded paths
+        under the paths key.
+    """
+    if pickler is None:
+        pickler = jsonpickle.pickler.Pickler()
+    return {
+        'path_found': result.path_found,
+        'result_code': result.result_code,
+        'max_paths': result.max_paths,
+        'max_path_length': result.max_path_length,
+        'path_metrics': [
+            [_encode_value(pm.source_node, pickler),
+             _encode_value(pm.target_node, pickler), pm.length]
+            for pm in result.path_metrics],
+        'paths': [[[_encode_value(value, pickler) for value in edge]
+                   for edge in path] for path in result.paths],
+        'path_json': path_json}
+
+
+def make_compact_results(header, test_rows):
+    """Return test results in compact format.
+
+    Parameters
+    ----------
+    header : dict
+        The header of the test results.
+    test_rows : list[dict]
+        A list of dictionaries, one per test, with test_type and test_json
+        keys and a row created by path_result_to_row for each model type.
+
+    Returns
+    -------
+    compact_results : dict
+        Test results in compact format.
+    """
+    results = {mc_type: {col: [] for col in RESULT_COLUMNS}
+               for mc_type in header['mc_types']}
+    tests = []
+    paths = []
+    for test_row in test_rows:
+        tests.append({'test_type': test_row['test_type'],
+                      'test_json': test_row['test_json']})
+        for mc_type, columns in results.items():
+            row = test_row[mc_type]
+            for col in RESULT_COLUMNS:
+                if col != 'path_ids':
+                    columns[col].append(row[col])
+            columns['path_ids'].append(
+                list(range(len(paths), len(paths) + len(row['paths']))))
+            paths += row['paths']
+    return {'format_version': RESULTS_FORMAT_VERSION,
+            'header': header,
+            'tests': tests,
+            'results': results,
+            'paths': paths}
+
+
+def iter_compact_rows(compact_results):
+    """Yield the rows of tests in compact results.
+
+    This is the inverse of make_compact_results: the yielded rows can be
+    added to a CompactResultsWriter to write the same results.
+    """
+    paths = compact_results['paths']
+    results = compact_results['results']
+    for ix, test in enumerate(compact_results['tests']):
+        test_row = {'test_type': test['test_type'],
+                    'test_json': test['test_json']}
+        for mc_type, columns in results.items():
+            row = {col: columns[col][ix] for col in RESULT_COLUMNS
+                   if col != 'path_ids'}
+            row['paths'] = [paths[path_id]
+                            for path_id in columns['path_ids'][ix]]
+            test_row[mc_type] = row
+        yield test_row
+
+
+class CompactResultsWriter(object):
+    """Write test results in compact format to a file one test at a time.
+
+    The written content is the same as the dumped output of
+    make_compact_results. Large columns are spooled to temporary files so
+    that only the small columns of all tests are kept in memory.
+
+    Parameters
+    ----------
+    results_file : file-like
+        A text file to write the results to.
+    mc_types : list[str]
+        A list of model types with results.
+    """
+    def __init__(self, results_file, mc_types):
+        self.results_file = results_file
+        self.mc_types = mc_types
+        self.tests = _JsonListSpool()
+        self.paths = _JsonListSpool()
+        self.results = {}
+        for mc_type in mc_types:
+            self.results[mc_type] = {
+                col: _JsonListSpool() if col in SPOOLED_COLUMNS else []
+                for col in RESULT_COLUMNS}
+        self.n_paths = 0
+
+    def add_test(self, test_row):
+        """Add the results of one test (see make_compact_results)."""
+        self.tests.append({'test_type': test_row['test_type'],
+                           'test_json': test_row['test_json']})
+        for mc_type, columns in self.results.items():
+            row = test_row[mc_type]
+            for col in RESULT_COLUMNS:
+                if col != 'path_ids':
+                    columns[col].append(row[col])
+            columns['path_ids'].append(
+                list(range(self.n_paths, self.n_paths + len(row['paths']))))
+            for path in row['paths']:
+                self.paths.append(path)
+            self.n_paths += len(row['paths'])
+
+    def close(self, header):
+        """Write the results with a given header and remove spooled files."""
+        f = self.results_file
+        try:
+            f.write(f'{{"format_version": {RESULTS_FORMAT_VERSION}, '
+                    f'"header": {json.dumps(header)}, "tests": ')
+            self.tests.write_to(f)
+            f.write(', "results": {')
+            for mc_ix, (mc_type, columns) in enumerate(self.results.items()):
+                f.write(f'{", " if mc_ix else ""}{json.dumps(mc_type)}: {{')
+                for col_ix, col in enumerate(RESULT_COLUMNS):
+                    f.write(f'{", " if col_ix else ""}{json.dumps(col)}: ')
+                    if col in SPOOLED_COLUMNS:
+                        columns[col].write_to(f)
+                    else:
+                        f.write(json.dumps(columns[col]))
+                f.write('}')
+            f.write('}, "paths": ')
+            self.paths.write_to(f)
+            f.write('}')
+        finally:
+            self.tests.close()
+            self.paths.close()
+            for columns in self.results.values():
+                for col in SPOOLED_COLUMNS:
+                    columns[col].close()
+
+
+class JsonLinesWriter(object):
+    """Write JSON values to a text file as lines separated by newlines.
+
+    The written content is the same as saving the list of values in jsonl
+    format with emmaa.util.save_json_to_s3.
+    """
+    def __init__(self, lines_file):
+        self.lines_file = lines_file
+        self.n_lines = 0
+
+    def write(self, obj):
+        """Write one value as a line."""
+        if self.n_lines:
+            self.lines_file.write('\n')
+        self.lines_file.write(json.dumps(obj))
+        self.n_lines += 1
+
+
+class _JsonListSpool(object):
+    # A list of JSON values appended to a temporary file
+    def __init__(self):
+        self.spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self.n_items = 0
+
+    def append(self, obj):
+        self.spool.write((', ' if self.n_items else '') + json.dumps(obj))
+        self.n_items += 1
+
+    def write_to(self, f):
+        f.write('[')
+        self.spool.seek(0)
+        shutil.copyfileobj(self.spool, f)
+        f.write(']')
+
+    def close(self):
+        self.spool.close()
+
+
+def is_compact_results(json_results):
+    """Return True if the test results are in compact format."""
+    return isinstance(json_results, dict) and \
+        json_results.get('format_version', 1) >= 2
+
+
+def get_results_header(json_results):
+    """Return the header of test results in any format."""
+    if is_compact_results(json_results):
+        return json_results['header']
+    return json_results[0]
+
+
+def get_results_tests(json_results):
+    """Return a list of dictionaries with test_type and test_json of each
+    test in test results in any format."""
+    if is_compact_results(json_results):
+        return json_results['tests']
+    return json_results[1:]
+
+
+def get_path_results(json_results, mc_type, test_ixs=None):
+    """Return PathResults of given (by default all) tests and a model type.
+
+    Parameters
+    ----------
+    json_results : list or dict
+        Test results in any format.
+    mc_type : str
+        A model type to get the results for.
+    test_ixs : Optional[list[int]]
+        Indices of the tests to get the results for. By default, results of
+        all tests are returned.
+
+    Returns
+    -------
+    path_results : list[indra.explanation.model_checker.PathResult]
+        A list of results in the order of test indices.
+    """
+    unpickler = jsonpickle.unpickler.Unpickler()
+    if test_ixs is None:
+        test_ixs = range(len(get_results_tests(json_results)))
+    if not is_compact_results(json_results):
+        return [unpickler.restore(json_results[ix + 1][mc_type]['result_json'])
+                for ix in test_ixs]
+    columns = json_results['results'][mc_type]
+    paths = json_results['paths']
+    path_results = []
+    for ix in test_ixs:
+        result = PathResult(columns['path_found'][ix],
+                            columns['result_code'][ix],
+                            columns['max_paths'][ix],
+                            columns['max_path_length'][ix])
+        for source, target, length in columns['path_metrics'][ix]:
+            result.add_metric(PathMetric(_decode_value(source, unpickler),
+                                         _decode_value(target, unpickler),
+                                         length))
+        for path_id in columns['path_ids'][ix]:
+            result.add_path(tuple(tuple(_decode_value(value, unpickler)
+                                        for value in edge)
+                                  for edge in paths[path_id]))
+        path_results.append(result)
+    return path_results
+
+
+def get_path_json(json_results, mc_type, ix):
+    """Return path json of a test and a model type or None if not
+    available."""
+    try:
+        if is_compact_results(json_results):
+            return json_results['results'][mc_type]['path_json'][ix]
+        return json_results[ix + 1][mc_type]['path_json']
+    except (KeyError, IndexError):
+        return None
+
+
+def _encode_value(value, pickler):
+    # Strings and numbers are stored as they are, other objects are flattened
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return pickler.flatten(value)
+
+
+def _decode_value(value, unpickler):
+    if isinstance(value, dict):
+        return unpickler.restore(value)
+    return value
@@ -32,6 +32,12 @@ class EmmaaStatement(object):
             as statements representing drug targets or phenotypic readouts that
             are meant to aid explanation construction but are not internal to
             the model.
+
+    The full-depth hash of the Statement (including its evidences and the
+    EMMAA annotations) is computed at construction and cached so that
+    copies of the same Statement can be found without rehashing. The cache
+    is reset when the Statement is replaced and has to be reset with
+    invalidate_hash when the Statement is modified in place.
     """
 
     def __init__(
@@ -51,6 +57,44 @@ class EmmaaStatement(object):
             metadata=self.metadata,
         )
         add_emmaa_annotations(self.stmt, ann)
+        self.get_hash()
+
+    @property
+    def stmt(self):
+        return self._stmt
+
+    @stmt.setter
+    def stmt(self, stmt):
+        self._stmt = stmt
+        self._full_hash = None
+
+    def get_hash(self, refresh=False):
+        """Return the cached full-depth hash of the INDRA Statement.
+
+        Parameters
+        ----------
+        refresh : Optional[bool]
+            If True, the hash is recomputed. Default: False.
+
+        Returns
+        -------
+        int
+            The full-depth hash of the Statement.
+        """
+        if self._full_hash is None or refresh:
+            self._full_hash = self._stmt.get_hash(shallow=False, refresh=True)
+        return self._full_hash
+
+    def invalidate_hash(self):
+        """Reset the cached hash after the Statement was modified."""
+        self._full_hash = None
+
+    def __setstate__(self, state):
+        # EmmaaStatements pickled before the hash was cached
+        if 'stmt' in state:
+            state['_stmt'] = state.pop('stmt')
+        state.setdefault('_full_hash', None)
+        self.__dict__.update(state)
 
     def __repr__(self):
         return '%s(%s, %s, %s)' % (self.__class__.__name__, self.stmt,
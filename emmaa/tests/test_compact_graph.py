@@ -0,0 +1,41 @@
+from indra.statements import Activation, Inhibition, IncreaseAmount, \
+    Phosphorylation, Agent, Evidence
+from indra.assemblers.indranet import IndraNetAssembler
+from emmaa.compact_graph import CompactGraph
+
+
+def _get_graph(graph_type):
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    map2k1 = Agent('MAP2K1', db_refs={'HGNC': '6840'})
+    mapk1 = Agent('MAPK1', db_refs={'HGNC': '6871'})
+    stmts = [Activation(braf, map2k1), Phosphorylation(map2k1, mapk1),
+             IncreaseAmount(map2k1, mapk1), Inhibition(mapk1, braf)]
+    for stmt in stmts:
+        stmt.evidence = [Evidence(source_api='assertion', text='text')]
+    ia = IndraNetAssembler(stmts)
+    return ia.make_model(graph_type=graph_type,
+                         extra_columns=[('internal', lambda stmt: True)],
+                         keep_self_loops=False)
+
+
+def test_compact_graph_round_trip():
+    for graph_type in ['signed', 'digraph']:
+        graph = _get_graph(graph_type)
+        compact_graph = CompactGraph.from_bytes(
+            CompactGraph.from_graph(graph).to_bytes())
+        new_graph = compact_graph.to_graph()
+        assert type(new_graph) == type(graph)
+        assert list(new_graph.nodes(data=True)) == \
+            list(graph.nodes(data=True))
+        if graph.is_multigraph():
+            kwargs = {'keys': True}
+        else:
+            kwargs = {}
+        assert list(new_graph.edges(data=True, **kwargs)) == \
+            list(graph.edges(data=True, **kwargs))
+        stmt_hashes = {stmt['stmt_hash'] for _, _, stmts in
+                       graph.edges(data='statements') for stmt in stmts}
+        assert compact_graph.get_stmt_hashes() == stmt_hashes
+        # Strings are not stored in fixed width unicode arrays
+        assert all(array.dtype.kind != 'U' for name, array in
+                   compact_graph.arrays.items() if name != 'meta')
@@ -1,6 +1,7 @@
 import networkx as nx
 from emmaa.filter_functions import filter_chem_mesh_go, \
-    filter_to_internal_edges
+    filter_to_internal_edges, get_excluded_edges, get_excluded_nodes, \
+    get_filtered_graph
 from indra.statements import Agent
 from indra.explanation.pathfinding import get_subgraph
 
@@ -44,3 +45,29 @@ def test_filter_chem_mesh_go():
     assert not filter_chem_mesh_go(d)
     # Decision made based on default namespace order
     assert filter_chem_mesh_go(e)
+
+
+def test_internal_edges_mask():
+    multi_g = nx.MultiDiGraph()
+    multi_g.add_edges_from(edges)
+    multi_g.add_edge(5, 6, statements=[{'internal': True}])
+    multi_g.add_node(7)
+    for graph in (g, multi_g):
+        excluded = get_excluded_edges(graph, filter_to_internal_edges)
+        assert excluded == get_excluded_edges(
+            graph, lambda *args: filter_to_internal_edges(*args))
+        new_g = get_filtered_graph(graph, filter_to_internal_edges)
+        expected_g = get_subgraph(graph, filter_to_internal_edges)
+        assert type(new_g) == type(expected_g)
+        assert set(new_g.nodes) == set(expected_g.nodes)
+        assert set(new_g.edges) == set(expected_g.edges)
+    assert (5, 6, 1) not in excluded
+    assert (5, 6, 0) in excluded
+
+
+def test_excluded_nodes():
+    nodes_to_agents = {'A': Agent('A', db_refs={'HGNC': '1234'}),
+                       'B': Agent('B', db_refs={'CHEBI': '2345'}),
+                       'C': Agent('C')}
+    assert get_excluded_nodes(nodes_to_agents, filter_chem_mesh_go) == \
+        {'B', 'C'}
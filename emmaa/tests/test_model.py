@@ -124,6 +124,20 @@ def test_filter_relevance():
     assert len(emmaa_model.assembled_stmts) == 0
 
 
+def test_run_assembly_keeps_raw_stmts():
+    emmaa_model = create_model()
+    hashes = [estmt.get_hash() for estmt in emmaa_model.stmts]
+    emmaa_model.run_assembly()
+    # The pipeline runs on copies so the raw statements and their cached
+    # hashes don't change
+    assert [estmt.get_hash() for estmt in emmaa_model.stmts] == hashes
+    assert [estmt.stmt.get_hash(shallow=False, refresh=True)
+            for estmt in emmaa_model.stmts] == hashes
+    raw_ids = {id(estmt.stmt) for estmt in emmaa_model.stmts}
+    assert not any(id(stmt) in raw_ids
+                   for stmt in emmaa_model.assembled_stmts)
+
+
 def test_papers():
     # Create model without previous paper stats and populate from statements
     emmaa_model = create_model()
@@ -214,3 +228,98 @@ def test_filter_eidos_ungrounded():
     assert len(filtered) == 3
     filtered_hashes = [stmt.get_hash() for stmt in filtered]
     assert set(hashes) - set(filtered_hashes) == {hashes[1]}
+
+
+def test_assemble_all():
+    emmaa_model = create_model()
+    emmaa_model.run_assembly()
+    mc_types = ['pysb', 'pybel', 'signed_graph', 'unsigned_graph']
+    assembled_models, assembly_times = emmaa_model.assemble_all(mc_types)
+    assert set(assembled_models) == set(mc_types)
+    assert set(assembly_times) == set(mc_types)
+    # Models assembled in parallel are the same as assembled sequentially
+    pysb_model = emmaa_model.assemble_pysb()
+    assert {r.name for r in assembled_models['pysb'].rules} == \
+        {r.name for r in pysb_model.rules}
+    signed_graph = emmaa_model.assemble_signed_graph()
+    assert set(assembled_models['signed_graph'].edges) == \
+        set(signed_graph.edges)
+    unsigned_graph = emmaa_model.assemble_unsigned_graph()
+    assert set(assembled_models['unsigned_graph'].edges) == \
+        set(unsigned_graph.edges)
+
+
+def test_indranet_shared_step():
+    emmaa_model = create_model()
+    emmaa_model.run_assembly()
+    ia = emmaa_model.get_indranet_assembler()
+    signed_graph = emmaa_model.assemble_signed_graph()
+    unsigned_graph = emmaa_model.assemble_unsigned_graph()
+    # Both graphs are built by the same assembler and share internal flags
+    assert emmaa_model.get_indranet_assembler() is ia
+    assert len(emmaa_model._indranet_cache['internal']) == 2
+    for graph in (signed_graph, unsigned_graph):
+        for _, _, data in graph.edges(data=True):
+            assert all(stmt['internal'] for stmt in data['statements'])
+    df = emmaa_model.get_indranet_df()
+    assert 'internal' in df.columns
+    assert emmaa_model.get_indranet_df() is df
+    # Reassembling the statements invalidates the shared step
+    emmaa_model.run_assembly()
+    assert emmaa_model.get_indranet_assembler() is not ia
+
+
+def test_indranet_empty_assembly():
+    emmaa_model = create_model()
+    emmaa_model.assembly_config['main'] = [
+        {'function': 'filter_by_type', 'args': [{'stmt_type': 'Complex'}]}]
+    ia = emmaa_model.get_indranet_assembler()
+    assert emmaa_model.assembled_stmts == []
+    # Assembly that returns no statements is not repeated
+    assembled_stmts = emmaa_model.assembled_stmts
+    assert emmaa_model.get_indranet_assembler() is ia
+    assert emmaa_model.assembled_stmts is assembled_stmts
+    # Setting the statements (even to an equal list) invalidates the cache
+    emmaa_model.assembled_stmts = []
+    assert emmaa_model.get_indranet_assembler() is not ia
+
+
+def test_incremental_assembly():
+    emmaa_model = create_model()
+    emmaa_model.assembly_config['incremental'] = True
+    emmaa_model.run_assembly()
+    state = emmaa_model._assembly_state
+    assert len(state.prefix_outputs) == 2
+    # A new statement refined by an existing one and a statement that only
+    # differs in its evidence
+    new_stmts = [
+        Activation(Agent('MAP2K1', db_refs={'HGNC': '6840'}),
+                   Agent('MAPK1', db_refs={'HGNC': '6871'}),
+                   evidence=[Evidence(text='MAP2K1 activates MAPK1.',
+                                      source_api='assertion',
+                                      text_refs={'TRID': '3456'})]),
+        Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                   Agent('MAP2K1', db_refs={'HGNC': '6840'}),
+                   evidence=[Evidence(text='BRAF activates MAP2K1 here.',
+                                      source_api='assertion',
+                                      text_refs={'TRID': '4567'})])]
+    emmaa_model.add_statements(
+        [EmmaaStatement(stmt, datetime.datetime.now(),
+                        emmaa_model.search_terms, {'internal': True})
+         for stmt in new_stmts])
+    emmaa_model.run_assembly()
+    assert emmaa_model._assembly_state.full_build_date_str == \
+        state.full_build_date_str
+    assert len(emmaa_model._assembly_state.prefix_outputs) == 4
+    incremental_stmts = emmaa_model.assembled_stmts
+    emmaa_model.run_assembly(full_rebuild=True)
+    full_stmts = emmaa_model.assembled_stmts
+
+    def get_summary(stmts):
+        return {stmt.get_hash(): (len(stmt.evidence), stmt.belief,
+                                  {st.get_hash() for st in stmt.supported_by})
+                for stmt in stmts}
+    # Preassembly doesn't return only top-level statements in this config
+    # so the refined MAP2K1 -> MAPK1 statement is kept
+    assert len(full_stmts) == 3
+    assert get_summary(incremental_stmts) == get_summary(full_stmts)
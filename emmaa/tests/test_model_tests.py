@@ -1,4 +1,12 @@
 import datetime
+from io import StringIO
+import json
+import os
+import pickle
+import random
+from functools import partial
+import numpy as np
+import networkx as nx
 
 from nose.plugins.attrib import attr
 from emmaa.statements import EmmaaStatement
@@ -6,9 +14,20 @@ from emmaa.statements import EmmaaStatement
 from indra.statements import *
 from indra.explanation.model_checker import PathResult, PysbModelChecker, \
     PybelModelChecker, SignedGraphModelChecker, UnsignedGraphModelChecker
+from copy import deepcopy
+from pysb import ComponentSet, Model, Monomer, Parameter, Rule, \
+    Observable, Initial
+from pysb.simulator import ScipyOdeSimulator
+from indra.explanation.pathfinding import bfs_search_multiple_nodes
+from indra.assemblers.pysb import PysbAssembler
 from emmaa.model import EmmaaModel
 from emmaa.model_tests import StatementCheckingTest, ModelManager, \
-    ScopeTestConnector, TestManager, RefinementTestConnector
+    ScopeTestConnector, TestManager, RefinementTestConnector, \
+    TestConnector, merge_shard_results, write_merged_shard_results, \
+    write_compact_results, run_parallel_simulations, SimulationModel, \
+    get_pysb_content_hash, is_valid_influence_map, make_rule_influence_map, \
+    add_observable_influences, _SharedOpenSearch
+from emmaa.queries import OpenSearchQuery
 from emmaa.analyze_tests_results import TestRound, StatsGenerator
 from emmaa.tests.test_model import create_model
 
@@ -77,6 +96,30 @@ def test_applicability():
     assert len(mm.applicable_tests) == 2
 
 
+def test_applicability_multiple_models():
+    tests = [StatementCheckingTest(
+                Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                           Agent('MAPK1', db_refs={'UP': 'P28482'}))),
+             StatementCheckingTest(
+                Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                           Agent('ERK', db_refs={'FPLX': 'ERK'}))),
+             StatementCheckingTest(
+                Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                           Agent('KRAS', db_refs={'HGNC': '6407'})))]
+    mm1 = ModelManager(create_model())
+    mm2 = ModelManager(create_model())
+    tm = TestManager([mm1, mm2], tests)
+    tm.make_tests(RefinementTestConnector())
+    for mm in (mm1, mm2):
+        assert mm.applicable_tests == tests[:2], mm.applicable_tests
+    # Connectors without entity name groups are checked one by one
+    for mm in (mm1, mm2):
+        mm.applicable_tests = []
+    tm.make_tests(TestConnector())
+    for mm in (mm1, mm2):
+        assert mm.applicable_tests == tests
+
+
 def test_results_json():
     model = create_model()
     model.run_assembly()
@@ -106,21 +149,24 @@ def test_results_json():
     tm.make_tests(RefinementTestConnector())
     tm.run_tests()
     result_json, json_lines = mm.results_to_json()
-    assert len(result_json) == 3
+    assert len(result_json['tests']) == 2
+    assert set(result_json['results']) == {
+        'pysb', 'pybel', 'signed_graph', 'unsigned_graph'}
     # Looking at the first result
-    assert len(result_json[1]) == 6, len(result_json[1])
+    path_json = {mc_type: columns['path_json'][0]
+                 for mc_type, columns in result_json['results'].items()}
     # The second edge will be supported differently in different model types
-    assert result_json[1]['pysb']['path_json'][0]['path'] == \
+    assert path_json['pysb'][0]['path'] == \
         'BRAF → MAP2K1 → MAPK1'
-    second_edge = result_json[1]['pysb']['path_json'][0]['edge_list'][1]
+    second_edge = path_json['pysb'][0]['edge_list'][1]
     # Only Activation statement will be in the edge in PySB
     assert len(second_edge['stmts']) == 1
     assert second_edge['stmts'][0][1] == 'Active MAP2K1 activates MAPK1.'
     assert second_edge['stmts'][0][0].count('stmt_hash') == 1
     # Positive (Activation and IncreaseAmount) in SignedGraph edge
-    assert result_json[1]['signed_graph']['path_json'][0]['path'] == \
+    assert path_json['signed_graph'][0]['path'] == \
         'BRAF → MAP2K1 → MAPK1'
-    second_edge = result_json[1]['signed_graph']['path_json'][0][
+    second_edge = path_json['signed_graph'][0][
         'edge_list'][1]
     assert len(second_edge['stmts']) == 2
     sentence_counts = {pair[1]: pair[0].count('stmt_hash')
@@ -131,9 +177,9 @@ def test_results_json():
     assert sentence_counts['MAP2K1 increases the amount of MAPK1.'] == 1
     # All statement types support unsigned graph edge, but different statements
     # of the same type are grouped together
-    assert result_json[1]['unsigned_graph']['path_json'][0]['path'] == \
+    assert path_json['unsigned_graph'][0]['path'] == \
         'BRAF → MAP2K1 → MAPK1'
-    second_edge = result_json[1]['unsigned_graph']['path_json'][0][
+    second_edge = path_json['unsigned_graph'][0][
         'edge_list'][1]
     assert len(second_edge['stmts']) == 4
     sentence_counts = {pair[1]: pair[0].count('stmt_hash')
@@ -211,3 +257,575 @@ def test_direct_path_tests():
         # Look at the seecond test result here
         res = mm.mc_types[mc_type]['test_results'][1]
         assert len(res.paths[0]) == 3, (mc_type, res.paths[0])  # 2 edges
+
+
+def test_run_tests_parallel():
+    model = create_model()
+    model.test_config['parallel_mc_types'] = True
+    tests = [StatementCheckingTest(
+             Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                        Agent('MAPK1', db_refs={'UP': 'P28482'})))]
+    mm = ModelManager(model)
+    tm = TestManager([mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    tm.run_tests()
+    for mc_type in ['pysb', 'pybel', 'signed_graph', 'unsigned_graph']:
+        assert len(mm.mc_types[mc_type]['test_results']) == 1
+        assert isinstance(mm.mc_types[mc_type]['test_results'][0],
+                          PathResult)
+    for mc_type in ['pysb', 'signed_graph', 'unsigned_graph']:
+        res = mm.mc_types[mc_type]['test_results'][0]
+        assert res.path_found, (mc_type, res)
+
+
+def test_merge_shard_results():
+    tests = [StatementCheckingTest(
+                Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                           Agent('MAPK1', db_refs={'UP': 'P28482'}))),
+             StatementCheckingTest(
+                Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                           Agent('MAP2K1', db_refs={'HGNC': '6840'}))),
+             StatementCheckingTest(
+                Activation(Agent('MAP2K1', db_refs={'HGNC': '6840'}),
+                           Agent('MAPK1', db_refs={'UP': 'P28482'})))]
+    mm = ModelManager(create_model())
+    tm = TestManager([mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    tm.run_tests()
+    results_json, json_lines = mm.results_to_json()
+    shard_jsons = []
+    for shard_ix in range(2):
+        shard_mm = ModelManager(create_model())
+        tm = TestManager([shard_mm], tests)
+        tm.make_tests(ScopeTestConnector())
+        test_indices = shard_mm.select_test_shard(2, shard_ix)
+        tm.run_tests()
+        shard_json = shard_mm.shard_results_to_json(2, shard_ix, test_indices)
+        # Make sure the shards survive a round trip through json
+        shard_jsons.append(json.loads(json.dumps(shard_json)))
+    merged_json, merged_lines = merge_shard_results(shard_jsons[::-1])
+    # Date strings of separately created models can differ
+    merged_json['header']['date_str'] = results_json['header']['date_str']
+    assert json.dumps(merged_json, indent=1) == \
+        json.dumps(results_json, indent=1)
+    assert json.dumps(merged_lines) == json.dumps(json_lines)
+
+
+def test_write_merged_shard_results():
+    tests = [StatementCheckingTest(
+                Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                           Agent('MAPK1', db_refs={'UP': 'P28482'}))),
+             StatementCheckingTest(
+                Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                           Agent('MAP2K1', db_refs={'HGNC': '6840'}))),
+             StatementCheckingTest(
+                Activation(Agent('MAP2K1', db_refs={'HGNC': '6840'}),
+                           Agent('MAPK1', db_refs={'UP': 'P28482'})))]
+    mm = ModelManager(create_model())
+    tm = TestManager([mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    tm.run_tests()
+    results_file, paths_file = StringIO(), StringIO()
+    mm.write_results(results_file, paths_file)
+    shard_jsons = []
+    for shard_ix in range(2):
+        shard_mm = ModelManager(create_model())
+        shard_mm.date_str = mm.date_str
+        tm = TestManager([shard_mm], tests)
+        tm.make_tests(ScopeTestConnector())
+        test_indices = shard_mm.select_test_shard(2, shard_ix)
+        tm.run_tests()
+        shard_json = shard_mm.shard_results_to_json(2, shard_ix, test_indices)
+        shard_jsons.append(json.loads(json.dumps(shard_json)))
+    # Merged output is written byte for byte the same as unsharded output
+    merged_results_file, merged_paths_file = StringIO(), StringIO()
+    write_merged_shard_results(iter(shard_jsons[::-1]), merged_results_file,
+                               merged_paths_file)
+    assert merged_results_file.getvalue() == results_file.getvalue()
+    assert merged_paths_file.getvalue() == paths_file.getvalue()
+    # The same holds for merged results written from memory
+    merged_json, merged_lines = merge_shard_results(shard_jsons)
+    merged_results_file, merged_paths_file = StringIO(), StringIO()
+    write_compact_results(merged_json, merged_lines, merged_results_file,
+                          merged_paths_file)
+    assert merged_results_file.getvalue() == results_file.getvalue()
+    assert merged_paths_file.getvalue() == paths_file.getvalue()
+
+
+def test_run_incremental_tests():
+    tests = [StatementCheckingTest(
+                Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                           Agent('MAPK1', db_refs={'UP': 'P28482'}))),
+             StatementCheckingTest(
+                Activation(Agent('MAPK1', db_refs={'UP': 'P28482'}),
+                           Agent('BRAF', db_refs={'HGNC': '1097'})))]
+    mc_types = ['pysb', 'signed_graph', 'unsigned_graph']
+    model = create_model()
+    model.test_config['mc_types'] = mc_types
+    mm = ModelManager(model)
+    tm = TestManager([mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    tm.run_tests()
+    results_json, json_lines = mm.results_to_json()
+    stmt_hashes = {stmt.get_hash() for stmt in model.assembled_stmts}
+    # Nothing changed, only the failing test is rerun
+    new_mm = _make_model_manager(mc_types)
+    tm = TestManager([new_mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    n_rerun = new_mm.run_incremental_tests(results_json, json_lines,
+                                           stmt_hashes)
+    assert n_rerun == 1, n_rerun
+    for mc_type in mc_types:
+        results = new_mm.mc_types[mc_type]['test_results']
+        assert len(results) == 2
+        assert results[0].path_found
+        assert not results[1].path_found
+    # A statement with a test endpoint was added, both tests are rerun
+    new_mm = _make_model_manager(mc_types)
+    tm = TestManager([new_mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    added_hash = model.assembled_stmts[0].get_hash()
+    n_rerun = new_mm.run_incremental_tests(
+        results_json, json_lines, stmt_hashes - {added_hash})
+    assert n_rerun == 2, n_rerun
+    # A statement in the previous paths was removed, both tests are rerun
+    for line in json_lines:
+        line['edges'][0]['hashes'].append(1234)
+    new_mm = _make_model_manager(mc_types)
+    tm = TestManager([new_mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    n_rerun = new_mm.run_incremental_tests(results_json, json_lines,
+                                           stmt_hashes | {1234})
+    assert n_rerun == 2, n_rerun
+
+
+def test_incremental_tests_new_paths():
+    tests = [StatementCheckingTest(
+                Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                           Agent('MAPK1', db_refs={'HGNC': '6871'})))]
+    mc_types = ['signed_graph', 'unsigned_graph']
+    mm = _make_model_manager(mc_types)
+    tm = TestManager([mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    tm.run_tests()
+    results_json, json_lines = mm.results_to_json()
+    # Statements connecting the test agents through other agents
+    kras = Agent('KRAS', db_refs={'HGNC': '6407'})
+    egfr = Agent('EGFR', db_refs={'HGNC': '3236'})
+    tp53 = Agent('TP53', db_refs={'HGNC': '11998'})
+    mdm2 = Agent('MDM2', db_refs={'HGNC': '6973'})
+    new_stmts = [
+        Activation(Agent('BRAF', db_refs={'HGNC': '1097'}), kras),
+        Activation(kras, egfr),
+        Activation(egfr, Agent('MAPK1', db_refs={'HGNC': '6871'})),
+        Activation(tp53, mdm2)]
+    model = create_model()
+    model.test_config['mc_types'] = mc_types
+    model.add_statements([
+        EmmaaStatement(stmt, datetime.datetime.now(), [], {'internal': True})
+        for stmt in new_stmts])
+    model.run_assembly()
+    hashes = {type(stmt).__name__ + stmt.agent_list()[0].name:
+              stmt.get_hash() for stmt in model.assembled_stmts}
+    stmt_hashes = {stmt.get_hash() for stmt in model.assembled_stmts}
+    # An added statement unrelated to the test doesn't affect it
+    new_mm = ModelManager(model)
+    tm = TestManager([new_mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    n_rerun = new_mm.run_incremental_tests(
+        results_json, json_lines, stmt_hashes - {hashes['ActivationTP53']})
+    assert n_rerun == 0, n_rerun
+    # An added statement that doesn't touch the test agents but completes a
+    # new path between them makes the test rerun
+    new_mm = ModelManager(model)
+    tm = TestManager([new_mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    n_rerun = new_mm.run_incremental_tests(
+        results_json, json_lines, stmt_hashes - {hashes['ActivationKRAS']})
+    assert n_rerun == 1, n_rerun
+
+
+def _make_model_manager(mc_types):
+    model = create_model()
+    model.test_config['mc_types'] = mc_types
+    return ModelManager(model)
+
+
+def test_english_cache():
+    tests = [StatementCheckingTest(
+             Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                        Agent('MAPK1', db_refs={'UP': 'P28482'})))]
+    mm = ModelManager(create_model())
+    tm = TestManager([mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    tm.run_tests()
+    result_json, _ = mm.results_to_json()
+    misses = mm.english_cache_stats['misses']
+    assert misses > 0
+    assert len(mm.english_cache) == misses
+    # All sentences are found in cache the second time
+    mm.path_stmt_counts.clear()
+    second_result_json, _ = mm.results_to_json()
+    assert mm.english_cache_stats['misses'] == misses
+    assert mm.english_cache_stats['hits'] >= misses
+    assert json.dumps(result_json['results']) == \
+        json.dumps(second_result_json['results'])
+    # Caches are not pickled
+    state = mm.__getstate__()
+    assert 'english_cache' not in state
+
+
+def test_write_results():
+    tests = [StatementCheckingTest(
+             Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                        Agent('MAPK1', db_refs={'UP': 'P28482'})))]
+    mm = ModelManager(create_model())
+    tm = TestManager([mm], tests)
+    tm.make_tests(ScopeTestConnector())
+    tm.run_tests()
+    results_file = StringIO()
+    paths_file = StringIO()
+    mm.write_results(results_file, paths_file, test_data={'test': 'data'})
+    # Streamed results are the same as the ones serialized at once
+    mm.path_stmt_counts.clear()
+    result_json, json_lines = mm.results_to_json(test_data={'test': 'data'})
+    assert json.loads(results_file.getvalue()) == \
+        json.loads(json.dumps(result_json))
+    assert paths_file.getvalue() == \
+        '\n'.join([json.dumps(line) for line in json_lines])
+
+
+def test_graph_cache():
+    mm = ModelManager(create_model())
+    stmt = Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                      Agent('MAPK1', db_refs={'HGNC': '6871'}))
+    other_stmt = Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                            Agent('MAP2K1', db_refs={'HGNC': '6840'}))
+    for mc_type in ['signed_graph', 'unsigned_graph']:
+        graph = mm.get_updated_mc(mc_type, [stmt]).graph
+        # The graph is reused and only the statements are swapped
+        mc = mm.get_updated_mc(mc_type, [other_stmt])
+        assert mc.graph is graph
+        assert mc.statements == [other_stmt]
+        # A different edge filter needs a new graph
+        assert mm.get_updated_mc(
+            mc_type, [stmt], edge_filter_func=lambda *args: True).graph \
+            is not graph
+    # PySB graphs also depend on the checked statements
+    graph = mm.get_updated_mc('pysb', [stmt]).graph
+    copied_stmt = Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                             Agent('MAPK1', db_refs={'HGNC': '6871'}))
+    mc = mm.get_updated_mc('pysb', [copied_stmt])
+    assert mc.graph is graph
+    assert copied_stmt in mc.stmt_to_obs
+    assert mm.get_updated_mc('pysb', [other_stmt]).graph is not graph
+    # Changing the assembled statements invalidates the cache
+    mm.model.assembled_stmts = mm.model.assembled_stmts[:]
+    assert mm.get_updated_mc('pysb', [stmt]).graph is not graph
+
+
+def test_lazy_assembly():
+    mm = ModelManager(create_model())
+    assert len(mm.mc_types) == 4
+    assert not any(mm.mc_types.is_assembled(mc_type)
+                   for mc_type in mm.mc_types)
+    assert not mm.assembly_times
+    # Only the accessed model type is assembled
+    assert isinstance(mm.mc_types['signed_graph']['model_checker'],
+                      SignedGraphModelChecker)
+    assert mm.mc_types.is_assembled('signed_graph')
+    assert not mm.mc_types.is_assembled('pysb')
+    assert list(mm.assembly_times) == ['signed_graph']
+    mm.assemble_models()
+    assert all(mm.mc_types.is_assembled(mc_type) for mc_type in mm.mc_types)
+    assert set(mm.assembly_times) == set(mm.mc_types)
+    # All models are assembled upfront when not lazy
+    mm = ModelManager(create_model(), lazy=False)
+    assert all(mm.mc_types.is_assembled(mc_type) for mc_type in mm.mc_types)
+
+
+def test_answer_open_queries_batched():
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    mapk1 = Agent('MAPK1', db_refs={'HGNC': '6871'})
+    queries = [OpenSearchQuery(braf, 'Activation', 'subject'),
+               OpenSearchQuery(braf, 'Activation', 'subject'),
+               OpenSearchQuery(mapk1, 'Activation', 'object')]
+    mm = _make_model_manager(['pysb', 'signed_graph', 'unsigned_graph'])
+    responses = mm.answer_queries(queries)
+    assert len(responses) == 9
+    # Batched answers are the same as answers to individual queries
+    for query in queries:
+        expected = {mc_type: response for mc_type, response, _ in
+                    mm.answer_open_query(query)}
+        for resp_query, mc_type, response in responses:
+            if resp_query is query:
+                assert response == expected[mc_type]
+    # Limits of each query are respected
+    mc = mm.get_updated_mc('signed_graph', [q.path_stmt for q in queries],
+                           True)
+    results = mm.answer_open_queries(
+        'signed_graph', mc, queries[:2], 2, 50, query_limits=[(2, 50),
+                                                             (1, 50)])
+    assert len(results[0][1]) > len(results[1][1])
+    assert all(len(line['nodes']) == 2 for line in results[1][1])
+
+
+def test_shared_open_search_lazy():
+    g = nx.DiGraph()
+    for i in range(4):
+        g.add_edge('A', f'B{i}')
+        for j in range(4):
+            g.add_edge(f'B{i}', f'C{i}{j}')
+    search = _SharedOpenSearch(g, ['A'], False, None, None,
+                               [(2, 3), (2, 0)])
+    # Only the paths needed by a query are generated
+    paths = search.get_paths(2, 3)
+    assert len(paths) == 3
+    assert len(search.node_searches['A'][0]) == 3
+    # A query without a path limit continues the shared search
+    expected = list(bfs_search_multiple_nodes(g, ['A'], depth_limit=2))
+    assert search.get_paths(2, 0) == expected
+    assert paths == expected[:3]
+    assert search.get_paths(1, 0) == \
+        [path for path in expected if len(path) == 2]
+
+
+def test_simulation_model_cache():
+    mm = _make_model_manager(['pysb'])
+    sim_model = mm.get_simulation_model('pysb', use_kappa=True)
+    assert mm.get_simulation_model('pysb', use_kappa=True) is sim_model
+    assert mm.get_simulation_model('pysb', num_times=10) is not sim_model
+    # The assembled model is not modified by queries
+    pysb_model = mm.mc_types['pysb']['model']
+    assert sim_model.model is not pysb_model
+    n_observables = len(sim_model.model.observables)
+    param_values = {p.name: p.value for p in sim_model.model.parameters}
+    with sim_model.use([Agent('BRAF', db_refs={'HGNC': '1097'})]) as model:
+        assert len(model.observables) == n_observables + 1
+        model.parameters[0].value = 1234
+    # Changes made during the query are reverted
+    assert len(sim_model.model.observables) == n_observables
+    assert {p.name: p.value for p in sim_model.model.parameters} == \
+        param_values
+    # Prepared models of an older model version are removed
+    mm.date_str = '2100-01-01-00-00-00'
+    assert mm.get_simulation_model('pysb', use_kappa=True) is not sim_model
+    assert len(mm._simulation_cache) == 1
+
+
+def _make_kinase_model():
+    # Substrate A is only phosphorylated if kinase K has an initial amount
+    model = Model('kinase', _export=False)
+    a = Monomer('A', ['s'], {'s': ['u', 'p']}, _export=False)
+    k = Monomer('K', _export=False)
+    ksyn = Parameter('ksyn', 1, _export=False)
+    kf = Parameter('kf', 1e-3, _export=False)
+    a_0 = Parameter('A_0', 100, _export=False)
+    for component in [a, k, ksyn, kf, a_0]:
+        model.add_component(component)
+    model.add_component(Rule('synthesize_A', None >> a(s='u'), ksyn,
+                             _export=False))
+    model.add_component(Rule('phosphorylate_A',
+                             k() + a(s='u') >> k() + a(s='p'), kf,
+                             _export=False))
+    model.add_component(Observable('A_p', a(s='p'), _export=False))
+    model.add_initial(Initial(a(s='u'), a_0, _export=False))
+    return model
+
+
+def _add_kinase_initial(model):
+    k_0 = Parameter('K_0', 10, _export=False)
+    model.add_component(k_0)
+    model.add_initial(Initial(model.monomers['K'](), k_0, _export=False))
+
+
+def test_simulation_model_added_initials():
+    model = _make_kinase_model()
+    sim_model = SimulationModel(model)
+    n_species = len(sim_model.model.species)
+    tspan = np.linspace(0, 100, 11)
+    # The network is generated again for a species added during a query
+    for _ in range(2):
+        with sim_model.use([]) as pysb_model:
+            _add_kinase_initial(pysb_model)
+            res = ScipyOdeSimulator(pysb_model, tspan).run()
+        assert len(sim_model.model.species) == n_species
+    uncached_model = deepcopy(model)
+    _add_kinase_initial(uncached_model)
+    uncached_res = ScipyOdeSimulator(uncached_model, tspan).run()
+    assert res.observables['A_p'][-1] > 0
+    assert np.allclose(res.observables['A_p'],
+                       uncached_res.observables['A_p'])
+    # Without the added initial the substrate is not phosphorylated
+    with sim_model.use([]) as pysb_model:
+        res = ScipyOdeSimulator(pysb_model, tspan).run()
+    assert np.allclose(res.observables['A_p'], 0)
+
+
+class _RandomSimulationTRA(object):
+    # Each simulation satisfies the pattern with probability 0.5
+    def check_property(self, model, pattern, num_times=None, num_sim=2,
+                       hypothesis_tester=None):
+        sat = [random.random() < 0.5 for _ in range(num_sim)]
+        return sum(sat) / num_sim, num_sim, 'kpat', None, 'fig.png'
+
+
+class _FixedSizeTester(object):
+    def test(self, samples):
+        return 1 if len(samples) >= 7 else None
+
+
+def test_run_parallel_simulations():
+    tra = _RandomSimulationTRA()
+    sat_rate, num_sim, kpat, fig_path = run_parallel_simulations(
+        tra, None, None, 10, 3, num_sim=10)
+    assert num_sim == 10
+    assert 0 <= sat_rate <= 1
+    assert kpat == 'kpat'
+    assert os.path.isabs(fig_path)
+    # Simulations stop when the hypothesis tester reaches a decision
+    sat_rate, num_sim, kpat, fig_path = run_parallel_simulations(
+        tra, None, None, 10, 4, hypothesis_tester=_FixedSizeTester())
+    assert num_sim == 7
+
+
+def test_reachability_fast_fail():
+    mm = _make_model_manager(['signed_graph', 'unsigned_graph'])
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    mapk1 = Agent('MAPK1', db_refs={'HGNC': '6871'})
+    stmts = [Activation(braf, mapk1), Activation(mapk1, braf),
+             Inhibition(braf, mapk1)]
+    for mc_type in ['signed_graph', 'unsigned_graph']:
+        mc = mm.get_updated_mc(mc_type, stmts)
+        results = mm.check_statements(mc_type, mc, 5, 1)
+        # Results are the same as with a full search
+        expected = mc.check_model(max_path_length=5, max_paths=1)
+        assert [(r.path_found, r.result_code, r.paths) for _, r in results] \
+            == [(r.path_found, r.result_code, r.paths) for _, r in expected]
+    # MAPK1 does not reach BRAF in either graph
+    assert mm.reachability_stats['unreachable'] >= 2
+    assert sum(mm.reachability_stats.values()) == 6
+    # Indexes are stored with the ModelManager
+    assert len(pickle.loads(pickle.dumps(mm)).reachability_indexes) == 2
+
+
+def test_reachability_index_validation():
+    mm = _make_model_manager(['signed_graph'])
+    stmts = [Activation(Agent('BRAF', db_refs={'HGNC': '1097'}),
+                        Agent('MAPK1', db_refs={'HGNC': '6871'}))]
+    mm.get_updated_mc('signed_graph', stmts)
+    index = mm._current_reachability['signed_graph']
+    checked = []
+    index.is_valid_for = lambda *args: checked.append(args)
+    # Indexes built in this process are not checked against the graph
+    mm.get_updated_mc('signed_graph', stmts)
+    assert mm._current_reachability['signed_graph'] is index
+    assert not checked
+    del index.is_valid_for
+    # Restored indexes are checked once and rebuilt if they are stale
+    loaded_mm = pickle.loads(pickle.dumps(mm))
+    [restored] = loaded_mm.reachability_indexes.values()
+    loaded_mm.get_updated_mc('signed_graph', stmts)
+    assert loaded_mm._current_reachability['signed_graph'] is restored
+    loaded_mm = pickle.loads(pickle.dumps(mm))
+    [restored] = loaded_mm.reachability_indexes.values()
+    restored.fingerprint = None
+    loaded_mm.get_updated_mc('signed_graph', stmts)
+    assert loaded_mm._current_reachability['signed_graph'] is not restored
+
+
+def test_check_signature_deduplication():
+    mm = _make_model_manager(['signed_graph', 'unsigned_graph'])
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    mapk1 = Agent('MAPK1', db_refs={'HGNC': '6871'})
+    stmts = [Activation(braf, mapk1, evidence=[Evidence(text='a')]),
+             Activation(braf, mapk1, evidence=[Evidence(text='b')]),
+             IncreaseAmount(braf, mapk1), Inhibition(braf, mapk1)]
+    for mc_type in ['signed_graph', 'unsigned_graph']:
+        mc = mm.get_updated_mc(mc_type, stmts)
+        results = mm.check_statements(mc_type, mc, 5, 1)
+        expected = mc.check_model(max_path_length=5, max_paths=1)
+        assert [(r.path_found, r.result_code, r.paths) for _, r in results] \
+            == [(r.path_found, r.result_code, r.paths) for _, r in expected]
+        # Statements only differing in evidence share the result
+        assert results[0][1] is results[1][1]
+        assert results[0][1] is results[2][1]
+    # Polarity is ignored in the unsigned graph
+    assert results[0][1] is results[3][1]
+
+
+def test_check_statements_process_once():
+    mm = _make_model_manager(['signed_graph', 'unsigned_graph'])
+    mm.model.test_config['path_engine'] = 'csr'
+    braf = Agent('BRAF', db_refs={'HGNC': '1097'})
+    mapk1 = Agent('MAPK1', db_refs={'HGNC': '6871'})
+    stmts = [Activation(braf, mapk1), Inhibition(mapk1, braf)]
+    for mc_type in ['signed_graph', 'unsigned_graph']:
+        mc = mm.get_updated_mc(mc_type, stmts)
+        expected = mc.check_model(max_path_length=5, max_paths=1)
+        processed = []
+        process_statement = mc.process_statement
+
+        def counting_process_statement(stmt):
+            processed.append(stmt)
+            return process_statement(stmt)
+        mc.process_statement = counting_process_statement
+        results = mm.check_statements(mc_type, mc, 5, 1)
+        # Subject and object nodes are only found once for each statement
+        assert processed == stmts
+        assert [(r.path_found, r.result_code, r.paths) for _, r in results] \
+            == [(r.path_found, r.result_code, r.paths) for _, r in expected]
+
+
+def test_influence_map_content_hash():
+    model_stmts = [Phosphorylation(Agent('MAP2K1'), Agent('MAPK1')),
+                   Activation(Agent('BRAF'), Agent('MAP2K1'))]
+    pysb_model = PysbAssembler(model_stmts).make_model()
+    tests = [Phosphorylation(Agent('BRAF'), Agent('MAPK1'))]
+    content_hash = get_pysb_content_hash(pysb_model, model_stmts)
+    mc = PysbModelChecker(pysb_model, tests, model_stmts=model_stmts)
+    mc.get_graph(prune_im=True, prune_im_degrade=True)
+    # Observables generated for the tests don't change the hash
+    assert get_pysb_content_hash(pysb_model, model_stmts) == content_hash
+    assert get_pysb_content_hash(pysb_model, model_stmts[:1]) != \
+        content_hash
+    artifact = {'content_hash': content_hash,
+                'im': make_rule_influence_map(mc)}
+    assert is_valid_influence_map(artifact, content_hash, pysb_model)
+    # A changed model invalidates the stored influence map
+    pysb_model.rules = ComponentSet(list(pysb_model.rules)[1:])
+    new_hash = get_pysb_content_hash(pysb_model, model_stmts)
+    assert new_hash != content_hash
+    assert not is_valid_influence_map(artifact, new_hash, pysb_model)
+    artifact['content_hash'] = new_hash
+    assert not is_valid_influence_map(artifact, new_hash, pysb_model)
+
+
+def test_influence_map_shared_by_tests():
+    model_stmts = [Phosphorylation(Agent('MAP2K1'), Agent('MAPK1')),
+                   Activation(Agent('BRAF'), Agent('MAP2K1')),
+                   Inhibition(Agent('MAPK1'), Agent('BRAF'))]
+    pysb_model = PysbAssembler(model_stmts).make_model()
+    test_sets = [[Phosphorylation(Agent('BRAF'), Agent('MAPK1'))],
+                 [Activation(Agent('MAPK1'), Agent('MAP2K1')),
+                  Phosphorylation(Agent('MAP2K1'), Agent('MAPK1'))]]
+    artifacts = {}
+    for tests in test_sets:
+        mc = PysbModelChecker(deepcopy(pysb_model), tests,
+                              model_stmts=model_stmts)
+        content_hash = get_pysb_content_hash(mc.model, model_stmts)
+        if content_hash not in artifacts:
+            artifacts[content_hash] = make_rule_influence_map(mc)
+        # Each set of tests adds its observables to the stored influence map
+        mc.generate_im = partial(add_observable_influences,
+                                 artifacts[content_hash], mc.generate_im)
+        mc.get_graph(prune_im=True, prune_im_degrade=True)
+        expected = PysbModelChecker(deepcopy(pysb_model), tests,
+                                    model_stmts=model_stmts)
+        expected.get_graph(prune_im=True, prune_im_degrade=True)
+        assert set(mc.graph.nodes) == set(expected.graph.nodes)
+        assert set(mc.graph.edges) == set(expected.graph.edges)
+        assert mc.rule_obs_dict == expected.rule_obs_dict
+        assert set(mc.stmt_to_obs) == set(expected.stmt_to_obs)
+    # Both sets of tests use the same influence map
+    assert len(artifacts) == 1
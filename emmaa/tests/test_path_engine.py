@@ -0,0 +1,155 @@
+import random
+import networkx as nx
+from indra.statements import Agent, Activation, Inhibition
+from indra.explanation.model_checker import SignedGraphModelChecker, \
+    UnsignedGraphModelChecker, NodesContainer
+from emmaa.path_engine import GraphPathEngine, find_model_checker_paths
+
+
+def _get_model(seed, signed, edge_filter=None, n_nodes=12, n_edges=30):
+    rng = random.Random(seed)
+    names = [f'N{ix}' for ix in range(n_nodes)]
+    graph = nx.MultiDiGraph() if signed else nx.DiGraph()
+    graph.add_nodes_from(names)
+    for _ in range(n_edges):
+        u, v = rng.sample(names, 2)
+        graph.add_edge(u, v, sign=rng.randint(0, 1), belief=1,
+                       statements=[{'internal': rng.random() < 0.7}])
+    stmts = []
+    for _ in range(20):
+        subj, obj = rng.sample(names, 2)
+        stmt_type = rng.choice([Activation, Inhibition]) if signed \
+            else Activation
+        stmts.append(stmt_type(Agent(subj), Agent(obj)))
+    mc_class = SignedGraphModelChecker if signed else \
+        UnsignedGraphModelChecker
+    mc = mc_class(graph, stmts)
+    # As in ModelManager, the graph of the checker is built with the filter
+    mc.get_graph(edge_filter_func=edge_filter)
+    mc.nodes_to_agents = {name: Agent(name) for name in names}
+    return mc, GraphPathEngine(graph, signed), stmts, names
+
+
+def _assert_same_result(mc, engine, stmt, max_paths, **kwargs):
+    expected = mc.check_statement(stmt, max_paths, 4, **kwargs)
+    result = engine.check_statement(mc, stmt, max_paths, 4, **kwargs)
+    _assert_same_paths(result, expected, max_paths,
+                       kwargs.get('allow_direct', True))
+
+
+def _assert_same_paths(result, expected, max_paths, allow_direct):
+    assert result.result_code == expected.result_code
+    assert result.path_found == expected.path_found
+    # The same paths are selected in the same order
+    assert result.paths == expected.paths
+    # Path metrics of paths found by the bounded search only list the
+    # sources with the shortest paths
+    if result.result_code != 'PATHS_FOUND' or not allow_direct or \
+            not max_paths:
+        assert _get_metrics(result) == _get_metrics(expected)
+
+
+def _get_metrics(result):
+    return [(pm.source_node, pm.target_node, pm.length)
+            for pm in result.path_metrics]
+
+
+def _get_nodes(names, sign, rng):
+    # Nodes of an agent with refinements
+    nodes = NodesContainer(Agent(names[0]))
+    nodes.main_nodes = [(names[0], sign)]
+    nodes.ref_nodes = [(name, sign) for name in names[1:]]
+    nodes.get_all_nodes()
+    rng.shuffle(nodes.all_nodes)
+    return nodes
+
+
+def test_signed_path_engine():
+    for seed in range(5):
+        mc, engine, stmts, _ = _get_model(seed, signed=True)
+        for stmt in stmts:
+            for max_paths in (0, 1, 1000):
+                for allow_direct in (True, False):
+                    _assert_same_result(mc, engine, stmt, max_paths,
+                                        allow_direct=allow_direct)
+
+
+def test_unsigned_path_engine_filters():
+    def edge_filter(graph, u, v, *args):
+        return any(stmt['internal'] for stmt in graph[u][v]['statements'])
+
+    mc, engine, stmts, names = _get_model(0, False, edge_filter)
+    excluded = set(names[:3])
+    node_filter = mc.update_filter_func(lambda ag: ag.name not in excluded)
+    for stmt in stmts:
+        for max_paths in (1, 1000):
+            _assert_same_result(mc, engine, stmt, max_paths,
+                                node_filter_func=node_filter,
+                                edge_filter_func=edge_filter)
+    # Edge masks are built once for each filter function
+    assert engine.get_edge_mask(edge_filter) is \
+        engine.get_edge_mask(edge_filter)
+
+
+def test_path_engine_several_nodes():
+    rng = random.Random(0)
+    for seed in range(5):
+        for signed in (True, False):
+            mc, engine, _, names = _get_model(seed, signed, n_edges=40)
+            signs = (0, 1) if signed else (0,)
+            for _ in range(20):
+                sample = rng.sample(names, rng.randint(2, 6))
+                split = rng.randint(1, len(sample) - 1)
+                target_sign = rng.choice(signs)
+                for max_paths in (1, 3, 1000):
+                    for allow_direct in (True, False):
+                        subj = _get_nodes(sample[:split], 0, rng)
+                        obj = _get_nodes(sample[split:], target_sign, rng)
+                        obj.all_nodes = [node for node in obj.all_nodes
+                                         if node in mc.graph]
+                        if not obj.all_nodes:
+                            continue
+                        result = engine.find_paths(
+                            mc, subj, obj, max_paths, 4,
+                            allow_direct=allow_direct)
+                        try:
+                            expected = find_model_checker_paths(
+                                mc, _copy_nodes(subj), _copy_nodes(obj),
+                                max_paths, 4, allow_direct=allow_direct)
+                        except ValueError:
+                            # The ModelChecker fails if several paths
+                            # are all direct, the direct paths are found
+                            assert all(
+                                len([node for node in path
+                                     if len(node) == 2]) == 2
+                                for path in result.paths)
+                            continue
+                        _assert_same_paths(result, expected, max_paths,
+                                           allow_direct)
+
+
+def test_path_engine_only_direct_paths():
+    graph = nx.DiGraph()
+    graph.add_edges_from([('A', 'B'), ('A', 'C')], belief=1)
+    mc = UnsignedGraphModelChecker(graph)
+    mc.get_graph()
+    engine = GraphPathEngine(graph, signed=False)
+    subj = NodesContainer(Agent('A'))
+    subj.main_nodes = [('A', 0)]
+    subj.get_all_nodes()
+    obj = NodesContainer(Agent('B'))
+    obj.main_nodes = [('B', 0), ('C', 0)]
+    obj.get_all_nodes()
+    # Without indirect paths, direct paths are found even if they are not
+    # allowed (ModelChecker.find_paths raises an error in this case)
+    result = engine.find_paths(mc, subj, obj, 5, 4, allow_direct=False)
+    assert result.result_code == 'PATHS_FOUND'
+    assert result.paths == [(('A', 0), ('B', 0)), (('A', 0), ('C', 0))]
+
+
+def _copy_nodes(nodes):
+    copied = NodesContainer(nodes.main_agent)
+    copied.main_nodes = nodes.main_nodes
+    copied.ref_nodes = nodes.ref_nodes
+    copied.all_nodes = nodes.all_nodes
+    return copied
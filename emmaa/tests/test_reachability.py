@@ -0,0 +1,45 @@
+import pickle
+import random
+import networkx as nx
+from emmaa.reachability import ReachabilityIndex
+
+
+def test_reachability_index():
+    rng = random.Random(0)
+    for seed in range(20):
+        graph = nx.gnp_random_graph(40, 0.04, directed=True, seed=seed)
+        index = ReachabilityIndex(graph, seed=seed)
+        for _ in range(50):
+            sources = rng.sample(range(40), 2)
+            targets = rng.sample(range(40), 2)
+            expected = any(source == target or
+                           nx.has_path(graph, source, target)
+                           for source in sources for target in targets)
+            assert index.may_reach(sources, targets) == expected
+
+
+def test_reachability_index_signed_nodes():
+    graph = nx.DiGraph()
+    graph.add_edges_from([(('A', 0), ('B', 0)), (('B', 0), ('C', 1)),
+                          (('C', 1), ('A', 0))])
+    graph.add_node(('C', 0))
+    index = ReachabilityIndex(graph)
+    assert index.may_reach([('A', 0)], [('C', 1)])
+    assert not index.may_reach([('A', 0)], [('C', 0)])
+    # Nodes that are not in the index may be reachable
+    assert index.may_reach([('A', 0)], [('D', 0)])
+    index = pickle.loads(pickle.dumps(index))
+    assert index.is_valid_for(graph)
+    assert not index.may_reach([('A', 0)], [('C', 0)])
+
+
+def test_reachability_index_fingerprint():
+    graph = nx.DiGraph([('A', 'B'), ('B', 'C')])
+    index = ReachabilityIndex(graph, graph_name='filter')
+    # The order of nodes and edges doesn't matter
+    assert index.is_valid_for(nx.DiGraph([('B', 'C'), ('A', 'B')]),
+                              'filter')
+    assert not index.is_valid_for(graph, 'other_filter')
+    # A graph of the same size with different edges is not valid
+    assert not index.is_valid_for(nx.DiGraph([('A', 'B'), ('C', 'B')]),
+                                  'filter')
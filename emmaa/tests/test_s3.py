@@ -262,6 +262,78 @@ def test_save_load_update_model_manager():
         TEST_BUCKET_NAME, 'results/test/model_manager_', '.pkl') == 2
 
 
+@mock_s3
+def test_save_load_compact_graphs():
+    # Local imports are recommended when using moto
+    from emmaa.model_tests import ModelManager, save_model_manager_to_s3, \
+        load_model_manager_from_s3
+    from emmaa.util import find_number_of_files_on_s3
+    client = setup_bucket(add_model=True)
+    model = create_model()
+    mm = ModelManager(model, lazy=False)
+    mm.save_assembled_statements(upload_to_db=False, bucket=TEST_BUCKET_NAME)
+    signed_edges = list(
+        mm.mc_types['signed_graph']['model'].edges(data=True, keys=True))
+    save_model_manager_to_s3('test', mm, bucket=TEST_BUCKET_NAME)
+    # Graphs are saved separately and set back to the model manager
+    for mc_type in ['signed_graph', 'unsigned_graph']:
+        assert find_number_of_files_on_s3(
+            TEST_BUCKET_NAME, f'results/test/{mc_type}_graph_', '.npz') == 1
+        assert mm.mc_types[mc_type]['model'] is not None
+    loaded_mm = load_model_manager_from_s3(model_name='test',
+                                           bucket=TEST_BUCKET_NAME)
+    for mc_type in ['signed_graph', 'unsigned_graph']:
+        graph = loaded_mm.mc_types[mc_type]['model']
+        assert graph is not None
+        assert loaded_mm.mc_types[mc_type]['model_checker'].model is graph
+    assert list(loaded_mm.mc_types['signed_graph']['model'].edges(
+        data=True, keys=True)) == signed_edges
+
+
+@mock_s3
+def test_save_load_split_model_manager():
+    # Local imports are recommended when using moto
+    from emmaa.model_tests import ModelManager, save_model_manager_to_s3, \
+        load_model_manager_from_s3
+    from emmaa.util import load_json_from_s3
+    client = setup_bucket(add_model=True)
+    model = create_model()
+    mm = ModelManager(model)
+    mm.save_assembled_statements(upload_to_db=False, bucket=TEST_BUCKET_NAME)
+    paper_ids = set(mm.model.paper_ids)
+    stmt_hashes = [stmt.get_hash() for stmt in mm.model.assembled_stmts]
+    pysb_rules = [rule.name for rule in mm.mc_types['pysb']['model'].rules]
+    version = mm.model._assembled_version
+    manifest = save_model_manager_to_s3('test', mm, bucket=TEST_BUCKET_NAME)
+    # Saving doesn't invalidate caches keyed on the assembled statements
+    assert mm.model._assembled_version == version
+    assert mm.model.paper_ids == paper_ids
+    assert [stmt.get_hash() for stmt in mm.model.assembled_stmts] == \
+        stmt_hashes
+    assert load_json_from_s3(
+        TEST_BUCKET_NAME,
+        f'results/test/components_{mm.date_str}/manifest.json') == manifest
+    # Only the models that were assembled are saved
+    assert set(manifest['components']['models']) == {'pysb'}
+    assert not mm.mc_types.is_assembled('pybel')
+    loaded_mm = load_model_manager_from_s3(model_name='test',
+                                           bucket=TEST_BUCKET_NAME)
+    # Models, statements and paper IDs are only loaded when they are used
+    assert not any(loaded_mm.mc_types.is_assembled(mc_type)
+                   for mc_type in loaded_mm.mc_types)
+    assert 'assembled_stmts' not in loaded_mm._components.load_times
+    assert loaded_mm.model.paper_ids is None
+    assert loaded_mm.get_paper_ids() == paper_ids
+    pysb_model = loaded_mm.mc_types['pysb']['model']
+    assert [rule.name for rule in pysb_model.rules] == pysb_rules
+    assert 'assembled_stmts' not in loaded_mm._components.load_times
+    # Models that were not saved are assembled from the loaded statements
+    assert loaded_mm.mc_types['pybel']['model'] is not None
+    assert [stmt.get_hash() for stmt in loaded_mm.model.assembled_stmts] \
+        == stmt_hashes
+    assert 'assembled_stmts' in loaded_mm._components.load_times
+
+
 @mock_s3
 def test_model_to_tests():
     # Local imports are recommended when using moto
@@ -404,3 +476,56 @@ def test_util_s3_intelligent_tiering():
     status = get_s3_archive_status(TEST_BUCKET_NAME, key)
     assert status['intelligent_tiering'] is True
     assert status['archived'] is False
+
+
+@mock_s3
+def test_util_s3_stream_writer():
+    from emmaa.util import S3StreamWriter, copy_s3_object, get_s3_client
+    client = get_s3_client()
+    client.create_bucket(Bucket=TEST_BUCKET_NAME, ACL='public-read')
+    # A small object is uploaded with a single put
+    with S3StreamWriter(TEST_BUCKET_NAME, 'small.txt') as writer:
+        writer.write('small ')
+        writer.write('object')
+    obj = client.get_object(Bucket=TEST_BUCKET_NAME, Key='small.txt')
+    assert obj['Body'].read().decode('utf8') == 'small object'
+    # A large object is uploaded in several parts
+    line = ''.join(['a' for i in range(1024 * 1024)])
+    with S3StreamWriter(TEST_BUCKET_NAME, 'large.txt',
+                        part_size=5 * 1024 * 1024) as writer:
+        for i in range(12):
+            writer.write(line)
+    assert len(writer.parts) == 3
+    copy_s3_object(TEST_BUCKET_NAME, 'large.txt', 'large_copy.txt')
+    obj = client.get_object(Bucket=TEST_BUCKET_NAME, Key='large_copy.txt')
+    assert obj['Body'].read().decode('utf8') == line * 12
+
+
+@mock_s3
+def test_util_phase_timings():
+    from emmaa.util import PhaseTimings, timed_phase, get_s3_client, \
+        save_phase_timings_to_s3, load_json_from_s3
+    client = get_s3_client()
+    client.create_bucket(Bucket=TEST_BUCKET_NAME, ACL='public-read')
+    timings = PhaseTimings()
+
+    @timed_phase('decorated', timings)
+    def sleep():
+        time.sleep(0.01)
+    sleep()
+    sleep()
+    with timed_phase('context', timings):
+        sum(range(1000))
+    phases = timings.to_json()['phases']
+    assert phases['decorated']['count'] == 2
+    assert phases['decorated']['wall_time'] >= 0.02
+    assert phases['context']['count'] == 1
+    assert phases['context']['cpu_time'] >= 0
+    key = save_phase_timings_to_s3('test', 'model_tests_simple_tests',
+                                   make_date_str(), bucket=TEST_BUCKET_NAME,
+                                   timings=timings)
+    assert key.startswith('timings/test/model_tests_simple_tests_')
+    timings_json = load_json_from_s3(TEST_BUCKET_NAME, key)
+    assert timings_json['phases']['decorated']['count'] == 2
+    timings.reset()
+    assert not timings.phases
@@ -1,4 +1,5 @@
 import datetime
+import pickle
 from copy import deepcopy
 
 from emmaa.statements import EmmaaStatement, to_emmaa_stmts, \
@@ -36,6 +37,26 @@ def test_to_emmaa_stmts():
     assert emmaa_anns['metadata'] == {'internal': True}
 
 
+def test_emmaa_stmt_hash():
+    estmt = EmmaaStatement(deepcopy(stmt), date, search_terms,
+                           {'internal': True})
+    stmt_hash = estmt.get_hash()
+    assert stmt_hash == estmt.stmt.get_hash(shallow=False, refresh=True)
+    # The hash is kept in the pickled statement
+    estmt = pickle.loads(pickle.dumps(estmt))
+    assert estmt._full_hash == stmt_hash
+    # The hash is reset when the statement changes
+    estmt.stmt.evidence.append(Evidence(text='BRAF activates MAP2K1 again.',
+                                        source_api='assertion'))
+    assert estmt.get_hash() == stmt_hash
+    estmt.invalidate_hash()
+    new_hash = estmt.get_hash()
+    assert new_hash != stmt_hash
+    estmt.stmt = deepcopy(stmt)
+    assert estmt._full_hash is None
+    assert estmt.get_hash() != new_hash
+
+
 def test_filter_emmaa_stmts():
     for st in [None, search_terms]:
         estmt1 = EmmaaStatement(stmt, date, st, {'internal': True})
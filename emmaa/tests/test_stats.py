@@ -7,6 +7,9 @@ from indra.statements import Activation, ActivityCondition, Phosphorylation, \
     Agent, Evidence
 from emmaa.analyze_tests_results import ModelRound, TestRound, \
     ModelStatsGenerator, TestStatsGenerator, AgentStatsGenerator
+from emmaa.results_format import path_result_to_row, make_compact_results, \
+    is_compact_results, get_results_header, get_results_tests, \
+    get_path_results, get_path_json
 
 
 TestRound.__test__ = False
@@ -108,6 +111,33 @@ def test_test_round():
     assert len(tr2.find_delta_hashes(tr, 'paths')['added']) == 1
 
 
+def test_test_round_compact():
+    # Convert the results in the previous format to the compact format
+    header = get_results_header(new_results)
+    test_rows = []
+    for ix, test_row in enumerate(get_results_tests(new_results)):
+        test_row = dict(test_row)
+        for mc_type in header['mc_types']:
+            result = get_path_results(new_results, mc_type, [ix])[0]
+            test_row[mc_type] = path_result_to_row(
+                result, get_path_json(new_results, mc_type, ix))
+        test_rows.append(test_row)
+    compact_results = json.loads(json.dumps(
+        make_compact_results(header, test_rows)))
+    assert is_compact_results(compact_results)
+    assert not is_compact_results(new_results)
+    tr = TestRound(new_results, '2020-01-02-00-00-00')
+    compact_tr = TestRound(compact_results, '2020-01-02-00-00-00')
+    assert compact_tr.english_test_results == tr.english_test_results
+    assert compact_tr.get_path_stmt_counts() == tr.get_path_stmt_counts()
+    for mc_type in ['pysb', 'signed_graph', 'unsigned_graph']:
+        for result, compact_result in zip(
+                tr.mc_types_results[mc_type],
+                compact_tr.mc_types_results[mc_type]):
+            assert result.paths == compact_result.paths
+            assert result.result_code == compact_result.result_code
+
+
 @attr('notravis', 'nonpublic')
 def test_model_stats_generator():
     latest_round = ModelRound(new_stmts, '2020-01-02-00-00-00', new_papers)
@@ -5,7 +5,10 @@ import boto3
 import logging
 import json
 import pickle
+import threading
+import time
 import zlib
+from functools import wraps
 import tweepy
 from flask import Flask
 from pathlib import Path
@@ -26,6 +29,142 @@ EMMAA_BUCKET_NAME = 'emmaa'
 logger = logging.getLogger(__name__)
 
 
+try:
+    import resource
+except ImportError:
+    # Peak memory is not recorded on platforms without the resource module
+    resource = None
+
+
+class PhaseTimings(object):
+    """A registry of wall time, CPU time and peak memory of named phases.
+
+    Attributes
+    ----------
+    phases : dict
+        A dictionary mapping a name of a phase to a dictionary with the
+        number of times it was run ('count'), its total wall time and CPU
+        time in seconds ('wall_time', 'cpu_time') and the peak resident set
+        size of the process in MB when it finished ('peak_rss_mb').
+    """
+    def __init__(self):
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, wall_time, cpu_time, peak_rss_mb=None):
+        """Add a run of a phase to the registry."""
+        with self._lock:
+            phase = self.phases.setdefault(
+                name, {'count': 0, 'wall_time': 0.0, 'cpu_time': 0.0,
+                       'peak_rss_mb': None})
+            phase['count'] += 1
+            phase['wall_time'] += wall_time
+            phase['cpu_time'] += cpu_time
+            if peak_rss_mb is not None:
+                phase['peak_rss_mb'] = max(phase['peak_rss_mb'] or 0,
+                                           peak_rss_mb)
+
+    def reset(self):
+        """Remove all recorded phases."""
+        with self._lock:
+            self.phases = {}
+
+    def to_json(self):
+        """Return a JSON dict of the recorded phases."""
+        with self._lock:
+            phases = {name: dict(phase) for name, phase in
+                      self.phases.items()}
+        return {'phases': phases, 'peak_rss_mb': get_peak_rss_mb()}
+
+
+# Phases of the current process are recorded in this registry by default
+phase_timings = PhaseTimings()
+
+
+def get_peak_rss_mb():
+    """Return the peak resident set size of the process in MB or None."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class TimedPhase(object):
+    """Record the wall time, CPU time and peak memory of a named phase.
+
+    Can be used as a context manager or as a function decorator.
+
+    Parameters
+    ----------
+    name : str
+        The name of the phase.
+    timings : Optional[emmaa.util.PhaseTimings]
+        A registry to record the phase in. Default: emmaa.util.phase_timings.
+    """
+    def __init__(self, name, timings=None):
+        self.name = name
+        self.timings = timings if timings is not None else phase_timings
+        self._start = None
+
+    def __enter__(self):
+        self._start = (time.perf_counter(), time.process_time())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall_start, cpu_start = self._start
+        self.timings.add(self.name, time.perf_counter() - wall_start,
+                         time.process_time() - cpu_start, get_peak_rss_mb())
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # A new instance is used for each call so that nested and
+            # concurrent calls are recorded separately
+            with TimedPhase(self.name, self.timings):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def timed_phase(name, timings=None):
+    """Return a context manager and decorator recording a named phase."""
+    return TimedPhase(name, timings)
+
+
+def save_phase_timings_to_s3(model_name, run_name, date_str,
+                             bucket=EMMAA_BUCKET_NAME, timings=None):
+    """Save phases recorded in a run as a JSON artifact on S3.
+
+    Parameters
+    ----------
+    model_name : str
+        A name of EmmaaModel.
+    run_name : str
+        A name of the run (e.g. model_manager or model_tests_<test corpus>).
+    date_str : str
+        The date string of the results of the run.
+    timings : Optional[emmaa.util.PhaseTimings]
+        A registry of recorded phases. Default: emmaa.util.phase_timings.
+
+    Returns
+    -------
+    key : str
+        The key of the saved artifact.
+    """
+    timings = timings if timings is not None else phase_timings
+    key = f'timings/{model_name}/{run_name}_{date_str}.json'
+    timings_json = timings.to_json()
+    timings_json.update({'model_name': model_name, 'run_name': run_name,
+                         'date_str': date_str})
+    logger.info(f'Saving phase timings to {key}')
+    try:
+        save_json_to_s3(timings_json, bucket, key)
+    except Exception as e:
+        logger.warning(f'Could not save phase timings to {key}')
+        logger.warning(e)
+    return key
+
+
 FORMATTED_TYPE_NAMES = {'pysb': 'PySB',
                         'pybel': 'PyBEL',
                         'signed_graph': 'Signed Graph',
@@ -266,6 +405,7 @@ def _get_flask_app():
     return app
 
 
+@timed_phase('s3_read')
 def load_pickle_from_s3(bucket, key):
     client = get_s3_client()
     try:
@@ -292,6 +432,7 @@ def save_pickle_to_s3(obj, bucket, key, intelligent_tiering=True):
            intelligent_tiering=intelligent_tiering)
 
 
+@timed_phase('s3_read')
 def load_json_from_s3(bucket, key):
     client = get_s3_client()
     logger.info(f'Loading object from {key}')
@@ -300,6 +441,16 @@ def load_json_from_s3(bucket, key):
     return content
 
 
+@timed_phase('s3_read')
+def load_jsonl_from_s3(bucket, key):
+    client = get_s3_client()
+    logger.info(f'Loading object from {key}')
+    obj = client.get_object(Bucket=bucket, Key=key)
+    content = [json.loads(line) for line in
+               obj['Body'].read().decode('utf8').splitlines() if line]
+    return content
+
+
 def save_json_to_s3(obj, bucket, key, save_format='json',
                     intelligent_tiering=True):
     json_str = _get_json_str(obj, save_format=save_format)
@@ -308,6 +459,102 @@ def save_json_to_s3(obj, bucket, key, save_format='json',
            unsigned_client=False, intelligent_tiering=intelligent_tiering)
 
 
+class S3StreamWriter(object):
+    """A file-like writer uploading text to S3 with a multipart upload.
+
+    Written text is buffered and uploaded in parts of part_size bytes so
+    that the whole object never has to be held in memory. Objects smaller
+    than one part are uploaded with a single put.
+
+    Parameters
+    ----------
+    bucket : str
+        The S3 bucket to upload the object to.
+    key : str
+        The key to upload the object to.
+    part_size : Optional[int]
+        The size of each uploaded part in bytes (at least 5 MB as required
+        by S3). Default: 8 MB.
+    intelligent_tiering : Optional[bool]
+        Whether to use intelligent tiering. Default: True.
+    """
+    def __init__(self, bucket, key, part_size=8 * 1024 * 1024,
+                 intelligent_tiering=True):
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, 5 * 1024 * 1024)
+        self.intelligent_tiering = intelligent_tiering
+        self.client = get_s3_client(unsigned=False)
+        self.upload_id = None
+        self.parts = []
+        self.buffer = []
+        self.buffer_size = 0
+
+    def write(self, text):
+        """Write a string to the object."""
+        data = text.encode('utf8')
+        self.buffer.append(data)
+        self.buffer_size += len(data)
+        if self.buffer_size >= self.part_size:
+            self._upload_part()
+        return len(text)
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            options = {'Bucket': self.bucket, 'Key': self.key}
+            if self.intelligent_tiering:
+                options['StorageClass'] = 'INTELLIGENT_TIERING'
+            self.upload_id = self.client.create_multipart_upload(
+                **options)['UploadId']
+        part_number = len(self.parts) + 1
+        resp = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=b''.join(self.buffer))
+        self.parts.append({'ETag': resp['ETag'], 'PartNumber': part_number})
+        self.buffer = []
+        self.buffer_size = 0
+
+    def close(self):
+        """Upload the remaining text and complete the upload."""
+        if self.upload_id is None:
+            s3_put(bucket=self.bucket, key=self.key,
+                   body=b''.join(self.buffer), unsigned_client=False,
+                   intelligent_tiering=self.intelligent_tiering)
+            self.buffer = []
+            self.buffer_size = 0
+            return
+        if self.buffer_size:
+            self._upload_part()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts})
+        logger.info(f'Uploaded {len(self.parts)} parts to {self.key}')
+
+    def abort(self):
+        """Abort the upload discarding the uploaded parts."""
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.upload_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def copy_s3_object(bucket, source_key, target_key):
+    """Copy an object within a bucket on the server side."""
+    client = get_s3_client(unsigned=False)
+    logger.info(f'Copying {source_key} to {target_key}')
+    client.copy({'Bucket': bucket, 'Key': source_key}, bucket, target_key)
+
+
+@timed_phase('s3_read')
 def load_gzip_json_from_s3(bucket, key):
     client = get_s3_client()
     # Newer files are zipped with gzip while older with zipfile
@@ -502,7 +749,8 @@ def s3_put(
     # than 128 KB
     if intelligent_tiering and len(body) > 128 * 1024:
         options['StorageClass'] = 'INTELLIGENT_TIERING'
-    client.put_object(**options)
+    with timed_phase('s3_write'):
+        client.put_object(**options)
 
 
 def s3_head_object(bucket: str, key: str, unsigned_client: bool = False) -> \
@@ -0,0 +1,79 @@
+"""Compare the time to load a synthetic test round stored in the previous
+jsonpickle based format and in the compact format of test results."""
+import json
+import time
+import random
+import argparse
+import jsonpickle
+from indra.explanation.model_checker import PathResult, PathMetric
+from emmaa.results_format import path_result_to_row, make_compact_results, \
+    get_path_results
+
+
+MC_TYPES = ['pysb', 'signed_graph', 'unsigned_graph']
+
+
+def make_result(test_ix, mc_type):
+    if random.random() < 0.5:
+        return PathResult(False, 'NO_PATHS_FOUND', 1, 5)
+    result = PathResult(True, 'PATHS_FOUND', 1, 5)
+    nodes = [f'node_{test_ix}_{ix}' for ix in range(random.randint(2, 5))]
+    result.add_metric(PathMetric(nodes[0], nodes[-1], len(nodes) - 1))
+    if mc_type == 'pysb':
+        nodes = [f'rule_{node}' for node in nodes]
+    result.add_path(tuple((node, 0) for node in nodes))
+    return result
+
+
+def make_round(n_tests):
+    pickler = jsonpickle.pickler.Pickler()
+    header = {'model_name': 'benchmark', 'mc_types': MC_TYPES,
+              'path_stmt_counts': {}, 'date_str': '2021-01-01-00-00-00',
+              'test_data': None}
+    old_results = [header]
+    test_rows = []
+    for test_ix in range(n_tests):
+        test_json = {'type': 'Activation', 'id': str(test_ix),
+                     'subj': {'name': f'A{test_ix}'},
+                     'obj': {'name': f'B{test_ix}'}}
+        old_row = {'test_type': 'StatementCheckingTest',
+                   'test_json': test_json}
+        test_row = dict(old_row)
+        for mc_type in MC_TYPES:
+            result = make_result(test_ix, mc_type)
+            path_json = [{'path': ' → '.join(node for node, _ in path),
+                          'edge_list': []} for path in result.paths]
+            old_row[mc_type] = {'result_json': pickler.flatten(result),
+                                'path_json': path_json,
+                                'result_code': result.result_code}
+            test_row[mc_type] = path_result_to_row(result, path_json, pickler)
+        old_results.append(old_row)
+        test_rows.append(test_row)
+    return json.dumps(old_results, indent=1), \
+        json.dumps(make_compact_results(header, test_rows))
+
+
+def time_load(results_str):
+    start = time.time()
+    json_results = json.loads(results_str)
+    for mc_type in MC_TYPES:
+        get_path_results(json_results, mc_type)
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark loading test results in different formats.')
+    parser.add_argument('-n', '--n-tests', type=int, default=50000,
+                        help='Number of synthetic tests. Default is 50000.')
+    args = parser.parse_args()
+    random.seed(0)
+    old_str, compact_str = make_round(args.n_tests)
+    old_time = time_load(old_str)
+    compact_time = time_load(compact_str)
+    print(f'{args.n_tests} tests with {len(MC_TYPES)} model types')
+    print(f'jsonpickle format: {len(old_str) / 1e6:.1f} MB, '
+          f'loaded in {old_time:.2f} s')
+    print(f'compact format: {len(compact_str) / 1e6:.1f} MB, '
+          f'loaded in {compact_time:.2f} s')
+    print(f'speedup: {old_time / compact_time:.1f}x')
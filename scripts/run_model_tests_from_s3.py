@@ -1,5 +1,5 @@
 import argparse
-from emmaa.model_tests import run_model_tests_from_s3
+from emmaa.model_tests import run_model_tests_from_s3, merge_test_shards_on_s3
 
 
 if __name__ == '__main__':
@@ -10,7 +10,25 @@ if __name__ == '__main__':
     parser.add_argument('-t', '--tests', default='large_corpus_tests',
                         help='Test file name (optional). Default is '
                         'large_corpus_tests')
+    parser.add_argument('-n', '--n-shards', type=int, default=1,
+                        help='Number of shards to split the tests into '
+                        '(optional). Default is 1 (no sharding).')
+    parser.add_argument('-s', '--shard-ix', type=int,
+                        help='Index of the shard to run (optional). If not '
+                        'given, all shards are run in parallel processes.')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='Only rerun tests that could be affected by '
+                        'model changes since the previous test round.')
+    parser.add_argument('--merge', action='store_true',
+                        help='Merge the results of previously run shards '
+                        'instead of running the tests.')
     args = parser.parse_args()
 
-    run_model_tests_from_s3(
-        args.model, test_corpus=args.tests, upload_results=True)
+    if args.merge:
+        merge_test_shards_on_s3(args.model, args.n_shards,
+                                test_corpus=args.tests)
+    else:
+        run_model_tests_from_s3(
+            args.model, test_corpus=args.tests, upload_results=True,
+            n_shards=args.n_shards, shard_ix=args.shard_ix,
+            incremental=args.incremental)
@@ -1,16 +1,23 @@
 import argparse
 from emmaa.model import EmmaaModel
 from emmaa.model_tests import ModelManager, save_model_manager_to_s3
+from emmaa.util import timed_phase, save_phase_timings_to_s3
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
             description='Script to update ModelManager stored on Amazon S3.')
     parser.add_argument('-m', '--model', help='Model name', required=True)
+    parser.add_argument('-p', '--parallel', action='store_true',
+                        help='Assemble all model types in parallel.')
     args = parser.parse_args()
 
     model = EmmaaModel.load_from_s3(args.model)
-    mm = ModelManager(model, mode='s3')
-    mm.model.update_to_ndex()
+    mm = ModelManager(model, mode='s3', lazy=False,
+                      parallel_assembly=args.parallel)
+    with timed_phase('ndex_upload'):
+        mm.model.update_to_ndex()
     mm.save_assembled_statements()
     save_model_manager_to_s3(args.model, mm)
+    mm.model.save_assembly_state()
+    save_phase_timings_to_s3(args.model, 'model_manager', mm.date_str)
@@ -33,7 +33,7 @@ setup(name='emmaa',
         'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7'
         ],
-      packages=find_packages(),
+      packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
       install_requires=['indra', 'boto3', 'jsonpickle', 'kappy==4.1.2',
                         'pygraphviz', 'fnvhash', 'sqlalchemy<1.4',
                         'inflection', 'pybel==0.15',